@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import numpy as np
+import xgboost as xgb
+
+from congestion_predictor import LABELS, MODEL_FILE, LEGACY_MODEL_FILE, load_bundle
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+# file layout: MAGIC | u32 format version | u32 header length | JSON header | UBJSON booster
+MAGIC = b"TPMODEL\0"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+
+# ---------------------------
+# Artifact
+# ---------------------------
+def labels_for(thresholds, preds):
+    """Vectorized label_from_thresholds."""
+    return np.asarray(LABELS)[np.searchsorted(thresholds, np.asarray(preds), side='left')]
+
+class ModelArtifact:
+    """Booster plus the metadata needed to serve it, without pickled Python objects.
+
+    `preprocess` is only set for artifacts converted from legacy joblib
+    bundles, whose boosters were trained on StandardScaler output; it holds
+    the scaler's mean/scale as plain arrays.
+    """
+
+    def __init__(self, model, feature_cols, label_thresholds, preprocess=None, meta=None):
+        self.model = model
+        self.feature_cols = list(feature_cols)
+        self.label_thresholds = label_thresholds
+        self.meta = dict(meta or {})
+        self.preprocess = preprocess
+        if preprocess is not None:
+            self._mean = np.asarray(preprocess["mean"], dtype=float)
+            self._scale = np.asarray(preprocess["scale"], dtype=float)
+
+    def to_matrix(self, X):
+        if hasattr(X, "columns"):
+            X = X[self.feature_cols]
+        X = np.asarray(X, dtype=float)
+        return X.reshape(1, -1) if X.ndim == 1 else X
+
+    def predict(self, X):
+        X = self.to_matrix(X)
+        if self.preprocess is not None:
+            X = (X - self._mean) / self._scale
+        return self.model.inplace_predict(X)
+
+    def labels(self, preds):
+        return labels_for(self.label_thresholds, preds)
+
+    # ---------- serialization ----------
+    def header(self):
+        return {
+            "format_version": FORMAT_VERSION,
+            "feature_cols": self.feature_cols,
+            "label_thresholds": self.label_thresholds,
+            "preprocess": self.preprocess,
+            "xgboost_version": xgb.__version__,
+            "created_at": time.time(),
+            "meta": self.meta,
+        }
+
+    def save(self, path):
+        header = json.dumps(self.header()).encode()
+        model_bytes = self.model.save_raw(raw_format="ubj")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+            f.write(model_bytes)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, header_len = _PREFIX.unpack_from(mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a model artifact")
+            if version > FORMAT_VERSION:
+                raise ValueError(f"{path} has format version {version}; this reader supports <= {FORMAT_VERSION}")
+            start = _PREFIX.size
+            header = json.loads(mm[start:start + header_len])
+            model = xgb.Booster()
+            model.load_model(bytearray(mm[start + header_len:]))
+        return cls(model, header["feature_cols"], header["label_thresholds"],
+                   header.get("preprocess"), header.get("meta"))
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        """Convert a legacy joblib bundle dict (model, scaler, feature_cols, thresholds)."""
+        scaler = bundle.get("scaler")
+        preprocess = None
+        if scaler is not None:
+            preprocess = {"mean": scaler.mean_.tolist(), "scale": scaler.scale_.tolist()}
+        meta = {k: v for k, v in bundle.items()
+                if k not in ("model", "scaler", "feature_cols", "label_thresholds", "train_targets")}
+        return cls(bundle["model"], bundle["feature_cols"], list(bundle["label_thresholds"]), preprocess, meta)
+
+# ---------------------------
+# Loading helpers
+# ---------------------------
+def is_artifact(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def default_model_file():
+    return MODEL_FILE if os.path.exists(MODEL_FILE) else LEGACY_MODEL_FILE
+
+def load_model(path):
+    """Load either artifact format or a legacy joblib bundle."""
+    if is_artifact(path):
+        return ModelArtifact.load(path)
+    return ModelArtifact.from_bundle(load_bundle(path))
+
+def convert(src, dst):
+    art = ModelArtifact.from_bundle(load_bundle(src))
+    art.save(dst)
+    return art
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python artifact.py <legacy.joblib> <out.tpm>")
+        sys.exit(2)
+    convert(sys.argv[1], sys.argv[2])
+    print(f"Converted {sys.argv[1]} ({os.path.getsize(sys.argv[1])} bytes) -> "
+          f"{sys.argv[2]} ({os.path.getsize(sys.argv[2])} bytes)")
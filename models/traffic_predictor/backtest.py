@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import platform
+import subprocess
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+import congestion_predictor as cp
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+FEATURE_CACHE_DIR = ".backtest_cache"
+REPORT_FILE = "backtest_report.json"
+N_FOLDS = 5
+TEST_SIZE = cp.SAMPLE_PER_HOUR * 24 * 7   # one week per fold
+GAP = cp.LOOKAHEAD_STEPS                  # purge rows whose target lies in the test window
+
+# ---------------------------
+# Folds
+# ---------------------------
+def make_folds(n_rows, n_folds=N_FOLDS, test_size=TEST_SIZE, gap=GAP, mode="expanding", window=None):
+    """Rolling-origin folds as (train_start, train_end, test_start, test_end) row ranges.
+
+    Test windows are consecutive blocks ending at the last row. "expanding"
+    trains on everything before the gap; "sliding" keeps `window` rows.
+    """
+    folds = []
+    for k in range(n_folds, 0, -1):
+        test_end = n_rows - (k - 1) * test_size
+        test_start = test_end - test_size
+        train_end = test_start - gap
+        train_start = 0 if mode == "expanding" else max(0, train_end - (window or train_end))
+        if train_end - train_start < test_size:
+            continue
+        folds.append((train_start, train_end, test_start, test_end))
+    if not folds:
+        raise ValueError(f"Not enough rows ({n_rows}) for {n_folds} folds of {test_size} (+gap {gap})")
+    return folds
+
+# ---------------------------
+# Feature cache (built once, memory-mapped by every fold)
+# ---------------------------
+def build_feature_cache(csv_paths, cache_dir=FEATURE_CACHE_DIR):
+    df = cp.load_and_merge(csv_paths)
+    df_ts = cp.rebuild_timestamps(df)
+    df_feat = cp.feature_engineering(df_ts)
+    df_target = cp.create_future_target(df_feat, steps_ahead=cp.LOOKAHEAD_STEPS)
+    X, y, feature_cols, _ = cp.prepare_model_data(df_target)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(os.path.join(cache_dir, "X.npy"), X.to_numpy(dtype=float))
+    np.save(os.path.join(cache_dir, "y.npy"), y.to_numpy(dtype=float))
+    with open(os.path.join(cache_dir, "feature_cols.json"), "w") as f:
+        json.dump(feature_cols, f)
+    return feature_cols, len(X)
+
+def load_feature_cache(cache_dir=FEATURE_CACHE_DIR):
+    X = np.load(os.path.join(cache_dir, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(cache_dir, "y.npy"), mmap_mode="r")
+    with open(os.path.join(cache_dir, "feature_cols.json")) as f:
+        return X, y, json.load(f)
+
+# ---------------------------
+# Fold worker
+# ---------------------------
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_fold(fold_id, bounds, cache_dir, threads):
+    train_start, train_end, test_start, test_end = bounds
+    X, y, feature_cols = load_feature_cache(cache_dir)
+    X_train, y_train = X[train_start:train_end], y[train_start:train_end]
+    X_test, y_test = X[test_start:test_end], y[test_start:test_end]
+
+    t0 = time.perf_counter()
+    model, scaler = cp.train_xgboost(X_train, y_train, params={"nthread": threads, "verbosity": 0},
+                                     verbose_eval=False)
+    train_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    preds = model.inplace_predict(scaler.transform(X_test) if scaler is not None else X_test)
+    predict_seconds = time.perf_counter() - t0
+
+    abs_err = np.abs(y_test - preds)
+    hours = np.asarray(X_test[:, feature_cols.index('hour')], dtype=int)
+    sums = np.bincount(hours, weights=abs_err, minlength=24)
+    counts = np.bincount(hours, minlength=24)
+    return {
+        "fold": fold_id,
+        "train_rows": [int(train_start), int(train_end)],
+        "test_rows": [int(test_start), int(test_end)],
+        "mse": float(mean_squared_error(y_test, preds)),
+        "mae": float(mean_absolute_error(y_test, preds)),
+        "r2": float(r2_score(y_test, preds)),
+        "mae_by_hour": {str(h): float(sums[h] / counts[h]) for h in range(len(counts)) if counts[h]},
+        "abs_err_sum_by_hour": sums.tolist(),
+        "rows_by_hour": counts.tolist(),
+        "train_seconds": round(train_seconds, 4),
+        "predict_rows_per_sec": round(len(X_test) / predict_seconds, 1) if predict_seconds > 0 else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+# ---------------------------
+# Driver
+# ---------------------------
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def run_backtest(csv_paths, n_folds=N_FOLDS, test_size=TEST_SIZE, gap=GAP, mode="expanding",
+                 window=None, workers=None, threads_per_worker=None, cache_dir=FEATURE_CACHE_DIR):
+    feature_cols, n_rows = build_feature_cache(csv_paths, cache_dir)
+    folds = make_folds(n_rows, n_folds, test_size, gap, mode, window)
+    workers = workers or min(len(folds), os.cpu_count() or 1)
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+
+    print(f"[backtest] {len(folds)} {mode} fold(s) over {n_rows} rows, "
+          f"{workers} worker(s) x {threads_per_worker} thread(s)")
+    t0 = time.perf_counter()
+    # one process per fold so peak RSS is attributable to that fold
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, max_tasks_per_child=1) as pool:
+        futs = [pool.submit(run_fold, i, b, cache_dir, threads_per_worker) for i, b in enumerate(folds)]
+        results = [f.result() for f in futs]
+    wall = time.perf_counter() - t0
+
+    err_sum = np.sum([r.pop("abs_err_sum_by_hour") for r in results], axis=0)
+    rows = np.sum([r.pop("rows_by_hour") for r in results], axis=0)
+    by_hour = {str(h): float(err_sum[h] / rows[h]) for h in range(len(rows)) if rows[h]}
+
+    for r in results:
+        print(f"  fold {r['fold']}: MAE {r['mae']:.3f}  R2 {r['r2']:.3f}  train {r['train_seconds']:.2f}s  "
+              f"predict {r['predict_rows_per_sec']:.0f} rows/s  peak {r['peak_rss_mb']:.0f} MB")
+    print("\nTop hours with largest avg absolute error (all folds):")
+    for h, e in sorted(by_hour.items(), key=lambda kv: kv[1], reverse=True)[:10]:
+        print(f"  {int(h):>2}: {e:.3f}")
+
+    return {
+        "git_commit": _git_commit(),
+        "created_at": time.time(),
+        "host": {"python": platform.python_version(), "cpus": os.cpu_count(), "xgboost": xgb.__version__},
+        "config": {"csv": list(csv_paths), "n_folds": len(folds), "test_size": test_size, "gap": gap,
+                   "mode": mode, "window": window, "workers": workers,
+                   "threads_per_worker": threads_per_worker, "feature_cols": feature_cols},
+        "folds": results,
+        "summary": {
+            "mse_mean": float(np.mean([r["mse"] for r in results])),
+            "mae_mean": float(np.mean([r["mae"] for r in results])),
+            "r2_mean": float(np.mean([r["r2"] for r in results])),
+            "train_seconds_total": round(sum(r["train_seconds"] for r in results), 3),
+            "predict_rows_per_sec_mean": float(np.mean([r["predict_rows_per_sec"] or 0 for r in results])),
+            "peak_rss_mb_max": max(r["peak_rss_mb"] for r in results),
+            "wall_seconds": round(wall, 3),
+        },
+        "mae_by_hour": by_hour,
+    }
+
+# ---------------------------
+# Main
+# ---------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the congestion predictor.")
+    parser.add_argument("--csv", nargs="+", default=[cp.CSV1, cp.CSV2])
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--test-size", type=int, default=TEST_SIZE)
+    parser.add_argument("--gap", type=int, default=GAP)
+    parser.add_argument("--mode", choices=["expanding", "sliding"], default="expanding")
+    parser.add_argument("--window", type=int, default=None, help="training rows for sliding mode")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--out", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    report = run_backtest(args.csv, args.folds, args.test_size, args.gap, args.mode,
+                          args.window, args.workers, args.threads_per_worker)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("\nBacktest report written to", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import numpy as np
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+SIZES = [100_000, 1_000_000, 8_000_000]  # one series; ~8.4M 15-min steps from 2023 is the datetime64[ns] limit
+MODES = ["default", "lean"]
+RUN_TIMEOUT = 3600           # seconds per (size, mode) run
+REPORT_PATH = "pipeline_scaling.json"
+
+# ---------------------------
+# Worker: one (size, mode) run in its own process
+# ---------------------------
+def run_stages(rows, mode, seed, from_csv, num_round, emit):
+    """Generate `rows` and run main()'s stages, emitting one JSON record per finished stage."""
+    import congestion_predictor as cp
+    import synth_traffic
+
+    lean = mode == "lean"
+    mem = cp.MemoryReport(sink=lambda row: emit({"stage": row}))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if from_csv:
+            with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as tmp:
+                path = os.path.join(tmp, "synthetic.csv")
+                with mem.stage("write_csv"):
+                    synth_traffic.write_csv(path, rows, seed=seed)
+                with mem.stage("load"):
+                    df = cp.load_and_merge([path], cache_dir=None)
+        else:
+            with mem.stage("generate"):
+                df = synth_traffic.generate_frame(rows, seed=seed)
+        emit({"rows": len(df)})
+        X, feature_cols, (X_train, X_test, y_train, y_test) = cp.build_datasets(df, lean, mem)
+        del df
+        X_sub, y_sub, X_val, y_val = cp.validation_split(X_train, y_train)
+        with mem.stage("train"):
+            model, scaler = cp.train_xgboost(X_sub, y_sub, X_val, y_val, verbose_eval=False, num_round=num_round,
+                                             chunk_rows=cp.LEAN_CHUNK_ROWS if lean else None)
+        with mem.stage("evaluate"):
+            preds = cp.evaluate_model(model, scaler, X_test, y_test)
+    emit({"mae": float(np.mean(np.abs(np.asarray(y_test) - preds)))})
+
+def worker(args):
+    out = sys.stdout
+
+    def emit(record):
+        out.write(json.dumps(record) + "\n")
+        out.flush()  # stages finished before an OOM kill still reach the runner
+
+    try:
+        run_stages(args.rows, args.mode, args.seed, args.from_csv, args.num_round, emit)
+    except Exception as e:
+        emit({"error": f"{type(e).__name__}: {e}"})
+        sys.exit(1)
+
+# ---------------------------
+# Runner
+# ---------------------------
+def run_one(rows, mode, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", "--rows", str(rows), "--mode", mode,
+           "--seed", str(args.seed), "--num-round", str(args.num_round)] + (["--from-csv"] if args.from_csv else [])
+    run = {"requested_rows": rows, "mode": mode, "status": "ok", "stages": []}
+    t0 = time.perf_counter()
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=args.timeout,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        stdout, code = proc.stdout, proc.returncode
+    except subprocess.TimeoutExpired as e:
+        stdout = e.stdout.decode() if isinstance(e.stdout, bytes) else (e.stdout or "")
+        code = None
+        run["status"] = f"timeout after {args.timeout}s"
+    run["seconds"] = round(time.perf_counter() - t0, 2)
+    for line in stdout.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if "stage" in record:
+            run["stages"].append(record["stage"])
+        else:
+            run.update(record)
+    if "error" in run:
+        run["status"] = f"error: {run['error']}"
+    elif code is not None and code < 0:
+        # SIGKILL with no traceback is almost always the kernel OOM killer
+        run["status"] = "killed (likely out of memory)" if code == -9 else f"killed by signal {-code}"
+    elif code not in (0, None):
+        run["status"] = f"exit {code}"
+        run["stderr"] = proc.stderr[-2000:]
+    run["peak_mb"] = max((s["peak_mb"] for s in run["stages"]), default=None)
+    return run
+
+def scaling_exponents(runs):
+    """Per mode and stage, log(t2/t1)/log(n2/n1) between consecutive sizes: 1.0 is linear."""
+    out = {}
+    for mode in {r["mode"] for r in runs}:
+        ok = sorted((r for r in runs if r["mode"] == mode and "rows" in r), key=lambda r: r["rows"])
+        for a, b in zip(ok, ok[1:]):
+            sa, sb = {s["stage"]: s for s in a["stages"]}, {s["stage"]: s for s in b["stages"]}
+            for stage in sa.keys() & sb.keys():
+                if sa[stage]["seconds"] > 0.01 and sb[stage]["seconds"] > 0:
+                    k = np.log(sb[stage]["seconds"] / sa[stage]["seconds"]) / np.log(b["rows"] / a["rows"])
+                    out.setdefault(mode, {}).setdefault(stage, []).append(
+                        {"rows": [a["rows"], b["rows"]], "exponent": round(float(k), 2)})
+    return out
+
+def print_report(runs):
+    stages = []
+    for r in runs:
+        stages += [s["stage"] for s in r["stages"] if s["stage"] not in stages]
+    print(f"\n{'rows':>12} {'mode':<8} " + " ".join(f"{s[:12]:>12}" for s in stages) + f" {'peak MB':>9}  status")
+    for r in runs:
+        by = {s["stage"]: s for s in r["stages"]}
+        cells = " ".join(f"{by[s]['seconds']:>11.2f}s" if s in by else f"{'-':>12}" for s in stages)
+        peak = "-" if r["peak_mb"] is None else f"{r['peak_mb']:.0f}"
+        print(f"{r.get('rows', r['requested_rows']):>12,} {r['mode']:<8} {cells} {peak:>9}  {r['status']}")
+    print("\nPeak RSS by stage (MB):")
+    for r in runs:
+        print(f"  {r.get('rows', r['requested_rows']):>12,} {r['mode']:<8} " +
+              ", ".join(f"{s['stage']}={s['peak_mb']:.0f}" for s in r["stages"]))
+
+# ---------------------------
+# Main
+# ---------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile congestion_predictor's stages "
+                                                 "on synthetic data across sizes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num-round", type=int, default=None, help="boosting rounds (default: cp.NUM_ROUND)")
+    parser.add_argument("--from-csv", action="store_true", help="round-trip through CSV to include the load stage")
+    parser.add_argument("--timeout", type=int, default=RUN_TIMEOUT)
+    parser.add_argument("--out", default=REPORT_PATH)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.num_round is None:
+        import congestion_predictor as cp
+        args.num_round = cp.NUM_ROUND
+    if args.worker:
+        worker(args)
+        return
+
+    runs = []
+    for rows in args.sizes:
+        for mode in args.modes:
+            run = run_one(rows, mode, args)
+            runs.append(run)
+            print(f"[INFO] {rows:,} rows / {mode}: {run['status']} in {run['seconds']:.1f}s, "
+                  f"peak {run['peak_mb'] or 0:.0f} MB")
+    report = {"meta": {"time": time.time(), "python": sys.version.split()[0], "platform": platform.platform(),
+                       "cpus": os.cpu_count(), "num_round": args.num_round, "from_csv": args.from_csv},
+              "runs": runs, "scaling_exponents": scaling_exponents(runs)}
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(runs)
+    print(f"\n[INFO] Scaling report written to {args.out}")
+
+if __name__ == "__main__":
+    main()
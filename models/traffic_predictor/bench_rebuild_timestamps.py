@@ -0,0 +1,260 @@
+import io
+import time
+import argparse
+import contextlib
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+import congestion_predictor as cp
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+SIZES = [10_000, 1_000_000, 10_000_000]
+LEGACY_MAX_ROWS = 100_000  # the row-by-row reference is far too slow beyond this
+GAPS_PER_10K = 5           # gaps and out-of-order swaps injected per 10k rows in the "gaps" case
+
+# ---------------------------
+# Reference: the baseline implementation, verbatim
+# ---------------------------
+FREQ_MINUTES = cp.FREQ_MINUTES          # module globals the baseline body refers to
+YEAR_PLACEHOLDER = cp.YEAR_PLACEHOLDER
+
+def rebuild_timestamps_baseline(df):
+    import pandas as _pd
+    df = df.copy()
+    df.columns = [c.strip() for c in df.columns]
+    df['Date'] = df['Date'].astype(int)
+
+    def parse_time_to_minutes(tstr):
+        tstr = str(tstr).strip()
+        for tf in ("%I:%M:%S %p", "%I:%M %p", "%H:%M:%S", "%H:%M"):
+            try:
+                tt = datetime.strptime(tstr, tf).time()
+                return tt.hour * 60 + tt.minute
+            except Exception:
+                continue
+        raise ValueError(f"Unrecognized time format: '{tstr}'")
+
+    minutes_of_day = df['Time'].apply(parse_time_to_minutes).astype(int).values
+
+    # virtual day counter to detect month/rollover
+    virtual_day = 0
+    virtual_days = []
+    prev_daynum = int(df.iloc[0]['Date'])
+    virtual_days.append(virtual_day)
+    for i in range(1, len(df)):
+        curr_daynum = int(df.iloc[i]['Date'])
+        if curr_daynum < prev_daynum:
+            virtual_day += 1
+        virtual_days.append(virtual_day)
+        prev_daynum = curr_daynum
+    virtual_days = np.array(virtual_days, dtype=int)
+
+    abs_minutes_csv = virtual_days * 1440 + minutes_of_day
+    diffs = np.diff(abs_minutes_csv, prepend=abs_minutes_csv[0])
+    gap_threshold = 2 * FREQ_MINUTES
+    gap_indices = np.where(diffs > gap_threshold)[0]
+
+    # build sequential timestamps from first row
+    first_time_str = str(df.iloc[0]['Time']).strip()
+    parsed_time = None
+    for tf in ("%I:%M:%S %p", "%I:%M %p", "%H:%M:%S", "%H:%M"):
+        try:
+            parsed_time = datetime.strptime(first_time_str, tf).time()
+            break
+        except Exception:
+            continue
+    if parsed_time is None:
+        raise ValueError(f"Could not parse start time: '{first_time_str}'")
+
+    first_day = int(df.iloc[0]['Date'])
+    try:
+        start_ts = datetime(YEAR_PLACEHOLDER, 1, first_day, parsed_time.hour, parsed_time.minute, parsed_time.second)
+    except Exception:
+        start_ts = datetime(YEAR_PLACEHOLDER, 1, 1, parsed_time.hour, parsed_time.minute, parsed_time.second)
+        print(f"[rebuild_timestamps] Warning: start day {first_day} invalid for month=1; using day=1 as start.")
+
+    n = len(df)
+    seq_timestamps = [start_ts + timedelta(minutes=FREQ_MINUTES * i) for i in range(n)]
+    seq_ts_series = _pd.to_datetime(seq_timestamps)
+
+    if len(gap_indices) > 0:
+        print(f"[rebuild_timestamps] Detected {len(gap_indices)} gap(s) larger than {gap_threshold} minutes:")
+        for gi in gap_indices:
+            prev_idx = gi - 1 if gi - 1 >= 0 else 0
+            gap_minutes = diffs[gi]
+            csv_time_prev = f"{df.iloc[prev_idx]['Date']} {df.iloc[prev_idx]['Time']}"
+            csv_time_curr = f"{df.iloc[gi]['Date']} {df.iloc[gi]['Time']}"
+            print(f"  - gap at row {gi}: prev=({csv_time_prev}) -> curr=({csv_time_curr}), gap {gap_minutes} minutes")
+            seq_ts_series.iloc[gi] = _pd.NaT
+    else:
+        print("[rebuild_timestamps] No large gaps detected.")
+
+    df['timestamp'] = seq_ts_series.values
+    df = df.sort_values('timestamp', na_position='last').reset_index(drop=True)
+    n_nats = df['timestamp'].isna().sum()
+    print(f"[rebuild_timestamps] Timestamps built. Range: {df['timestamp'].min()} -> {df['timestamp'].max()}. NaT count: {n_nats}")
+    return df
+
+# ---------------------------
+# Reference for gapped inputs
+# ---------------------------
+# The baseline cannot run on any series with a gap: pd.to_datetime(list) is a
+# DatetimeIndex, which has no .iloc. This is the same code with only that
+# expression wrapped in a Series; keep the two in sync.
+def rebuild_timestamps_baseline_gapsafe(df):
+    import pandas as _pd
+    df = df.copy()
+    df.columns = [c.strip() for c in df.columns]
+    df['Date'] = df['Date'].astype(int)
+
+    def parse_time_to_minutes(tstr):
+        tstr = str(tstr).strip()
+        for tf in ("%I:%M:%S %p", "%I:%M %p", "%H:%M:%S", "%H:%M"):
+            try:
+                tt = datetime.strptime(tstr, tf).time()
+                return tt.hour * 60 + tt.minute
+            except Exception:
+                continue
+        raise ValueError(f"Unrecognized time format: '{tstr}'")
+
+    minutes_of_day = df['Time'].apply(parse_time_to_minutes).astype(int).values
+
+    # virtual day counter to detect month/rollover
+    virtual_day = 0
+    virtual_days = []
+    prev_daynum = int(df.iloc[0]['Date'])
+    virtual_days.append(virtual_day)
+    for i in range(1, len(df)):
+        curr_daynum = int(df.iloc[i]['Date'])
+        if curr_daynum < prev_daynum:
+            virtual_day += 1
+        virtual_days.append(virtual_day)
+        prev_daynum = curr_daynum
+    virtual_days = np.array(virtual_days, dtype=int)
+
+    abs_minutes_csv = virtual_days * 1440 + minutes_of_day
+    diffs = np.diff(abs_minutes_csv, prepend=abs_minutes_csv[0])
+    gap_threshold = 2 * FREQ_MINUTES
+    gap_indices = np.where(diffs > gap_threshold)[0]
+
+    # build sequential timestamps from first row
+    first_time_str = str(df.iloc[0]['Time']).strip()
+    parsed_time = None
+    for tf in ("%I:%M:%S %p", "%I:%M %p", "%H:%M:%S", "%H:%M"):
+        try:
+            parsed_time = datetime.strptime(first_time_str, tf).time()
+            break
+        except Exception:
+            continue
+    if parsed_time is None:
+        raise ValueError(f"Could not parse start time: '{first_time_str}'")
+
+    first_day = int(df.iloc[0]['Date'])
+    try:
+        start_ts = datetime(YEAR_PLACEHOLDER, 1, first_day, parsed_time.hour, parsed_time.minute, parsed_time.second)
+    except Exception:
+        start_ts = datetime(YEAR_PLACEHOLDER, 1, 1, parsed_time.hour, parsed_time.minute, parsed_time.second)
+        print(f"[rebuild_timestamps] Warning: start day {first_day} invalid for month=1; using day=1 as start.")
+
+    n = len(df)
+    seq_timestamps = [start_ts + timedelta(minutes=FREQ_MINUTES * i) for i in range(n)]
+    seq_ts_series = _pd.Series(_pd.to_datetime(seq_timestamps))  # the only change from the baseline
+
+    if len(gap_indices) > 0:
+        print(f"[rebuild_timestamps] Detected {len(gap_indices)} gap(s) larger than {gap_threshold} minutes:")
+        for gi in gap_indices:
+            prev_idx = gi - 1 if gi - 1 >= 0 else 0
+            gap_minutes = diffs[gi]
+            csv_time_prev = f"{df.iloc[prev_idx]['Date']} {df.iloc[prev_idx]['Time']}"
+            csv_time_curr = f"{df.iloc[gi]['Date']} {df.iloc[gi]['Time']}"
+            print(f"  - gap at row {gi}: prev=({csv_time_prev}) -> curr=({csv_time_curr}), gap {gap_minutes} minutes")
+            seq_ts_series.iloc[gi] = _pd.NaT
+    else:
+        print("[rebuild_timestamps] No large gaps detected.")
+
+    df['timestamp'] = seq_ts_series.values
+    df = df.sort_values('timestamp', na_position='last').reset_index(drop=True)
+    n_nats = df['timestamp'].isna().sum()
+    print(f"[rebuild_timestamps] Timestamps built. Range: {df['timestamp'].min()} -> {df['timestamp'].max()}. NaT count: {n_nats}")
+    return df
+
+# ---------------------------
+# Synthetic input in the Traffic.csv schema
+# ---------------------------
+def make_frame(n_rows, start_day=10, gaps=0, swaps=0, seed=0):
+    """Series with month rollovers (day-of-month cycles 1..31), plus optional
+    gaps (runs of 3-8 missing rows, detected as > 2 * FREQ_MINUTES) and
+    out-of-order rows (adjacent pairs swapped)."""
+    steps_per_day = 24 * 60 // cp.FREQ_MINUTES
+    day_times = np.array([
+        (datetime(2000, 1, 1) + timedelta(minutes=cp.FREQ_MINUTES * i)).strftime("%I:%M:%S %p").lstrip("0")
+        for i in range(steps_per_day)
+    ], dtype=object)
+    rng = np.random.default_rng(seed)
+    idx = np.arange(n_rows)
+    keep = np.ones(n_rows, dtype=bool)
+    for g in rng.choice(np.arange(1, n_rows - 8), size=gaps, replace=False) if gaps else []:
+        keep[g:g + rng.integers(3, 9)] = False
+    idx = idx[keep]
+    for s in rng.choice(np.arange(1, len(idx) - 1), size=swaps, replace=False) if swaps else []:
+        idx[s], idx[s + 1] = idx[s + 1], idx[s]
+    day_offset = idx // steps_per_day
+    daynum = (start_day - 1 + day_offset) % 31 + 1
+    counts = rng.integers(0, 150, size=(len(idx), 4))
+    return pd.DataFrame({
+        'Time': day_times[idx % steps_per_day],
+        'Date': daynum,
+        'Day of the week': np.array(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"], dtype=object)[day_offset % 7],
+        'CarCount': counts[:, 0],
+        'BikeCount': counts[:, 1],
+        'BusCount': counts[:, 2],
+        'TruckCount': counts[:, 3],
+        'Total': counts.sum(axis=1),
+        'Traffic Situation': "normal",
+    })
+
+def timed(fn, *args):
+    # both implementations print one line per gap; keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        out = fn(*args)
+    return out, time.perf_counter() - t0
+
+def run_baseline(df):
+    """(result, seconds, note): the verbatim baseline, or its gap-safe variant if the baseline raises."""
+    try:
+        out, t = timed(rebuild_timestamps_baseline, df)
+        return out, t, "verbatim"
+    except AttributeError:
+        out, t = timed(rebuild_timestamps_baseline_gapsafe, df)
+        return out, t, "gap-safe: verbatim raises AttributeError"
+
+# ---------------------------
+# Main
+# ---------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rebuild_timestamps against the baseline row-by-row implementation.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--legacy-max-rows", type=int, default=LEGACY_MAX_ROWS)
+    parser.add_argument("--gaps-per-10k", type=int, default=GAPS_PER_10K)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'case':<8} {'vectorized_s':>14} {'baseline_s':>11} {'speedup':>9}  match")
+    for n in args.sizes:
+        k = max(1, n * args.gaps_per_10k // 10_000)
+        for case, df in (("clean", make_frame(n)), ("gaps", make_frame(n, gaps=k, swaps=k))):
+            new, t_new = timed(cp.rebuild_timestamps, df)
+            if case == "gaps":
+                assert new['timestamp'].isna().sum() > 0, "gapped input produced no NaT rows"
+            if n <= args.legacy_max_rows:
+                old, t_old, ref = run_baseline(df)
+                pd.testing.assert_frame_equal(new, old)
+                print(f"{len(df):>12,} {case:<8} {t_new:>14.3f} {t_old:>11.3f} {t_old / t_new:>8.1f}x  yes ({ref})")
+            else:
+                print(f"{len(df):>12,} {case:<8} {t_new:>14.3f} {'-':>11} {'-':>9}  skipped")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,19 @@
 import os
+import time
+import resource
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import lru_cache
+from contextlib import contextmanager
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.preprocessing import StandardScaler
 import xgboost as xgb
 import joblib
 import matplotlib.pyplot as plt
 
+from ingest import load_csvs
+
 # ---------------------------
 # CONFIG
 # ---------------------------
@@ -19,108 +25,135 @@ LOOKAHEAD_HOURS = 48
 SAMPLE_PER_HOUR = 60 // FREQ_MINUTES
 LOOKAHEAD_STEPS = LOOKAHEAD_HOURS * SAMPLE_PER_HOUR  # 192
 TEST_RATIO = 0.20
-MODEL_FILE = "model_xgb.joblib"
+MODEL_FILE = "model_xgb.tpm"
+LEGACY_MODEL_FILE = "model_xgb.joblib"
+SCALE_FEATURES = False  # trees are invariant to per-feature affine scaling
+CACHE_DIR = ".ingest_cache"  # None disables the columnar cache
+LEAN_DTYPE = np.float32      # feature / target dtype in --lean mode (what XGBoost uses internally)
+LEAN_CHUNK_ROWS = 100_000    # rows per DataIter batch when building QuantileDMatrix in --lean mode
+FEATURE_COLS = [
+    'traffic_total', 'hour', 'minute', 'dayofweek', 'is_weekend', 'month',
+    'traffic_lag_1', 'traffic_lag_4', 'traffic_lag_24h',
+    'rolling_mean_1h', 'rolling_mean_6h', 'rolling_std_6h'
+]
 
 # ---------------------------
 # Load / merge
 # ---------------------------
-def load_and_merge(csv_paths):
-    frames = []
+def load_and_merge(csv_paths, cache_dir=CACHE_DIR):
     for p in csv_paths:
         if not os.path.exists(p):
             raise FileNotFoundError(f"CSV not found: {p}")
-        df = pd.read_csv(p)
-        frames.append(df)
-        print(f"Loaded {p} shape={df.shape}")
-    df_all = pd.concat(frames, ignore_index=True)
+    df_all = load_csvs(csv_paths, cache_dir=cache_dir)
     print("Merged dataframe shape:", df_all.shape)
     return df_all
 
 # ---------------------------
 # Robust timestamp rebuild with gap detection
 # ---------------------------
-def rebuild_timestamps(df):
-    import pandas as _pd
-    df = df.copy()
-    df.columns = [c.strip() for c in df.columns]
-    df['Date'] = df['Date'].astype(int)
+TIME_FORMATS = ("%I:%M:%S %p", "%I:%M %p", "%H:%M:%S", "%H:%M")
 
-    def parse_time_to_minutes(tstr):
-        tstr = str(tstr).strip()
-        for tf in ("%I:%M:%S %p", "%I:%M %p", "%H:%M:%S", "%H:%M"):
-            try:
-                tt = datetime.strptime(tstr, tf).time()
-                return tt.hour * 60 + tt.minute
-            except Exception:
-                continue
-        raise ValueError(f"Unrecognized time format: '{tstr}'")
+@lru_cache(maxsize=None)
+def _detect_time_format(tstr):
+    for tf in TIME_FORMATS:
+        try:
+            datetime.strptime(tstr, tf)
+            return tf
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized time format: '{tstr}'")
+
+def parse_time_column(times):
+    """Parse a Time column into (hour, minute, second) int arrays.
+
+    Only the distinct strings are parsed: the format is detected once from the
+    first value and applied to all uniques in one vectorized call; values that
+    don't match fall back to per-string detection (same format priority as
+    TIME_FORMATS).
+    """
+    codes, uniques = pd.factorize(times, use_na_sentinel=False)
+    uniques = pd.Index([str(u).strip() for u in uniques], dtype=object)
+    fmt = _detect_time_format(uniques[0])
+    parsed = pd.to_datetime(uniques, format=fmt, errors="coerce")
+    hour = parsed.hour.to_numpy(dtype=float, na_value=np.nan)
+    minute = parsed.minute.to_numpy(dtype=float, na_value=np.nan)
+    second = parsed.second.to_numpy(dtype=float, na_value=np.nan)
+    for i in np.flatnonzero(parsed.isna()):
+        tt = datetime.strptime(uniques[i], _detect_time_format(uniques[i])).time()
+        hour[i], minute[i], second[i] = tt.hour, tt.minute, tt.second
+    return hour.astype(int)[codes], minute.astype(int)[codes], second.astype(int)[codes]
+
+def rebuild_timestamps(df, copy=True):
+    """copy=False adds the timestamp column to `df` itself (and keeps its compact Date dtype)."""
+    if copy:
+        df = df.copy()
+    df.columns = [c.strip() for c in df.columns]
+    if copy:
+        df['Date'] = df['Date'].astype(int)
 
-    minutes_of_day = df['Time'].apply(parse_time_to_minutes).astype(int).values
+    hours, minutes, seconds = parse_time_column(df['Time'].values)
+    minutes_of_day = hours * 60 + minutes
 
     # virtual day counter to detect month/rollover
-    virtual_day = 0
-    virtual_days = []
-    prev_daynum = int(df.iloc[0]['Date'])
-    virtual_days.append(virtual_day)
-    for i in range(1, len(df)):
-        curr_daynum = int(df.iloc[i]['Date'])
-        if curr_daynum < prev_daynum:
-            virtual_day += 1
-        virtual_days.append(virtual_day)
-        prev_daynum = curr_daynum
-    virtual_days = np.array(virtual_days, dtype=int)
+    daynums = df['Date'].to_numpy().astype(int, copy=False)
+    virtual_days = np.zeros(len(df), dtype=int)
+    np.cumsum(np.diff(daynums) < 0, out=virtual_days[1:])
 
     abs_minutes_csv = virtual_days * 1440 + minutes_of_day
     diffs = np.diff(abs_minutes_csv, prepend=abs_minutes_csv[0])
     gap_threshold = 2 * FREQ_MINUTES
-    gap_indices = np.where(diffs > gap_threshold)[0]
+    gap_mask = diffs > gap_threshold
+    gap_indices = np.flatnonzero(gap_mask)
 
     # build sequential timestamps from first row
-    first_time_str = str(df.iloc[0]['Time']).strip()
-    parsed_time = None
-    for tf in ("%I:%M:%S %p", "%I:%M %p", "%H:%M:%S", "%H:%M"):
-        try:
-            parsed_time = datetime.strptime(first_time_str, tf).time()
-            break
-        except Exception:
-            continue
-    if parsed_time is None:
-        raise ValueError(f"Could not parse start time: '{first_time_str}'")
-
-    first_day = int(df.iloc[0]['Date'])
+    first_day = int(daynums[0])
     try:
-        start_ts = datetime(YEAR_PLACEHOLDER, 1, first_day, parsed_time.hour, parsed_time.minute, parsed_time.second)
+        start_ts = datetime(YEAR_PLACEHOLDER, 1, first_day, hours[0], minutes[0], seconds[0])
     except Exception:
-        start_ts = datetime(YEAR_PLACEHOLDER, 1, 1, parsed_time.hour, parsed_time.minute, parsed_time.second)
+        start_ts = datetime(YEAR_PLACEHOLDER, 1, 1, hours[0], minutes[0], seconds[0])
         print(f"[rebuild_timestamps] Warning: start day {first_day} invalid for month=1; using day=1 as start.")
 
     n = len(df)
-    seq_timestamps = [start_ts + timedelta(minutes=FREQ_MINUTES * i) for i in range(n)]
-    seq_ts_series = _pd.to_datetime(seq_timestamps)
+    if (n - 1) * FREQ_MINUTES >= (pd.Timestamp.max - pd.Timestamp(start_ts)) / pd.Timedelta(minutes=1):
+        raise ValueError(f"{n} rows at {FREQ_MINUTES}-minute steps from {start_ts} overflow the datetime64[ns] "
+                         f"range (ends {pd.Timestamp.max}); split the series, e.g. per site")
+    seq_ts = np.datetime64(start_ts, 'ns') + np.arange(n) * np.timedelta64(FREQ_MINUTES, 'm')
 
     if len(gap_indices) > 0:
         print(f"[rebuild_timestamps] Detected {len(gap_indices)} gap(s) larger than {gap_threshold} minutes:")
+        times = df['Time'].values
         for gi in gap_indices:
             prev_idx = gi - 1 if gi - 1 >= 0 else 0
-            gap_minutes = diffs[gi]
-            csv_time_prev = f"{df.iloc[prev_idx]['Date']} {df.iloc[prev_idx]['Time']}"
-            csv_time_curr = f"{df.iloc[gi]['Date']} {df.iloc[gi]['Time']}"
-            print(f"  - gap at row {gi}: prev=({csv_time_prev}) -> curr=({csv_time_curr}), gap {gap_minutes} minutes")
-            seq_ts_series.iloc[gi] = _pd.NaT
+            csv_time_prev = f"{daynums[prev_idx]} {times[prev_idx]}"
+            csv_time_curr = f"{daynums[gi]} {times[gi]}"
+            print(f"  - gap at row {gi}: prev=({csv_time_prev}) -> curr=({csv_time_curr}), gap {diffs[gi]} minutes")
+        seq_ts[gap_mask] = np.datetime64('NaT')
     else:
         print("[rebuild_timestamps] No large gaps detected.")
 
-    df['timestamp'] = seq_ts_series.values
-    df = df.sort_values('timestamp', na_position='last').reset_index(drop=True)
-    n_nats = df['timestamp'].isna().sum()
+    df['timestamp'] = seq_ts
+    # sequential timestamps are already ascending, so sorting only moves NaT rows to the end
+    if len(gap_indices) > 0:
+        df = df.iloc[np.concatenate([np.flatnonzero(~gap_mask), gap_indices])]
+    if copy:
+        df = df.reset_index(drop=True)
+    else:
+        df.reset_index(drop=True, inplace=True)
+    n_nats = len(gap_indices)
     print(f"[rebuild_timestamps] Timestamps built. Range: {df['timestamp'].min()} -> {df['timestamp'].max()}. NaT count: {n_nats}")
     return df
 
 # ---------------------------
 # Feature engineering
 # ---------------------------
-def feature_engineering(df):
-    df = df.copy()
+def feature_engineering(df, copy=True, dtype=None):
+    """copy=False adds the feature columns to `df` in place; dtype (e.g. float32) narrows them.
+
+    Features are always computed in float64 and only stored as `dtype`, so
+    the values equal the float64 ones rounded to `dtype`.
+    """
+    if copy:
+        df = df.copy()
     total_col_candidates = ['Total', 'TotalTraffic', 'Total Traffic', 'TotalTrafficCount']
     total_col = None
     for cand in total_col_candidates:
@@ -136,40 +169,64 @@ def feature_engineering(df):
             raise KeyError("Could not find Total traffic column and cannot reconstruct it. Columns: " + ", ".join(df.columns))
 
     if total_col != 'traffic_total':
-        df = df.rename(columns={total_col: 'traffic_total'})
+        if copy:
+            df = df.rename(columns={total_col: 'traffic_total'})
+        else:
+            df.rename(columns={total_col: 'traffic_total'}, inplace=True)
+
+    # small ints for calendar fields when narrowing; they are exact in any float dtype
+    int_dtype = int if dtype is None else np.int8
+    float_col = (lambda s: s) if dtype is None else (lambda s: s.astype(dtype))
 
     # create time features; use ffill/bfill instead of deprecated fillna(method=...)
-    df['hour'] = df['timestamp'].dt.hour.ffill().astype(int)
-    df['minute'] = df['timestamp'].dt.minute.ffill().astype(int)
-    df['dayofweek'] = df['timestamp'].dt.dayofweek.ffill().astype(int)
-    df['is_weekend'] = df['dayofweek'].isin([5,6]).astype(int)
-    df['month'] = df['timestamp'].dt.month.ffill().astype(int)
-    df['day'] = df['timestamp'].dt.day.ffill().astype(int)
+    df['hour'] = df['timestamp'].dt.hour.ffill().astype(int_dtype)
+    df['minute'] = df['timestamp'].dt.minute.ffill().astype(int_dtype)
+    df['dayofweek'] = df['timestamp'].dt.dayofweek.ffill().astype(int_dtype)
+    df['is_weekend'] = df['dayofweek'].isin([5,6]).astype(int_dtype)
+    df['month'] = df['timestamp'].dt.month.ffill().astype(int_dtype)
+    df['day'] = df['timestamp'].dt.day.ffill().astype(int_dtype)
 
     # lag & rolling features
-    df['traffic_lag_1'] = df['traffic_total'].shift(1)
-    df['traffic_lag_4'] = df['traffic_total'].shift(SAMPLE_PER_HOUR)
-    df['traffic_lag_24h'] = df['traffic_total'].shift(SAMPLE_PER_HOUR * 24)
-    df['rolling_mean_1h'] = df['traffic_total'].rolling(window=SAMPLE_PER_HOUR, min_periods=1).mean().shift(1)
-    df['rolling_mean_6h'] = df['traffic_total'].rolling(window=SAMPLE_PER_HOUR * 6, min_periods=1).mean().shift(1)
-    df['rolling_std_6h'] = df['traffic_total'].rolling(window=SAMPLE_PER_HOUR * 6, min_periods=1).std().fillna(0).shift(1)
+    total = df['traffic_total']
+    df['traffic_lag_1'] = float_col(total.shift(1))
+    df['traffic_lag_4'] = float_col(total.shift(SAMPLE_PER_HOUR))
+    df['traffic_lag_24h'] = float_col(total.shift(SAMPLE_PER_HOUR * 24))
+    df['rolling_mean_1h'] = float_col(total.rolling(window=SAMPLE_PER_HOUR, min_periods=1).mean().shift(1))
+    df['rolling_mean_6h'] = float_col(total.rolling(window=SAMPLE_PER_HOUR * 6, min_periods=1).mean().shift(1))
+    df['rolling_std_6h'] = float_col(total.rolling(window=SAMPLE_PER_HOUR * 6, min_periods=1).std().fillna(0).shift(1))
 
     # robust filling
     df.ffill(inplace=True)
     df.bfill(inplace=True)
-    df.fillna(0, inplace=True)
+    # categorical columns from the ingest layer cannot take a 0 fill value
+    df.fillna({c: 0 for c in df.columns if not isinstance(df[c].dtype, pd.CategoricalDtype)}, inplace=True)
 
     return df
 
 # ---------------------------
 # Create future target
 # ---------------------------
-def create_future_target(df, steps_ahead=LOOKAHEAD_STEPS):
-    df = df.copy()
-    df['future_traffic'] = df['traffic_total'].shift(-steps_ahead)
+def create_future_target(df, steps_ahead=LOOKAHEAD_STEPS, copy=True, dtype=None):
+    if copy:
+        df = df.copy()
+    target = df['traffic_total'].shift(-steps_ahead)
+    df['future_traffic'] = target if dtype is None else target.astype(dtype)
     print("Future target created with steps_ahead=", steps_ahead)
     return df
 
+def create_future_targets(df, horizons):
+    """Add one future_traffic_<name> column per {name: steps_ahead} horizon in a single pass."""
+    values = df['traffic_total'].to_numpy(dtype=float)
+    n = len(values)
+    targets = np.full((n, len(horizons)), np.nan)
+    for j, steps in enumerate(horizons.values()):
+        if steps < n:
+            targets[:n - steps, j] = values[steps:]
+    target_cols = [f"future_traffic_{name}" for name in horizons]
+    df = df.assign(**{c: targets[:, j] for j, c in enumerate(target_cols)})
+    print("Future targets created for horizons:", dict(horizons))
+    return df, target_cols
+
 # ---------------------------
 # Prepare modeling data
 # ---------------------------
@@ -180,12 +237,7 @@ def prepare_model_data(df):
         if c in df.columns:
             df.drop(columns=[c], inplace=True)
 
-    feature_cols = [
-        'traffic_total', 'hour', 'minute', 'dayofweek', 'is_weekend', 'month',
-        'traffic_lag_1', 'traffic_lag_4', 'traffic_lag_24h',
-        'rolling_mean_1h', 'rolling_mean_6h', 'rolling_std_6h'
-    ]
-    feature_cols = [c for c in feature_cols if c in df.columns]
+    feature_cols = [c for c in FEATURE_COLS if c in df.columns]
 
     df_model = df.dropna(subset=['future_traffic']).copy()
     X = df_model[feature_cols].astype(float)
@@ -193,52 +245,120 @@ def prepare_model_data(df):
     print("Prepared model data: X shape", X.shape, "y shape", y.shape)
     return X, y, feature_cols, df_model
 
+def prepare_model_arrays(df, dtype=LEAN_DTYPE):
+    """prepare_model_data without intermediate frames: one C-contiguous (n, k) feature block and y.
+
+    Rows without a target are skipped by index; when they are all at the end
+    (the usual case: the last steps_ahead rows) every column is read through
+    a slice view, so the block is the only new allocation.
+    """
+    feature_cols = [c for c in FEATURE_COLS if c in df.columns]
+    has_target = df['future_traffic'].notna().to_numpy()
+    m = int(has_target.sum())
+    rows = slice(0, m) if has_target[:m].all() else np.flatnonzero(has_target)
+    X = np.empty((m, len(feature_cols)), dtype=dtype)
+    for j, c in enumerate(feature_cols):
+        X[:, j] = df[c].to_numpy()[rows]
+    y = df['future_traffic'].to_numpy()[rows].astype(dtype, copy=False)
+    print("Prepared model arrays: X shape", X.shape, X.dtype, "y shape", y.shape)
+    return X, y, feature_cols
+
 # ---------------------------
 # Chronological split
 # ---------------------------
-def chronological_train_test_split(X, y, test_ratio=TEST_RATIO):
+def _rows(a, s):
+    return a.iloc[s] if hasattr(a, 'iloc') else a[s]
+
+def chronological_train_test_split(X, y, test_ratio=TEST_RATIO, copy=True):
+    """copy=False returns views (DataFrame/Series slices or NumPy views) instead of copies."""
     n = len(X)
     split_idx = int((1 - test_ratio) * n)
-    X_train = X.iloc[:split_idx].copy()
-    y_train = y.iloc[:split_idx].copy()
-    X_test = X.iloc[split_idx:].copy()
-    y_test = y.iloc[split_idx:].copy()
+    parts = [_rows(a, s) for a, s in ((X, slice(None, split_idx)), (X, slice(split_idx, None)),
+                                      (y, slice(None, split_idx)), (y, slice(split_idx, None)))]
+    if copy:
+        parts = [p.copy() for p in parts]
+    X_train, X_test, y_train, y_test = parts
     print(f"Train/test split: {X_train.shape[0]} train rows, {X_test.shape[0]} test rows")
     return X_train, X_test, y_train, y_test
 
 # ---------------------------
 # Train
 # ---------------------------
-def train_xgboost(X_train, y_train, X_val=None, y_val=None):
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_val_scaled = scaler.transform(X_val) if X_val is not None else None
-
-    dtrain = xgb.DMatrix(X_train_scaled, label=y_train)
-    params = {
-        "objective": "reg:squarederror",
-        "max_depth": 6,
-        "eta": 0.1,
-        "subsample": 0.8,
-        "colsample_bytree": 0.8,
-        "seed": 42,
-        "verbosity": 1
-    }
-    num_round = 200
+XGB_PARAMS = {
+    "objective": "reg:squarederror",
+    "max_depth": 6,
+    "eta": 0.1,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "seed": 42,
+    "verbosity": 1
+}
+NUM_ROUND = 200
+
+class ChunkIter(xgb.DataIter):
+    """Feeds row chunks of (X, y) views to XGBoost, scaling each chunk on the fly if a scaler is given."""
+
+    def __init__(self, X, y, chunk_rows=LEAN_CHUNK_ROWS, scaler=None):
+        self.X, self.y, self.chunk_rows, self.scaler = X, y, chunk_rows, scaler
+        self._pos = 0
+        super().__init__()
+
+    def next(self, input_data):
+        if self._pos >= len(self.X):
+            return False
+        s = slice(self._pos, self._pos + self.chunk_rows)
+        X = self.X[s]
+        if self.scaler is not None:
+            X = self.scaler.transform(X).astype(self.X.dtype, copy=False)
+        input_data(data=X, label=self.y[s])
+        self._pos += self.chunk_rows
+        return True
+
+    def reset(self):
+        self._pos = 0
+
+def train_xgboost(X_train, y_train, X_val=None, y_val=None, params=None, verbose_eval=25,
+                  num_round=NUM_ROUND, early_stopping_rounds=None, scale=SCALE_FEATURES, chunk_rows=None):
+    """chunk_rows (NumPy inputs) builds QuantileDMatrix from a ChunkIter: only the quantized
+    histogram index is kept, never a float copy of the whole training set."""
+    # scaler is None unless scale=True (kept for comparing against legacy models)
+    scaler = StandardScaler() if scale else None
+    params = dict(XGB_PARAMS, **(params or {}))
+    if chunk_rows:
+        if scaler is not None:
+            scaler.fit(X_train)
+        params.setdefault("tree_method", "hist")
+        dtrain = xgb.QuantileDMatrix(ChunkIter(X_train, y_train, chunk_rows, scaler))
+        deval = None
+        if X_val is not None:
+            deval = xgb.QuantileDMatrix(ChunkIter(X_val, y_val, chunk_rows, scaler), ref=dtrain)
+    else:
+        if scaler is not None:
+            X_train_scaled = scaler.fit_transform(X_train)
+            X_val_scaled = scaler.transform(X_val) if X_val is not None else None
+        else:
+            X_train_scaled, X_val_scaled = X_train, X_val
+        dtrain = xgb.DMatrix(X_train_scaled, label=y_train)
+        deval = xgb.DMatrix(X_val_scaled, label=y_val) if X_val_scaled is not None else None
+
     evallist = [(dtrain, 'train')]
-    if X_val_scaled is not None:
-        deval = xgb.DMatrix(X_val_scaled, label=y_val)
+    if deval is not None:
         evallist.append((deval, 'eval'))
-    model = xgb.train(params, dtrain, num_boost_round=num_round, evals=evallist, verbose_eval=25)
+    else:
+        early_stopping_rounds = None
+    model = xgb.train(params, dtrain, num_boost_round=num_round, evals=evallist, verbose_eval=verbose_eval,
+                      early_stopping_rounds=early_stopping_rounds)
+    if early_stopping_rounds:
+        # keep only the trees up to the best validation round
+        model = model[:model.best_iteration + 1]
     return model, scaler
 
 # ---------------------------
 # Evaluate
 # ---------------------------
 def evaluate_model(model, scaler, X_test, y_test):
-    X_test_scaled = scaler.transform(X_test)
-    dtest = xgb.DMatrix(X_test_scaled)
-    preds = model.predict(dtest)
+    X_test_scaled = scaler.transform(X_test) if scaler is not None else X_test
+    preds = model.inplace_predict(X_test_scaled)  # no DMatrix copy of the test set
     mse = mean_squared_error(y_test, preds)
     mae = mean_absolute_error(y_test, preds)
     r2 = r2_score(y_test, preds)
@@ -251,9 +371,15 @@ def evaluate_model(model, scaler, X_test, y_test):
 # ---------------------------
 # Map numeric prediction to label
 # ---------------------------
-def label_from_prediction(train_targets, pred_value):
-    q1 = np.percentile(train_targets, 33)
-    q2 = np.percentile(train_targets, 66)
+LABEL_QUANTILES = (33, 66)
+LABELS = ("low", "normal", "heavy")
+
+def label_thresholds(train_targets):
+    q1, q2 = np.percentile(train_targets, LABEL_QUANTILES)
+    return float(q1), float(q2)
+
+def label_from_thresholds(thresholds, pred_value):
+    q1, q2 = thresholds
     if pred_value <= q1:
         return "low"
     elif pred_value <= q2:
@@ -261,37 +387,160 @@ def label_from_prediction(train_targets, pred_value):
     else:
         return "heavy"
 
+def label_from_prediction(train_targets, pred_value):
+    return label_from_thresholds(label_thresholds(train_targets), pred_value)
+
+def load_bundle(path=LEGACY_MODEL_FILE):
+    """Load a legacy joblib bundle; older ones without thresholds get them derived once here."""
+    saved = joblib.load(path)
+    if 'label_thresholds' not in saved:
+        saved['label_thresholds'] = label_thresholds(saved.pop('train_targets'))
+    return saved
+
 # ---------------------------
-# Main
+# Memory report
 # ---------------------------
-def main():
-    df = load_and_merge([CSV1, CSV2])
-    df_ts = rebuild_timestamps(df)
-    df_feat = feature_engineering(df_ts)
-    df_target = create_future_target(df_feat, steps_ahead=LOOKAHEAD_STEPS)
-    X, y, feature_cols, df_model = prepare_model_data(df_target)
-    X_train, X_test, y_train, y_test = chronological_train_test_split(X, y, TEST_RATIO)
-
-    val_split = int(0.95 * len(X_train))
-    X_train_sub = X_train.iloc[:val_split]
-    y_train_sub = y_train.iloc[:val_split]
-    X_val = X_train.iloc[val_split:]
-    y_val = y_train.iloc[val_split:]
+def _proc_status_kb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _reset_peak_rss():
+    """Reset the kernel's peak-RSS (VmHWM) counter; Linux only. False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+class MemoryReport:
+    """Wall time, RSS and peak RSS per pipeline stage.
+
+    On Linux the peak is reset at each stage start, so it is that stage's own
+    peak; elsewhere it falls back to the process-lifetime peak (ru_maxrss).
+    """
+
+    def __init__(self, enabled=True, sink=None):
+        self.enabled = enabled
+        self.sink = sink  # called with each stage's row as soon as it finishes
+        self.rows = []
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        per_stage = _reset_peak_rss()
+        rss0 = _proc_status_kb("VmRSS")
+        t0 = time.perf_counter()
+        yield
+        peak = _proc_status_kb("VmHWM") if per_stage else None
+        if peak is None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux
+        self.rows.append({"stage": name, "seconds": round(time.perf_counter() - t0, 3),
+                          "rss_start_mb": (rss0 or 0) / 1024, "rss_end_mb": (_proc_status_kb("VmRSS") or 0) / 1024,
+                          "peak_mb": peak / 1024, "per_stage_peak": per_stage})
+        if self.sink is not None:
+            self.sink(self.rows[-1])
+
+    def print(self):
+        if not self.rows:
+            return
+        print("\nMemory by stage (MB):")
+        print(f"  {'stage':<16} {'seconds':>8} {'rss start':>10} {'rss end':>10} {'peak':>10} {'peak - start':>13}")
+        for r in self.rows:
+            print(f"  {r['stage']:<16} {r['seconds']:>8.2f} {r['rss_start_mb']:>10.1f} {r['rss_end_mb']:>10.1f} "
+                  f"{r['peak_mb']:>10.1f} {r['peak_mb'] - r['rss_start_mb']:>13.1f}")
+        if not self.rows[0]["per_stage_peak"]:
+            print("  (peak is the process-lifetime maximum on this platform)")
 
-    print("Training XGBoost...")
-    model, scaler = train_xgboost(X_train_sub, y_train_sub, X_val, y_val)
+# ---------------------------
+# Main
+# ---------------------------
+def build_datasets(df, lean=False, mem=None):
+    """Stages from a loaded frame to X, feature_cols and (X_train, X_test, y_train, y_test).
+
+    lean=True runs the memory-lean pipeline: stages modify `df` in place,
+    features are float32 and the splits are NumPy views of one block.
+    """
+    mem = mem or MemoryReport(enabled=False)
+    if lean:
+        with mem.stage("timestamps"):
+            df = rebuild_timestamps(df, copy=False)
+        with mem.stage("features"):
+            df = feature_engineering(df, copy=False, dtype=LEAN_DTYPE)
+        with mem.stage("target"):
+            df = create_future_target(df, steps_ahead=LOOKAHEAD_STEPS, copy=False, dtype=LEAN_DTYPE)
+        with mem.stage("model_arrays"):
+            X, y, feature_cols = prepare_model_arrays(df)
+        X_train, X_test, y_train, y_test = chronological_train_test_split(X, y, TEST_RATIO, copy=False)
+    else:
+        with mem.stage("timestamps"):
+            df_ts = rebuild_timestamps(df)
+        with mem.stage("features"):
+            df_feat = feature_engineering(df_ts)
+        with mem.stage("target"):
+            df_target = create_future_target(df_feat, steps_ahead=LOOKAHEAD_STEPS)
+        with mem.stage("model_arrays"):
+            X, y, feature_cols, df_model = prepare_model_data(df_target)
+        with mem.stage("split"):
+            X_train, X_test, y_train, y_test = chronological_train_test_split(X, y, TEST_RATIO)
+    return X, feature_cols, (X_train, X_test, y_train, y_test)
+
+def validation_split(X_train, y_train, ratio=0.95):
+    """Last (1 - ratio) of the training rows as the early-stopping set: X_sub, y_sub, X_val, y_val."""
+    k = int(ratio * len(X_train))
+    return (_rows(X_train, slice(None, k)), _rows(y_train, slice(None, k)),
+            _rows(X_train, slice(k, None)), _rows(y_train, slice(k, None)))
+
+def main(tune=False, lean=False, mem_report=False):
+    """lean=True: see build_datasets; XGBoost is then fed in chunks of LEAN_CHUNK_ROWS."""
+    mem = MemoryReport(enabled=lean or mem_report)
+    with mem.stage("load"):
+        df = load_and_merge([CSV1, CSV2])
+    X, feature_cols, (X_train, X_test, y_train, y_test) = build_datasets(df, lean, mem)
+    del df
+    X_train_sub, y_train_sub, X_val, y_val = validation_split(X_train, y_train)
+    chunk_rows = LEAN_CHUNK_ROWS if lean else None
+
+    tuning = None
+    if tune:
+        from tuning import tune_hyperparameters
+        tuning = tune_hyperparameters(X_train_sub, y_train_sub, X_val, y_val)
+        print("Training XGBoost with tuned params...")
+        with mem.stage("train"):
+            model, scaler = train_xgboost(X_train_sub, y_train_sub, X_val, y_val, params=tuning['params'],
+                                          num_round=tuning['num_round'], chunk_rows=chunk_rows)
+    else:
+        print("Training XGBoost...")
+        with mem.stage("train"):
+            model, scaler = train_xgboost(X_train_sub, y_train_sub, X_val, y_val, chunk_rows=chunk_rows)
 
-    preds = evaluate_model(model, scaler, X_test, y_test)
+    with mem.stage("evaluate"):
+        preds = evaluate_model(model, scaler, X_test, y_test)
+    mem.print()
 
     # Save
-    joblib.dump({"model": model, "scaler": scaler, "feature_cols": feature_cols, "train_targets": y_train.values}, MODEL_FILE)
-    print("Saved model and preprocessing to", MODEL_FILE)
+    # label thresholds are precomputed so inference never needs the training targets
+    from artifact import ModelArtifact, load_model
+    bundle = {"model": model, "scaler": scaler, "feature_cols": feature_cols,
+              "label_thresholds": label_thresholds(np.asarray(y_train))}
+    if tuning is not None:
+        bundle["tuning"] = tuning
+    ModelArtifact.from_bundle(bundle).save(MODEL_FILE)
+    print("Saved model artifact to", MODEL_FILE)
 
     # Plot quick prediction vs actual (first N test rows)
     try:
         nplot = min(200, len(y_test))
         plt.figure(figsize=(12,4))
-        plt.plot(range(nplot), y_test.values[:nplot], label='actual')
+        plt.plot(range(nplot), np.asarray(y_test)[:nplot], label='actual')
         plt.plot(range(nplot), preds[:nplot], label='predicted')
         plt.legend()
         plt.title("Prediction vs Actual (first {} test rows)".format(nplot))
@@ -329,30 +578,30 @@ def main():
 
     # ERROR BY HOUR
     try:
-        residuals = y_test.values - preds
-        df_eval = X_test.copy()
-        df_eval['abs_err'] = np.abs(residuals)
-        err_by_hour = df_eval.groupby('hour')['abs_err'].mean().sort_values(ascending=False)
+        residuals = np.asarray(y_test) - preds
+        hours = X_test['hour'] if hasattr(X_test, 'columns') else X_test[:, feature_cols.index('hour')]
+        hours = pd.Series(np.asarray(hours), name='hour')
+        err_by_hour = pd.Series(np.abs(residuals), name='abs_err').groupby(hours).mean().sort_values(ascending=False)
         print("\nTop hours with largest avg absolute error:")
         print(err_by_hour.head(10))
     except Exception as e:
         print("Could not compute error-by-hour:", e)
 
     # EXAMPLE prediction using last row
-    saved = joblib.load(MODEL_FILE)
-    saved_model = saved['model']
-    saved_scaler = saved['scaler']
-    saved_feature_cols = saved['feature_cols']
-    saved_train_targets = saved['train_targets']
-
-    sample_row = X.iloc[-1:]
-    scaled = saved_scaler.transform(sample_row)
-    dmat = xgb.DMatrix(scaled)
-    pred_val = saved_model.predict(dmat)[0]
-    label = label_from_prediction(saved_train_targets, pred_val)
+    saved = load_model(MODEL_FILE)
+    sample_row = _rows(X, slice(-1, None))
+    pred_val = saved.predict(sample_row)[0]
+    label = label_from_thresholds(saved.label_thresholds, pred_val)
     print("\nExample prediction for last sample (48h ahead):", round(pred_val,1), "->", label)
 
     print("\nDone. Model saved to", MODEL_FILE)
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Train the 48h-ahead congestion predictor.")
+    parser.add_argument("--tune", action="store_true", help="search hyperparameters before the final fit")
+    parser.add_argument("--lean", action="store_true",
+                        help="memory-lean pipeline: in-place stages, float32, index views, chunked QuantileDMatrix")
+    parser.add_argument("--mem-report", action="store_true", help="print the per-stage memory report (always on with --lean)")
+    args = parser.parse_args()
+    main(tune=args.tune, lean=args.lean, mem_report=args.mem_report)
@@ -0,0 +1,145 @@
+import os
+import io
+import time
+import argparse
+import contextlib
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, ALL_COMPLETED, wait
+from sklearn.metrics import mean_absolute_error, r2_score
+from threadpoolctl import threadpool_limits
+
+import congestion_predictor as cp
+from artifact import ModelArtifact
+from model_registry import REGISTRY_DIR, ModelRegistry, write_artifact
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+SITE_COL = "Junction"
+DEFAULT_SITE = "default"
+MIN_SITE_ROWS = cp.LOOKAHEAD_STEPS + cp.SAMPLE_PER_HOUR * 24 * 2
+
+# ---------------------------
+# Partitioning
+# ---------------------------
+def iter_site_frames(df, site_col=SITE_COL):
+    """Yield (site, frame) lazily so only in-flight partitions are materialized."""
+    if site_col not in df.columns:
+        yield DEFAULT_SITE, df
+        return
+    for site, idx in df.groupby(site_col, sort=False, observed=True).indices.items():
+        yield site, df.iloc[idx].drop(columns=[site_col]).reset_index(drop=True)
+
+# ---------------------------
+# Worker
+# ---------------------------
+def _init_worker(threads):
+    # numpy's BLAS is already loaded by the time the initializer runs (importing this module
+    # pulls it in), so env vars come too late for it; threadpoolctl caps the live pools.
+    # The env vars still cover OpenMP runtimes loaded later.
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    threadpool_limits(limits=threads)
+
+def train_site(site, df_site, registry_root, threads, verbose=False):
+    """Run the single-site pipeline and write its bundle into the registry directory."""
+    t0 = time.perf_counter()
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with quiet:
+            df_ts = cp.rebuild_timestamps(df_site)
+            df_feat = cp.feature_engineering(df_ts)
+            df_target = cp.create_future_target(df_feat, steps_ahead=cp.LOOKAHEAD_STEPS)
+            X, y, feature_cols, _ = cp.prepare_model_data(df_target)
+            X_train, X_test, y_train, y_test = cp.chronological_train_test_split(X, y, cp.TEST_RATIO)
+            val_split = int(0.95 * len(X_train))
+            model, scaler = cp.train_xgboost(X_train.iloc[:val_split], y_train.iloc[:val_split],
+                                             X_train.iloc[val_split:], y_train.iloc[val_split:],
+                                             params={"nthread": threads, "verbosity": 0},
+                                             verbose_eval=False)
+        artifact = ModelArtifact.from_bundle({
+            "model": model, "scaler": scaler, "feature_cols": feature_cols,
+            "label_thresholds": cp.label_thresholds(y_train.values)})
+        preds = artifact.predict(X_test)
+        fname = write_artifact(registry_root, site, artifact)
+        metrics = {
+            "rows": int(len(df_site)),
+            "mae": float(mean_absolute_error(y_test, preds)),
+            "r2": float(r2_score(y_test, preds)),
+            "train_seconds": round(time.perf_counter() - t0, 3),
+        }
+        return site, fname, metrics, None
+    except Exception as e:
+        return site, None, None, f"{type(e).__name__}: {e}"
+
+# ---------------------------
+# Fleet driver
+# ---------------------------
+def train_fleet(df, site_col=SITE_COL, registry_root=REGISTRY_DIR, workers=None,
+                threads_per_worker=None, max_in_flight=None):
+    """Train one model per site across a process pool.
+
+    At most `max_in_flight` partitions are pickled to workers at a time, which
+    bounds parent-side memory; each worker's XGBoost uses `threads_per_worker`.
+    """
+    workers = workers or os.cpu_count() or 1
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    max_in_flight = max_in_flight or workers * 2
+    registry = ModelRegistry(registry_root)
+
+    results, failures = {}, {}
+    t0 = time.perf_counter()
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(threads_per_worker,)) as pool:
+        pending = set()
+
+        def drain(return_when):
+            nonlocal pending
+            done, pending = wait(pending, return_when=return_when)
+            for fut in done:
+                site, fname, metrics, err = fut.result()
+                if err:
+                    failures[site] = err
+                    print(f"[train_fleet] site {site}: FAILED {err}")
+                else:
+                    registry.register(site, fname, metrics)
+                    results[site] = metrics
+                    print(f"[train_fleet] site {site}: rows={metrics['rows']} MAE={metrics['mae']:.2f} "
+                          f"R2={metrics['r2']:.3f} ({metrics['train_seconds']}s)")
+
+        for site, df_site in iter_site_frames(df, site_col):
+            if len(df_site) < MIN_SITE_ROWS:
+                failures[site] = f"only {len(df_site)} rows (< {MIN_SITE_ROWS})"
+                print(f"[train_fleet] site {site}: skipped, {failures[site]}")
+                continue
+            if len(pending) >= max_in_flight:
+                drain(FIRST_COMPLETED)
+            pending.add(pool.submit(train_site, site, df_site, registry_root, threads_per_worker))
+        if pending:
+            drain(ALL_COMPLETED)
+
+    elapsed = time.perf_counter() - t0
+    print(f"[train_fleet] Trained {len(results)} site(s), {len(failures)} failed/skipped, "
+          f"in {elapsed:.1f}s with {workers} worker(s) x {threads_per_worker} thread(s)")
+    return results, failures
+
+# ---------------------------
+# Main
+# ---------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Train one congestion model per site into a registry.")
+    parser.add_argument("--csv", nargs="+", default=[cp.CSV1, cp.CSV2])
+    parser.add_argument("--site-col", default=SITE_COL)
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--max-in-flight", type=int, default=None)
+    args = parser.parse_args()
+
+    df = cp.load_and_merge(args.csv)
+    train_fleet(df, args.site_col, args.registry, args.workers,
+                args.threads_per_worker, args.max_in_flight)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import os
+import csv
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow as pa
+except ImportError:  # cache is optional; fall back to chunked CSV parsing
+    pa = None
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+CACHE_DIR = ".ingest_cache"
+CHUNK_ROWS = 250_000
+HASH_BLOCK = 1 << 20
+COUNT_COLS = ['CarCount', 'BikeCount', 'BusCount', 'TruckCount', 'Total']
+CATEGORICAL_COLS = ['Time', 'Day of the week', 'Traffic Situation']
+COMPACT_DTYPES = {**{c: 'int16' for c in COUNT_COLS}, 'Date': 'int8',
+                  **{c: 'category' for c in CATEGORICAL_COLS}}
+
+# ---------------------------
+# Chunked CSV reading
+# ---------------------------
+def read_header(path):
+    with open(path, 'r', newline='') as f:
+        return next(csv.reader(f))
+
+def _dtype_map(columns):
+    # headers may carry stray whitespace; match on the stripped name. Integer
+    # columns are parsed as float64 (blank cells are NaN; read_csv wraps
+    # silently on int16 overflow) and narrowed per chunk in _narrow.
+    return {c: ('float64' if COMPACT_DTYPES[c.strip()].startswith('int') else COMPACT_DTYPES[c.strip()])
+            for c in columns if c.strip() in COMPACT_DTYPES}
+
+def _narrow(chunk):
+    """Cast integer columns to their compact dtype, or int64 if the values do not fit.
+
+    A column with missing or fractional values in this chunk stays float64.
+    """
+    for c in chunk.columns:
+        target = COMPACT_DTYPES.get(c.strip())
+        if target and target.startswith('int') and chunk[c].dtype == np.float64:
+            values = chunk[c].to_numpy()
+            if np.isnan(values).any() or (values != np.rint(values)).any():
+                continue
+            info = np.iinfo(target)
+            fits = info.min <= values.min() and values.max() <= info.max
+            chunk[c] = values.astype(target if fits else np.int64)
+    return chunk
+
+def iter_csv_chunks(path, offset=0, columns=None, chunk_rows=None):
+    """Stream a CSV as compact-dtype DataFrame chunks, optionally from a byte offset.
+
+    When offset > 0 the header is not in the stream, so `columns` must be given.
+    """
+    columns = columns or read_header(path)
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        reader = pd.read_csv(f, header=None if offset else 0, names=columns,
+                             dtype=_dtype_map(columns), chunksize=chunk_rows or CHUNK_ROWS)
+        for chunk in reader:
+            if len(chunk):
+                yield _narrow(chunk)
+
+def concat_compact(frames):
+    """Concatenate chunks without widening categoricals to object."""
+    if len(frames) == 1:
+        return frames[0]
+    cat_cols = [c for c in frames[0].columns if isinstance(frames[0][c].dtype, pd.CategoricalDtype)]
+    cats = {c: union_categoricals([f[c] for f in frames]) for c in cat_cols}
+    df = pd.concat([f.drop(columns=cat_cols) for f in frames], ignore_index=True)
+    for c, values in cats.items():
+        df[c] = values
+    return df[list(frames[0].columns)]
+
+def read_csv_compact(path, chunk_rows=None):
+    return concat_compact(list(iter_csv_chunks(path, chunk_rows=chunk_rows)))
+
+# ---------------------------
+# Content-hash keyed Arrow cache
+# ---------------------------
+def _new_hash():
+    return hashlib.blake2b(digest_size=20)
+
+def digest_file(path, split=0):
+    """Return (full, prefix, tail) digests of a file split at byte `split` in one pass."""
+    full, tail = _new_hash(), _new_hash()
+    prefix = None
+    with open(path, 'rb') as f:
+        remaining = split
+        while remaining > 0:
+            block = f.read(min(HASH_BLOCK, remaining))
+            if not block:
+                break
+            full.update(block)
+            remaining -= len(block)
+        if split:
+            prefix = full.hexdigest()
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            full.update(block)
+            tail.update(block)
+    return full.hexdigest(), prefix, tail.hexdigest()
+
+def _ends_with_newline(path, size):
+    with open(path, 'rb') as f:
+        f.seek(size - 1)
+        return f.read(1) == b'\n'
+
+def _manifest_path(cache_dir, path):
+    key = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=12).hexdigest()
+    return os.path.join(cache_dir, key + ".json")
+
+def _load_manifest(cache_dir, path):
+    mpath = _manifest_path(cache_dir, path)
+    if not os.path.exists(mpath):
+        return None
+    with open(mpath) as f:
+        manifest = json.load(f)
+    if not all(os.path.exists(os.path.join(cache_dir, s['file'])) for s in manifest['segments']):
+        return None
+    return manifest
+
+def _save_manifest(cache_dir, path, manifest):
+    mpath = _manifest_path(cache_dir, path)
+    tmp = mpath + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, mpath)
+
+def prune_cache(cache_dir):
+    """Drop manifests whose source CSV is gone, then segments no manifest references.
+
+    Segments are named by content digest and may be shared between
+    manifests, so a segment is only deleted once nothing points at it.
+    """
+    referenced = set()
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        mpath = os.path.join(cache_dir, name)
+        try:
+            with open(mpath) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not os.path.exists(manifest.get('source', '')):
+            os.remove(mpath)
+            continue
+        referenced.update(s['file'] for s in manifest['segments'])
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith(".arrow") and name not in referenced:
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
+
+def _arrow_table(chunk):
+    # categories differ per chunk, so segments store plain strings and are
+    # re-dictionary-encoded once on load
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    fields = [pa.field(f.name, pa.string()) if pa.types.is_dictionary(f.type) else f for f in table.schema]
+    return table.cast(pa.schema(fields))
+
+def _write_segment(cache_dir, path, digest, columns, offset):
+    """Stream the CSV (from `offset`) into Arrow IPC segments named by content digest.
+
+    An IPC file has one schema, so a chunk that cannot be cast safely to the
+    current one (e.g. int16 overflow) starts another part. Returns the list
+    of {"file", "rows"} parts, empty for no rows.
+    """
+    part_file = lambda i: digest + (f"-{i}" if i else "") + ".arrow"
+    if os.path.exists(os.path.join(cache_dir, part_file(0))):
+        parts, i = [], 0
+        while os.path.exists(os.path.join(cache_dir, part_file(i))):
+            parts.append({"file": part_file(i), "rows": _read_segment(cache_dir, part_file(i)).num_rows})
+            i += 1
+        return parts
+    parts, writer, schema = [], None, None
+    for chunk in iter_csv_chunks(path, offset=offset, columns=columns):
+        table = _arrow_table(chunk)
+        if writer is not None and table.schema != schema:
+            try:
+                table = table.cast(schema)  # safe cast: widening, or ints with nulls
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                writer.close()
+                writer = None
+        if writer is None:
+            parts.append({"file": part_file(len(parts)), "rows": 0})
+            schema = table.schema
+            writer = pa.ipc.new_file(os.path.join(cache_dir, parts[-1]['file'] + ".tmp"), schema)
+        writer.write_table(table)
+        parts[-1]['rows'] += len(chunk)
+    if writer is not None:
+        writer.close()
+    # part 0 marks the segment as complete, so it is renamed last
+    for seg in reversed(parts):
+        seg_path = os.path.join(cache_dir, seg['file'])
+        os.replace(seg_path + ".tmp", seg_path)
+    return parts
+
+def _read_segment(cache_dir, seg_file):
+    source = pa.memory_map(os.path.join(cache_dir, seg_file), 'r')
+    return pa.ipc.open_file(source).read_all()
+
+def cached_table(path, cache_dir=CACHE_DIR):
+    """Return (arrow table, status) for a CSV, parsing only what the cache lacks.
+
+    status is "hit" (unchanged file), "appended" (file only grew; just the new
+    tail was parsed) or "parsed" (cold or rewritten file).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    size = os.path.getsize(path)
+    manifest = _load_manifest(cache_dir, path)
+    old_size = manifest['size'] if manifest and manifest['size'] <= size else 0
+    digest, prefix, tail = digest_file(path, split=old_size)
+
+    if manifest and manifest['size'] == size and manifest['digest'] == digest:
+        status = "hit"
+    elif (manifest and old_size and prefix == manifest['digest']
+          and _ends_with_newline(path, old_size)):
+        manifest['segments'] += _write_segment(cache_dir, path, tail, manifest['columns'], old_size)
+        manifest.update(size=size, digest=digest)
+        _save_manifest(cache_dir, path, manifest)
+        prune_cache(cache_dir)
+        status = "appended"
+    else:
+        columns = read_header(path)
+        manifest = {"source": os.path.abspath(path), "size": size, "digest": digest,
+                    "columns": columns, "segments": _write_segment(cache_dir, path, digest, columns, 0)}
+        _save_manifest(cache_dir, path, manifest)
+        prune_cache(cache_dir)  # segments of the previous version of this file
+        status = "parsed"
+
+    tables = [_read_segment(cache_dir, s['file']) for s in manifest['segments']]
+    # segments may differ in dtype (a chunk that overflowed int16 stays int64, one with blanks float64)
+    return pa.concat_tables(tables, promote_options="permissive"), status
+
+# ---------------------------
+# Public entry point
+# ---------------------------
+def load_csvs(csv_paths, cache_dir=CACHE_DIR):
+    """Load and concatenate CSVs with compact dtypes.
+
+    With pyarrow available, the frames are assembled from memory-mapped Arrow
+    segments and converted to pandas once, so the merged frame is the only
+    materialized copy. Without it, each CSV is parsed in chunks.
+    """
+    if pa is None or cache_dir is None:
+        frames = []
+        for p in csv_paths:
+            df = read_csv_compact(p)
+            frames.append(df)
+            print(f"Loaded {p} shape={df.shape}")
+        return concat_compact(frames)
+
+    tables = []
+    for p in csv_paths:
+        table, status = cached_table(p, cache_dir)
+        tables.append(table)
+        print(f"Loaded {p} shape={table.shape} ({status})")
+    merged = pa.concat_tables(tables, promote_options="permissive")
+    return merged.to_pandas(strings_to_categorical=True, self_destruct=True)
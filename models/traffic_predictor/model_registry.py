@@ -0,0 +1,104 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from artifact import load_model
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+REGISTRY_DIR = "model_registry"
+INDEX_FILE = "index.json"
+MAX_LOADED = 64
+
+def site_filename(site):
+    # the hash keeps names distinct for ids that sanitize alike ("a b", "a/b", "a_b")
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(site))
+    digest = hashlib.blake2b(str(site).encode(), digest_size=4).hexdigest()
+    return f"site_{safe}-{digest}.tpm"
+
+def write_artifact(root, site, artifact):
+    """Write a site's ModelArtifact file (no index update); returns the file name."""
+    fname = site_filename(site)
+    artifact.save(os.path.join(root, fname))
+    return fname
+
+# ---------------------------
+# Registry
+# ---------------------------
+class ModelRegistry:
+    """Directory of per-site model artifacts with lazy, LRU-evicted loading.
+
+    Each site is a ModelArtifact file, like MODEL_FILE; index.json maps
+    site -> file plus training metrics.
+    """
+
+    def __init__(self, root=REGISTRY_DIR, max_loaded=MAX_LOADED):
+        self.root = root
+        self.max_loaded = max_loaded
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        self.index = self._read_index()
+
+    # ---------- index ----------
+    def _index_path(self):
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _read_index(self):
+        if not os.path.exists(self._index_path()):
+            return {}
+        with open(self._index_path()) as f:
+            return json.load(f)
+
+    def _write_index(self):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(tmp, self._index_path())
+
+    def sites(self):
+        return list(self.index)
+
+    # ---------- write ----------
+    def save(self, site, artifact, metrics=None):
+        fname = write_artifact(self.root, site, artifact)
+        self.register(site, fname, metrics)
+        return os.path.join(self.root, fname)
+
+    def register(self, site, fname, metrics=None):
+        """Record an artifact file already written into the registry directory."""
+        with self._lock:
+            self.index[str(site)] = {"file": fname, "metrics": metrics or {}, "trained_at": time.time()}
+            self._write_index()
+            self._cache.pop(str(site), None)
+
+    # ---------- read ----------
+    def get(self, site):
+        site = str(site)
+        with self._lock:
+            artifact = self._cache.get(site)
+            if artifact is not None:
+                self._cache.move_to_end(site)
+                return artifact
+            entry = self.index.get(site)
+        if entry is None:
+            raise KeyError(f"No model registered for site {site!r}")
+        artifact = load_model(os.path.join(self.root, entry['file']))
+        with self._lock:
+            self.loads += 1
+            self._cache[site] = artifact
+            self._cache.move_to_end(site)
+            while len(self._cache) > self.max_loaded:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return artifact
+
+    def predict(self, site, X):
+        return self.get(site).predict(X)
@@ -0,0 +1,127 @@
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+from congestion_predictor import (
+    CSV1, CSV2, SAMPLE_PER_HOUR, TEST_RATIO, FEATURE_COLS, XGB_PARAMS, NUM_ROUND,
+    load_and_merge, rebuild_timestamps, feature_engineering, create_future_targets,
+    chronological_train_test_split, label_thresholds,
+)
+from artifact import ModelArtifact, labels_for, load_model
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+HORIZONS = {
+    "15min": 1,
+    "1h": SAMPLE_PER_HOUR,
+    "6h": SAMPLE_PER_HOUR * 6,
+    "24h": SAMPLE_PER_HOUR * 24,
+}
+MULTI_MODEL_FILE = "model_xgb_multi.tpm"
+MAX_BIN = 256
+# "one_output_per_tree" grows one tree per horizon each round; "multi_output_tree"
+# grows vector-leaf trees shared by all horizons (fewer, larger trees)
+MULTI_STRATEGY = "one_output_per_tree"
+
+# ---------------------------
+# Prepare / train
+# ---------------------------
+def prepare_multi_horizon_data(df, target_cols):
+    # keep only rows where every horizon has a target, so all share one X
+    df_model = df.dropna(subset=target_cols)
+    feature_cols = [c for c in FEATURE_COLS if c in df_model.columns]
+    X = df_model[feature_cols].astype(float)
+    Y = df_model[target_cols].astype(float)
+    print("Prepared multi-horizon data: X shape", X.shape, "Y shape", Y.shape)
+    return X, Y, feature_cols
+
+def train_multi_horizon(X_train, Y_train, X_val=None, Y_val=None, num_round=NUM_ROUND,
+                        multi_strategy=MULTI_STRATEGY):
+    """Train every horizon in one boosting run over a single quantized feature matrix.
+
+    Trees are invariant to per-feature scaling, so no scaler is fitted here.
+    """
+    dtrain = xgb.QuantileDMatrix(X_train, label=Y_train, max_bin=MAX_BIN)
+    evallist = [(dtrain, 'train')]
+    if X_val is not None:
+        # the validation matrix reuses the training bin boundaries
+        evallist.append((xgb.QuantileDMatrix(X_val, label=Y_val, ref=dtrain), 'eval'))
+    params = dict(XGB_PARAMS, tree_method="hist", max_bin=MAX_BIN, multi_strategy=multi_strategy)
+    return xgb.train(params, dtrain, num_boost_round=num_round, evals=evallist, verbose_eval=25)
+
+# ---------------------------
+# Bundle / inference
+# ---------------------------
+class MultiHorizonForecaster:
+    """Predicts several horizons from one multi-output booster."""
+
+    def __init__(self, model, feature_cols, horizons, thresholds):
+        self.model = model
+        self.feature_cols = list(feature_cols)
+        self.horizons = dict(horizons)
+        self.thresholds = dict(thresholds)
+        self._index = {name: j for j, name in enumerate(self.horizons)}
+
+    def save(self, path=MULTI_MODEL_FILE):
+        ModelArtifact(self.model, self.feature_cols, self.thresholds,
+                      meta={"horizons": self.horizons}).save(path)
+
+    @classmethod
+    def load(cls, path=MULTI_MODEL_FILE):
+        art = load_model(path)
+        return cls(art.model, art.feature_cols, art.meta['horizons'], art.label_thresholds)
+
+    def predict(self, X, horizons=None):
+        """Return {horizon_name: predictions} for the requested horizons (all by default)."""
+        horizons = list(self.horizons) if horizons is None else list(horizons)
+        unknown = [h for h in horizons if h not in self._index]
+        if unknown:
+            raise KeyError(f"Unknown horizon(s) {unknown}; available: {list(self.horizons)}")
+        if hasattr(X, 'columns'):
+            X = X[self.feature_cols]
+        preds = np.asarray(self.model.inplace_predict(np.asarray(X, dtype=float)))
+        preds = preds.reshape(len(preds), -1)
+        return {h: preds[:, self._index[h]] for h in horizons}
+
+    def labels(self, preds):
+        return {h: labels_for(self.thresholds[h], p) for h, p in preds.items()}
+
+def evaluate_multi_horizon(forecaster, X_test, Y_test):
+    preds = forecaster.predict(X_test)
+    print("Evaluation on test set:")
+    for j, (name, p) in enumerate(preds.items()):
+        y = Y_test.iloc[:, j].values
+        print(f"  {name:>6}: MSE {mean_squared_error(y, p):.3f}  MAE {mean_absolute_error(y, p):.3f}  R2 {r2_score(y, p):.3f}")
+    return preds
+
+# ---------------------------
+# Main
+# ---------------------------
+def main(horizons=HORIZONS):
+    df = load_and_merge([CSV1, CSV2])
+    df_ts = rebuild_timestamps(df)
+    df_feat = feature_engineering(df_ts)
+    df_target, target_cols = create_future_targets(df_feat, horizons)
+    X, Y, feature_cols = prepare_multi_horizon_data(df_target, target_cols)
+    X_train, X_test, Y_train, Y_test = chronological_train_test_split(X, Y, TEST_RATIO)
+
+    val_split = int(0.95 * len(X_train))
+    print(f"Training multi-horizon XGBoost for {list(horizons)}...")
+    model = train_multi_horizon(X_train.iloc[:val_split], Y_train.iloc[:val_split],
+                                X_train.iloc[val_split:], Y_train.iloc[val_split:])
+
+    thresholds = {name: label_thresholds(Y_train.iloc[:, j].values) for j, name in enumerate(horizons)}
+    forecaster = MultiHorizonForecaster(model, feature_cols, horizons, thresholds)
+    evaluate_multi_horizon(forecaster, X_test, Y_test)
+
+    forecaster.save(MULTI_MODEL_FILE)
+    print("Saved multi-horizon model to", MULTI_MODEL_FILE)
+
+    sample = forecaster.predict(X.iloc[-1:])
+    labels = forecaster.labels(sample)
+    for name in horizons:
+        print(f"  {name:>6} ahead: {sample[name][0]:.1f} -> {labels[name][0]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# predictor_server.py
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from pydantic import BaseModel, Field, field_validator
+from typing import Annotated, Dict, List, Union
+import uvicorn
+
+from predictor_service import CongestionPredictor
+
+predictor = None
+
+@asynccontextmanager
+async def lifespan(app):
+    global predictor
+    predictor = CongestionPredictor()
+    yield
+    predictor.close()
+
+app = FastAPI(title="Congestion Forecast API", lifespan=lifespan)
+
+class ForecastRequest(BaseModel):
+    # one row per intersection: {feature: value} dicts or lists in feature_cols order
+    rows: Union[Annotated[List[Dict[str, float]], Field(min_length=1)],
+                Annotated[List[List[float]], Field(min_length=1)]]
+
+    @field_validator("rows")
+    @classmethod
+    def rows_match_features(cls, rows):
+        # feature_cols come from the loaded model, so shape errors are 422s rather than 500s in to_matrix
+        cols = predictor.feature_cols if predictor is not None else None
+        if cols is None:
+            return rows
+        for i, row in enumerate(rows):
+            if isinstance(row, dict):
+                missing = [c for c in cols if c not in row]
+                if missing:
+                    raise ValueError(f"row {i} is missing features {missing}")
+            elif len(row) != len(cols):
+                raise ValueError(f"row {i} has {len(row)} values, expected {len(cols)} ({cols})")
+        return rows
+
+@app.post("/predict")
+async def predict(req: ForecastRequest):
+    preds = await predictor.predict_async(req.rows)
+    return {"predictions": [round(float(p), 1) for p in preds],
+            "labels": predictor.labels(preds).tolist()}
+
+@app.get("/features")
+def features():
+    return {"feature_cols": predictor.feature_cols}
+
+@app.get("/stats")
+def stats():
+    return predictor.stats()
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=8001)
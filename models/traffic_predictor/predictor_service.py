@@ -0,0 +1,161 @@
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+import numpy as np
+import pandas as pd
+
+from artifact import default_model_file, load_model
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+MAX_BATCH_ROWS = 4096
+MAX_WAIT_MS = 2.0
+LATENCY_WINDOW = 10_000
+
+# ---------------------------
+# Predictor service
+# ---------------------------
+def _settle(set_outcome, value):
+    try:
+        set_outcome(value)
+    except InvalidStateError:  # the caller cancelled (e.g. a dropped async request)
+        pass
+
+class CongestionPredictor:
+    """Long-lived predictor: loads the bundle once and micro-batches concurrent requests.
+
+    `predict` runs a batch synchronously on the caller's thread. `submit` /
+    `predict_async` enqueue rows for a background worker that merges whatever
+    arrives within `max_wait_ms` (up to `max_batch_rows`) into one model call.
+    """
+
+    def __init__(self, model_file=None, max_batch_rows=MAX_BATCH_ROWS,
+                 max_wait_ms=MAX_WAIT_MS, latency_window=LATENCY_WINDOW):
+        self.artifact = load_model(model_file or default_model_file())
+        self.feature_cols = self.artifact.feature_cols
+        self.thresholds = np.asarray(self.artifact.label_thresholds, dtype=float)
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._latencies = deque(maxlen=latency_window)
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self._worker = threading.Thread(target=self._run, name="predictor-batcher", daemon=True)
+        self._worker.start()
+
+    # ---------- input / output ----------
+    def to_matrix(self, rows):
+        """Accept a DataFrame, a list of {feature: value} dicts, or a 2-D array in feature_cols order."""
+        if isinstance(rows, pd.DataFrame):
+            return rows[self.feature_cols].to_numpy(dtype=float)
+        if not len(rows):
+            raise ValueError("No rows to predict")
+        if isinstance(rows[0], dict):
+            missing = sorted({c for r in rows for c in self.feature_cols if c not in r})
+            if missing:
+                raise ValueError(f"Rows are missing features {missing}")
+            return np.array([[r[c] for c in self.feature_cols] for r in rows], dtype=float)
+        X = np.asarray(rows, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.feature_cols):
+            raise ValueError(f"Expected {len(self.feature_cols)} features {self.feature_cols}, got {X.shape[1]}")
+        return X
+
+    def labels(self, preds):
+        return self.artifact.labels(preds)
+
+    def _predict_matrix(self, X):
+        return self.artifact.predict(X)
+
+    # ---------- synchronous ----------
+    def predict(self, rows):
+        t0 = time.perf_counter()
+        preds = self._predict_matrix(self.to_matrix(rows))
+        self._record(time.perf_counter() - t0, len(preds), batches=1)
+        return preds
+
+    # ---------- micro-batched ----------
+    def submit(self, rows):
+        fut = Future()
+        X = self.to_matrix(rows)
+        self._queue.put((X, fut, time.perf_counter()))
+        return fut
+
+    async def predict_async(self, rows):
+        return await asyncio.wrap_future(self.submit(rows))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            items, n_rows = [item], len(item[0])
+            stop = False
+            deadline = time.perf_counter() + self.max_wait
+            while n_rows < self.max_batch_rows:
+                timeout = deadline - time.perf_counter()
+                try:
+                    nxt = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                items.append(nxt)
+                n_rows += len(nxt[0])
+            self._run_batch(items)
+            if stop:
+                return
+
+    def _run_batch(self, items):
+        # any error fails this batch's futures; raising here would kill the worker
+        # and leave every pending and later request hanging
+        try:
+            X = items[0][0] if len(items) == 1 else np.concatenate([it[0] for it in items])
+            preds = self._predict_matrix(X)
+        except Exception as e:
+            for _, fut, _ in items:
+                _settle(fut.set_exception, e)
+            return
+        done = time.perf_counter()
+        start = 0
+        for Xi, fut, t_submit in items:
+            _settle(fut.set_result, preds[start:start + len(Xi)])
+            start += len(Xi)
+            self._record(done - t_submit, len(Xi))
+        with self._stats_lock:
+            self.batches += 1
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    # ---------- stats ----------
+    def _record(self, latency, n_rows, batches=0):
+        with self._stats_lock:
+            self._latencies.append(latency)
+            self.requests += 1
+            self.rows += n_rows
+            self.batches += batches
+
+    def stats(self):
+        with self._stats_lock:
+            lat = np.array(self._latencies) * 1000.0
+            requests, rows, batches = self.requests, self.rows, self.batches
+        p50, p99 = np.percentile(lat, [50, 99]) if len(lat) else (0.0, 0.0)
+        return {
+            "requests": requests,
+            "rows": rows,
+            "batches": batches,
+            "avg_batch_rows": round(rows / batches, 1) if batches else 0.0,
+            "latency_ms_p50": round(float(p50), 3),
+            "latency_ms_p99": round(float(p99), 3),
+        }
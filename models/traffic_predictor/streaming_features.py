@@ -0,0 +1,171 @@
+import os
+import json
+import math
+import numpy as np
+import pandas as pd
+
+from congestion_predictor import FEATURE_COLS, SAMPLE_PER_HOUR
+
+# ---------------------------
+# CONFIG (mirrors feature_engineering)
+# ---------------------------
+LAG_STEPS = (1, SAMPLE_PER_HOUR, SAMPLE_PER_HOUR * 24)
+WINDOW_1H = SAMPLE_PER_HOUR
+WINDOW_6H = SAMPLE_PER_HOUR * 6
+BUFFER_LEN = max(max(LAG_STEPS), WINDOW_6H)
+SNAPSHOT_VERSION = 1
+
+# ---------------------------
+# Per-site state
+# ---------------------------
+def time_features(timestamp):
+    """(hour, minute, dayofweek, is_weekend, month) or None for a missing timestamp."""
+    if timestamp is None or pd.isna(timestamp):
+        return None
+    ts = pd.Timestamp(timestamp)
+    dow = ts.dayofweek
+    return ts.hour, ts.minute, dow, int(dow in (5, 6)), ts.month
+
+class SiteFeatureState:
+    """O(1) lag/rolling state for one traffic series.
+
+    Features for an observation only use *previous* values, like the
+    shift(1)'d columns in feature_engineering. Before enough history exists,
+    lags fall back to the first observation and the 6h std to 0, which is
+    what the batch ffill/bfill produces for the head of a series.
+    """
+
+    __slots__ = ("buf", "pos", "count", "first", "sum_1h", "sum_6h",
+                 "n_6h", "mean_6h", "m2_6h", "time_feats")
+
+    def __init__(self):
+        self.buf = np.zeros(BUFFER_LEN, dtype=float)  # ring buffer of past totals
+        self.pos = 0          # next write slot
+        self.count = 0        # observations seen
+        self.first = None
+        self.sum_1h = 0.0
+        self.sum_6h = 0.0
+        self.n_6h = 0         # Welford state over the 6h window
+        self.mean_6h = 0.0
+        self.m2_6h = 0.0
+        self.time_feats = None
+
+    def _ago(self, k):
+        return self.buf[(self.pos - k) % BUFFER_LEN]
+
+    def features(self, time_feats, total):
+        """Feature vector (FEATURE_COLS order) for a new observation, without consuming it."""
+        if self.count == 0:
+            lags = (total,) * len(LAG_STEPS)
+            mean_1h = mean_6h = total
+            std_6h = 0.0
+        else:
+            lags = tuple(self._ago(k) if self.count >= k else self.first for k in LAG_STEPS)
+            mean_1h = self.sum_1h / min(self.count, WINDOW_1H)
+            mean_6h = self.sum_6h / self.n_6h
+            std_6h = math.sqrt(max(self.m2_6h, 0.0) / (self.n_6h - 1)) if self.n_6h > 1 else 0.0
+        return np.array((total, *time_feats, *lags, mean_1h, mean_6h, std_6h), dtype=float)
+
+    def push(self, total):
+        """Consume an observation into the running sums and ring buffer."""
+        if self.first is None:
+            self.first = total
+        if self.count >= WINDOW_1H:
+            self.sum_1h -= self._ago(WINDOW_1H)
+        if self.count >= WINDOW_6H:
+            old = self._ago(WINDOW_6H)
+            self.sum_6h -= old
+            self.n_6h -= 1
+            delta = old - self.mean_6h
+            self.mean_6h -= delta / self.n_6h
+            self.m2_6h -= delta * (old - self.mean_6h)
+        self.sum_1h += total
+        self.sum_6h += total
+        self.n_6h += 1
+        delta = total - self.mean_6h
+        self.mean_6h += delta / self.n_6h
+        self.m2_6h += delta * (total - self.mean_6h)
+
+        self.buf[self.pos] = total
+        self.pos = (self.pos + 1) % BUFFER_LEN
+        self.count += 1
+
+    def update(self, timestamp, total):
+        time_feats = time_features(timestamp)
+        if time_feats is None:
+            time_feats = self.time_feats  # ffill, as in feature_engineering
+            if time_feats is None:
+                raise ValueError("First observation of a site needs a valid timestamp")
+        total = float(total)
+        feats = self.features(time_feats, total)
+        self.push(total)
+        self.time_feats = time_feats
+        return feats
+
+    def to_dict(self):
+        return {
+            "buf": self.buf.tolist(), "pos": self.pos, "count": self.count, "first": self.first,
+            "sum_1h": self.sum_1h, "sum_6h": self.sum_6h, "n_6h": self.n_6h,
+            "mean_6h": self.mean_6h, "m2_6h": self.m2_6h,
+            "time_feats": list(self.time_feats) if self.time_feats is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        st = cls()
+        st.buf = np.asarray(d["buf"], dtype=float)
+        for k in ("pos", "count", "first", "sum_1h", "sum_6h", "n_6h", "mean_6h", "m2_6h"):
+            setattr(st, k, d[k])
+        st.time_feats = tuple(d["time_feats"]) if d["time_feats"] is not None else None
+        return st
+
+# ---------------------------
+# Multi-site engine
+# ---------------------------
+class StreamingFeatureEngine:
+    """Incremental equivalent of feature_engineering for many sites.
+
+    update(site, timestamp, total) returns the FEATURE_COLS vector for the new
+    15-minute sample in O(1). Site keys are stored as strings in snapshots.
+    """
+
+    feature_cols = FEATURE_COLS
+
+    def __init__(self):
+        self.sites = {}
+
+    def update(self, site, timestamp, total):
+        st = self.sites.get(site)
+        if st is None:
+            st = self.sites[site] = SiteFeatureState()
+        return st.update(timestamp, total)
+
+    def warm_start(self, site, timestamps, totals):
+        """Replay history for a site; returns the feature matrix for those rows."""
+        return np.vstack([self.update(site, ts, v) for ts, v in zip(timestamps, totals)])
+
+    # ---------- snapshot / restore ----------
+    def snapshot(self):
+        return {"version": SNAPSHOT_VERSION, "feature_cols": list(FEATURE_COLS),
+                "sites": {str(k): st.to_dict() for k, st in self.sites.items()}}
+
+    @classmethod
+    def restore(cls, snap):
+        if snap.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {snap.get('version')}")
+        if snap.get("feature_cols") != list(FEATURE_COLS):
+            raise ValueError("Snapshot was taken with a different feature set")
+        eng = cls()
+        eng.sites = {k: SiteFeatureState.from_dict(d) for k, d in snap["sites"].items()}
+        return eng
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.restore(json.load(f))
@@ -0,0 +1,139 @@
+import argparse
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+import congestion_predictor as cp
+from fleet_train import SITE_COL
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+START_DATE = "2023-01-10"
+CHUNK_ROWS = 1_000_000       # rows generated per chunk; memory stays O(chunk) for any output size
+GAPS_PER_30_DAYS = 1.0       # outages per site; each drops GAP_STEPS rows (> 2 * FREQ_MINUTES, so detected)
+GAP_STEPS = (3, 48)          # 45 min .. 12 h
+NOISE_SD = 0.30              # multiplicative noise on Total ...
+NOISE_AR = 0.5               # ... AR(1)-correlated across steps
+SITE_SCALE_SD = 0.25         # lognormal spread of site volumes
+TOTAL_RANGE = (15, 300)
+# mean Total by hour of day in Traffic.csv / TrafficTwoMonth.csv
+HOURLY_PROFILE = np.array([43, 42, 43, 46, 98, 114, 169, 168, 170, 128, 119, 104,
+                           105, 124, 127, 121, 179, 179, 163, 122, 119, 117, 43, 42], dtype=float)
+WEEKLY_PROFILE = np.array([1.00, 1.02, 1.02, 1.03, 1.08, 0.88, 0.80])  # Monday..Sunday
+VEHICLE_MIX = [('CarCount', 0.60), ('BikeCount', 0.13), ('BusCount', 0.13), ('TruckCount', 0.14)]
+SITUATION_BINS = [0, 60, 112, 168, np.inf]   # low / normal / high / heavy by Total
+SITUATIONS = ['low', 'normal', 'high', 'heavy']
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+STEPS_PER_DAY = 24 * cp.SAMPLE_PER_HOUR
+
+def _time_labels():
+    minutes = np.arange(STEPS_PER_DAY) * cp.FREQ_MINUTES
+    h, m = minutes // 60, minutes % 60
+    return [f"{(hh + 11) % 12 + 1}:{mm:02d}:00 {'AM' if hh < 12 else 'PM'}" for hh, mm in zip(h, m)]
+
+TIME_LABELS = _time_labels()
+# 15-minute profile, linearly interpolated between hour means
+STEP_PROFILE = np.interp(np.arange(STEPS_PER_DAY) / cp.SAMPLE_PER_HOUR,
+                         np.arange(25), np.append(HOURLY_PROFILE, HOURLY_PROFILE[0]))
+
+# ---------------------------
+# Generation
+# ---------------------------
+def iter_site_chunks(rows, site=0, seed=0, start=START_DATE, gaps_per_30_days=GAPS_PER_30_DAYS,
+                     chunk_rows=CHUNK_ROWS):
+    """Yield one site's series as DataFrame chunks in the Traffic.csv schema (ingest's compact dtypes).
+
+    `rows` counts 15-minute steps before gaps are cut out, so slightly fewer
+    rows are produced. Output is deterministic for a given (seed, site, chunk_rows).
+    """
+    rng = np.random.default_rng([seed, site])
+    scale = rng.lognormal(0.0, SITE_SCALE_SD)
+    shift = rng.integers(-2, 3)                     # +-30 min rush-hour offset per site
+    profile = np.roll(STEP_PROFILE, shift) * scale
+    start_day = np.datetime64(start, 'D')
+    gap_p = gaps_per_30_days / (30 * STEPS_PER_DAY)
+    zi = np.zeros(1)
+    gap_left = 0
+    for lo in range(0, rows, chunk_rows):
+        idx = np.arange(lo, min(lo + chunk_rows, rows))
+        step, day = idx % STEPS_PER_DAY, idx // STEPS_PER_DAY
+        days = start_day + day
+        dow = (days.astype(np.int64) + 3) % 7      # 1970-01-01 was a Thursday
+        noise, zi = lfilter([1.0], [1.0, -NOISE_AR], rng.normal(0.0, NOISE_SD * np.sqrt(1 - NOISE_AR ** 2), len(idx)), zi=zi)
+        total = np.clip(np.rint(profile[step] * WEEKLY_PROFILE[dow] * np.exp(noise)), *TOTAL_RANGE).astype(np.int64)
+
+        # split Total into vehicle classes with the observed mix
+        counts, left, share_left = {}, total, 1.0
+        for name, share in VEHICLE_MIX[:-1]:
+            counts[name] = rng.binomial(left, share / share_left)
+            left, share_left = left - counts[name], share_left - share
+        counts[VEHICLE_MIX[-1][0]] = left
+
+        # outages: runs of missing rows, carried across chunk boundaries
+        keep = np.ones(len(idx), dtype=bool)
+        pos = 0
+        if gap_left:
+            keep[:gap_left] = False
+            pos, gap_left = gap_left, max(0, gap_left - len(idx))
+        for g in np.flatnonzero(rng.random(len(idx)) < gap_p):
+            if g < pos:
+                continue
+            length = int(rng.integers(GAP_STEPS[0], GAP_STEPS[1] + 1))
+            keep[g:g + length] = False
+            pos = g + length
+            gap_left = max(0, g + length - len(idx))
+
+        day_of_month = (days - days.astype('datetime64[M]')).astype(np.int64) + 1
+        frame = pd.DataFrame({
+            'Time': pd.Categorical.from_codes(step, TIME_LABELS),
+            'Date': day_of_month.astype(np.int8),
+            'Day of the week': pd.Categorical.from_codes(dow, DAY_NAMES),
+            **{name: c.astype(np.int16) for name, c in counts.items()},
+            'Total': total.astype(np.int16),
+            'Traffic Situation': pd.Categorical.from_codes(
+                np.digitize(total, SITUATION_BINS[1:-1]), SITUATIONS),
+        })
+        frame = frame[keep].reset_index(drop=True) if not keep.all() else frame
+        if len(frame):
+            yield frame
+
+def iter_chunks(rows, sites=1, seed=0, **kwargs):
+    """All sites one after another; with sites > 1 each chunk carries a SITE_COL (fleet_train) column."""
+    per_site = rows // sites
+    for site in range(sites):
+        for frame in iter_site_chunks(per_site, site=site, seed=seed, **kwargs):
+            if sites > 1:
+                frame.insert(0, SITE_COL, f"site{site:04d}")
+            yield frame
+
+def generate_frame(rows, sites=1, seed=0, **kwargs):
+    frames = list(iter_chunks(rows, sites, seed, **kwargs))
+    df = pd.concat(frames, ignore_index=True)
+    if sites > 1:
+        df[SITE_COL] = df[SITE_COL].astype('category')
+    return df
+
+def write_csv(path, rows, sites=1, seed=0, **kwargs):
+    written = 0
+    for i, frame in enumerate(iter_chunks(rows, sites, seed, **kwargs)):
+        frame.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        written += len(frame)
+    return written
+
+# ---------------------------
+# Main
+# ---------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic traffic in the Traffic.csv schema.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="total 15-minute steps over all sites, before gaps")
+    parser.add_argument("--sites", type=int, default=1, help=f"sites > 1 adds a '{SITE_COL}' column (fleet_train)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gaps-per-30-days", type=float, default=GAPS_PER_30_DAYS)
+    parser.add_argument("--out", default="synthetic_traffic.csv")
+    args = parser.parse_args()
+    n = write_csv(args.out, args.rows, args.sites, args.seed, gaps_per_30_days=args.gaps_per_30_days)
+    print(f"Wrote {n:,} rows ({args.sites} site(s)) to {args.out}")
+
+if __name__ == "__main__":
+    main()
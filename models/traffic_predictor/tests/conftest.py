@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the modules import each other as top-level scripts (run from this directory)
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PACKAGE_DIR)
@@ -0,0 +1,57 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+import congestion_predictor as cp
+import ingest
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def csv_with_blank(tmp_path):
+    """Traffic.csv with one CarCount cell and one Total cell left empty."""
+    df = pd.read_csv(os.path.join(PACKAGE_DIR, cp.CSV1), dtype=str)
+    df.loc[10, 'CarCount'] = None
+    df.loc[2000, 'Total'] = None
+    path = tmp_path / "blank.csv"
+    df.to_csv(path, index=False)
+    return str(path), len(df)
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_missing_count_loads_as_nan(csv_with_blank, tmp_path, use_cache):
+    path, rows = csv_with_blank
+    df = cp.load_and_merge([path], cache_dir=str(tmp_path / "cache") if use_cache else None)
+    assert len(df) == rows
+    assert np.isnan(df.loc[10, 'CarCount']) and np.isnan(df.loc[2000, 'Total'])
+    assert df['BusCount'].dtype == np.int16  # untouched columns stay compact
+    features = cp.feature_engineering(cp.rebuild_timestamps(df))
+    assert not features['traffic_total'].isna().any()
+
+def test_chunks_without_blanks_stay_compact(csv_with_blank):
+    path, rows = csv_with_blank
+    chunks = list(ingest.iter_csv_chunks(path, chunk_rows=1000))
+    assert chunks[0]['CarCount'].dtype == np.float64
+    assert all(c['CarCount'].dtype == np.int16 for c in chunks[1:])
+    assert len(ingest.concat_compact(chunks)) == rows
+
+def test_int16_overflow_widens(tmp_path):
+    path = tmp_path / "big.csv"
+    path.write_text("Time,Date,Day of the week,CarCount,BikeCount,BusCount,TruckCount,Total,Traffic Situation\n"
+                    "12:00:00 AM,10,Tuesday,40000,0,0,0,40000,heavy\n")
+    chunk = next(ingest.iter_csv_chunks(str(path)))
+    assert chunk['CarCount'].dtype == np.int64 and chunk.loc[0, 'Total'] == 40000
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_blank_and_overflow_in_later_chunks(tmp_path, monkeypatch, use_cache):
+    df = pd.read_csv(os.path.join(PACKAGE_DIR, cp.CSV1), dtype=str)
+    df.loc[1500, 'CarCount'] = None
+    df.loc[2500, ['CarCount', 'Total']] = '40000'
+    path = tmp_path / "mixed.csv"
+    df.to_csv(path, index=False)
+    monkeypatch.setattr(ingest, "CHUNK_ROWS", 1000)
+    for _ in range(2):  # cold parse, then cache hit
+        out = ingest.load_csvs([str(path)], cache_dir=str(tmp_path / "cache") if use_cache else None)
+        assert len(out) == len(df)
+        assert np.isnan(out.loc[1500, 'CarCount']) and out.loc[2500, 'Total'] == 40000
+        assert out['CarCount'].sum() == pd.to_numeric(df['CarCount']).sum()
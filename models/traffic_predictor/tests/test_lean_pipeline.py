@@ -0,0 +1,38 @@
+import os
+import numpy as np
+import pytest
+from sklearn.metrics import mean_absolute_error, r2_score
+
+import congestion_predictor as cp
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NUM_ROUND = 30
+CHUNK_ROWS = 1000  # several DataIter batches on the bundled data
+
+@pytest.fixture(scope="module")
+def runs():
+    df = cp.load_and_merge([os.path.join(PACKAGE_DIR, p) for p in (cp.CSV1, cp.CSV2)], cache_dir=None)
+    out = {}
+    for lean in (False, True):
+        X, feature_cols, (X_train, X_test, y_train, y_test) = cp.build_datasets(df.copy(), lean)
+        X_sub, y_sub, X_val, y_val = cp.validation_split(X_train, y_train)
+        model, scaler = cp.train_xgboost(X_sub, y_sub, X_val, y_val, verbose_eval=False, num_round=NUM_ROUND,
+                                         chunk_rows=CHUNK_ROWS if lean else None)
+        preds = cp.evaluate_model(model, scaler, X_test, y_test)
+        out["lean" if lean else "default"] = {"X": np.asarray(X), "feature_cols": feature_cols,
+                                              "y_test": np.asarray(y_test), "preds": preds}
+    return out
+
+def test_lean_features_are_default_rounded_to_float32(runs):
+    default, lean = runs["default"], runs["lean"]
+    assert lean["feature_cols"] == default["feature_cols"]
+    assert lean["X"].dtype == cp.LEAN_DTYPE
+    np.testing.assert_array_equal(lean["X"], default["X"].astype(cp.LEAN_DTYPE))
+    np.testing.assert_array_equal(lean["y_test"], default["y_test"].astype(cp.LEAN_DTYPE))
+
+def test_lean_metrics_match_default(runs):
+    default, lean = runs["default"], runs["lean"]
+    np.testing.assert_array_equal(lean["preds"], default["preds"])
+    y = default["y_test"]
+    assert mean_absolute_error(y, lean["preds"]) == pytest.approx(mean_absolute_error(y, default["preds"]))
+    assert r2_score(y, lean["preds"]) == pytest.approx(r2_score(y, default["preds"]))
@@ -0,0 +1,25 @@
+import numpy as np
+import xgboost as xgb
+
+from artifact import ModelArtifact
+from model_registry import ModelRegistry, site_filename
+
+def tiny_artifact(value):
+    """A one-feature booster that predicts roughly `value` everywhere."""
+    X = np.zeros((8, 1))
+    model = xgb.train({"base_score": value, "max_depth": 1}, xgb.DMatrix(X, label=np.full(8, value)), 1)
+    return ModelArtifact(model, ["f"], [0.0, 1.0])
+
+def test_site_filenames_are_distinct():
+    sites = ["a b", "a/b", "a_b", "a__b", 1, "1.0"]
+    assert len({site_filename(s) for s in sites}) == len(sites)
+    assert site_filename("a_b") == site_filename("a_b")
+
+def test_sites_that_sanitize_alike_keep_their_models(tmp_path):
+    reg = ModelRegistry(str(tmp_path))
+    values = {"a b": 10.0, "a/b": 20.0, "a_b": 30.0}
+    for site, v in values.items():
+        reg.save(site, tiny_artifact(v))
+    fresh = ModelRegistry(str(tmp_path))  # nothing cached, every get() loads its file
+    for site, v in values.items():
+        assert np.allclose(fresh.predict(site, np.zeros((1, 1))), v)
@@ -0,0 +1,40 @@
+import time
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from artifact import ModelArtifact
+from predictor_service import CongestionPredictor
+
+FEATURES = ["a", "b", "c"]
+
+@pytest.fixture
+def predictor(tmp_path):
+    X = np.random.default_rng(0).random((32, len(FEATURES)))
+    model = xgb.train({"max_depth": 2}, xgb.DMatrix(X, label=X.sum(axis=1)), 5)
+    path = str(tmp_path / "model.tpm")
+    ModelArtifact(model, FEATURES, [0.5, 1.0]).save(path)
+    p = CongestionPredictor(path, max_wait_ms=50)
+    yield p
+    p.close()
+
+def test_bad_batch_fails_its_futures_and_worker_survives(predictor):
+    from concurrent.futures import Future
+    good, bad = Future(), Future()
+    t = time.perf_counter()
+    # queued together, these cannot be concatenated (3 vs 2 columns)
+    predictor._queue.put((np.zeros((1, 3)), good, t))
+    predictor._queue.put((np.zeros((1, 2)), bad, t))
+    for fut in (good, bad):
+        with pytest.raises(ValueError):
+            fut.result(timeout=5)
+    assert predictor._worker.is_alive()
+    rows = [dict(zip(FEATURES, (0.1, 0.2, 0.3)))]
+    np.testing.assert_allclose(predictor.submit(rows).result(timeout=5), predictor.predict(rows))
+
+def test_cancelled_future_does_not_kill_worker(predictor):
+    rows = [dict(zip(FEATURES, (0.1, 0.2, 0.3)))]
+    fut = predictor.submit(rows)
+    fut.cancel()
+    assert predictor.submit(rows).result(timeout=5).shape == (1,)
+    assert predictor._worker.is_alive()
@@ -0,0 +1,31 @@
+import os
+import json
+import numpy as np
+import pytest
+
+import congestion_predictor as cp
+from streaming_features import FEATURE_COLS, StreamingFeatureEngine
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope="module")
+def batch_features():
+    df = cp.load_and_merge([os.path.join(PACKAGE_DIR, p) for p in (cp.CSV1, cp.CSV2)], cache_dir=None)
+    return cp.feature_engineering(cp.rebuild_timestamps(df))
+
+def test_replay_matches_feature_engineering(batch_features):
+    df = batch_features
+    streamed = StreamingFeatureEngine().warm_start("site", df["timestamp"], df["traffic_total"])
+    expected = df[FEATURE_COLS].to_numpy(dtype=float)
+    for j, col in enumerate(FEATURE_COLS):
+        np.testing.assert_array_equal(streamed[:, j], expected[:, j], err_msg=col)
+
+def test_snapshot_restore_mid_stream(batch_features):
+    df = batch_features
+    ts, totals = df["timestamp"].to_numpy(), df["traffic_total"].to_numpy()
+    k = len(df) // 2
+    eng = StreamingFeatureEngine()
+    eng.warm_start("site", ts[:k], totals[:k])
+    restored = StreamingFeatureEngine.restore(json.loads(json.dumps(eng.snapshot())))  # as save/load
+    np.testing.assert_array_equal(restored.warm_start("site", ts[k:], totals[k:]),
+                                  df[FEATURE_COLS].to_numpy(dtype=float)[k:])
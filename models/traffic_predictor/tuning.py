@@ -0,0 +1,131 @@
+import os
+import math
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import xgboost as xgb
+from threadpoolctl import threadpool_limits
+
+from congestion_predictor import XGB_PARAMS
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+N_TRIALS = 27
+MIN_ROUNDS = 50
+MAX_ROUNDS = 800
+REDUCTION = 3               # keep the best 1/REDUCTION configs at each rung
+EARLY_STOPPING_ROUNDS = 30
+MAX_BIN = 256
+SEARCH_SPACE = {
+    "max_depth": ("int", 3, 10),
+    "eta": ("log", 0.02, 0.3),
+    "subsample": ("float", 0.5, 1.0),
+    "colsample_bytree": ("float", 0.5, 1.0),
+    "min_child_weight": ("log", 1.0, 20.0),
+}
+
+# ---------------------------
+# Search space
+# ---------------------------
+def sample_params(rng, space=SEARCH_SPACE):
+    params = {}
+    for name, (kind, lo, hi) in space.items():
+        if kind == "int":
+            params[name] = int(rng.integers(lo, hi + 1))
+        elif kind == "log":
+            params[name] = float(math.exp(rng.uniform(math.log(lo), math.log(hi))))
+        else:
+            params[name] = float(rng.uniform(lo, hi))
+    return params
+
+# ---------------------------
+# Worker: quantized matrices are built once per process and reused by every trial
+# ---------------------------
+_DATA = {}
+
+def _init_worker(X_train, y_train, X_val, y_val, threads):
+    # BLAS/OpenMP are already loaded here, so the env vars alone do nothing for
+    # them; cap the live pools as fleet_train._init_worker does
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    threadpool_limits(limits=threads)
+    dtrain = xgb.QuantileDMatrix(X_train, label=y_train, max_bin=MAX_BIN, nthread=threads)
+    _DATA["dtrain"] = dtrain
+    _DATA["dval"] = xgb.QuantileDMatrix(X_val, label=y_val, ref=dtrain, nthread=threads)
+    _DATA["threads"] = threads
+
+def run_trial(trial_id, params, num_round):
+    full = dict(XGB_PARAMS, **params, tree_method="hist", max_bin=MAX_BIN,
+                nthread=_DATA["threads"], verbosity=0, eval_metric="rmse")
+    t0 = time.perf_counter()
+    model = xgb.train(full, _DATA["dtrain"], num_boost_round=num_round,
+                      evals=[(_DATA["dval"], "eval")], early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                      verbose_eval=False)
+    return {
+        "trial": trial_id,
+        "params": params,
+        "budget": num_round,
+        "val_rmse": float(model.best_score),
+        "best_iteration": int(model.best_iteration),
+        "rounds_trained": int(model.num_boosted_rounds()),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+# ---------------------------
+# Successive halving
+# ---------------------------
+def rung_budgets(min_rounds=MIN_ROUNDS, max_rounds=MAX_ROUNDS, reduction=REDUCTION):
+    budgets = [min_rounds]
+    while budgets[-1] * reduction <= max_rounds:
+        budgets.append(budgets[-1] * reduction)
+    return budgets
+
+def tune_hyperparameters(X_train, y_train, X_val, y_val, n_trials=N_TRIALS, concurrency=None,
+                         threads_per_trial=None, seed=42):
+    """Successive-halving search with early stopping on the validation slice.
+
+    Every rung trains the surviving configs with a larger round budget and
+    keeps the best 1/REDUCTION by validation RMSE. Returns the winning params
+    and the number of rounds early stopping selected for them.
+    """
+    concurrency = concurrency or min(n_trials, max(1, (os.cpu_count() or 1) // 2))
+    threads_per_trial = threads_per_trial or max(1, (os.cpu_count() or 1) // concurrency)
+    rng = np.random.default_rng(seed)
+    configs = {i: sample_params(rng) for i in range(n_trials)}
+    budgets = rung_budgets()
+    data = tuple(np.asarray(a, dtype=float) for a in (X_train, y_train, X_val, y_val))
+
+    print(f"[tune] {n_trials} configs, rungs {budgets}, {concurrency} concurrent trial(s) x {threads_per_trial} thread(s)")
+    history = []
+    t0 = time.perf_counter()
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=concurrency, mp_context=ctx, initializer=_init_worker,
+                             initargs=(*data, threads_per_trial)) as pool:
+        survivors = list(configs)
+        for rung, budget in enumerate(budgets):
+            results = list(pool.map(run_trial, survivors, [configs[i] for i in survivors],
+                                    [budget] * len(survivors)))
+            results.sort(key=lambda r: r["val_rmse"])
+            history.extend(dict(r, rung=rung) for r in results)
+            print(f"[tune] rung {rung}: {len(results)} config(s) @ {budget} rounds, "
+                  f"best val RMSE {results[0]['val_rmse']:.3f} (trial {results[0]['trial']})")
+            if len(results) == 1 or rung == len(budgets) - 1:
+                best = results[0]
+                break
+            survivors = [r["trial"] for r in results[:max(1, len(results) // REDUCTION)]]
+
+    rounds_used = sum(r["rounds_trained"] for r in history)
+    rounds_budgeted = sum(r["budget"] for r in history)
+    print(f"[tune] best params {best['params']} -> {best['best_iteration'] + 1} rounds, "
+          f"val RMSE {best['val_rmse']:.3f} ({time.perf_counter() - t0:.1f}s; early stopping used "
+          f"{rounds_used}/{rounds_budgeted} budgeted rounds)")
+    return {
+        "params": best["params"],
+        "num_round": best["best_iteration"] + 1,
+        "val_rmse": best["val_rmse"],
+        "n_trials": n_trials,
+        "rungs": budgets,
+        "history": history,
+    }
@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+# ---------------- CONFIG ----------------
+CLIENT_BUFFER = 256       # intersections waiting per client; oldest is dropped beyond this
+MIN_INTERVAL = 0.2        # seconds between pushes to one client; updates in between coalesce
+MAX_CLIENTS = 1000
+KEEPALIVE = 15.0          # SSE comment / WebSocket ping when nothing changed
+
+# ---------------- SUBSCRIBER ----------------
+class Subscriber:
+    """One connected client: pending updates keyed by intersection, delta-encoded on send.
+
+    The buffer holds at most one entry per intersection (a newer update
+    replaces the waiting one), so a slow client costs O(intersections) and
+    never backs up the publisher. Deltas are taken against what this client
+    was last sent, so dropped or coalesced updates never leave it out of sync.
+    """
+
+    def __init__(self, intersections=None, buffer=CLIENT_BUFFER, min_interval=MIN_INTERVAL):
+        self.intersections = set(intersections) if intersections else None
+        self.buffer = buffer
+        self.min_interval = min_interval
+        self.pending = {}         # intersection -> (ts, timings), insertion ordered
+        self.sent = {}            # intersection -> timings as the client last saw them
+        self.coalesced = 0
+        self.dropped = 0
+        self.messages = 0
+        self._event = asyncio.Event()
+        self._last_push = 0.0
+
+    def wants(self, intersection):
+        return self.intersections is None or intersection in self.intersections
+
+    def offer(self, intersection, ts, timings):
+        if intersection in self.pending:
+            self.coalesced += 1
+            del self.pending[intersection]          # re-insert at the end (newest)
+        elif len(self.pending) >= self.buffer:
+            self.pending.pop(next(iter(self.pending)))
+            self.dropped += 1
+        self.pending[intersection] = (ts, timings)
+        self._event.set()
+
+    def _deltas(self):
+        out = []
+        for intersection, (ts, timings) in self.pending.items():
+            prev = self.sent.get(intersection)
+            if prev is None:
+                out.append({"intersection": intersection, "ts": ts, "full": True, "timings": timings})
+            else:
+                changed = {d: v for d, v in timings.items() if prev.get(d) != v}
+                removed = [d for d in prev if d not in timings]
+                if not changed and not removed:
+                    continue
+                msg = {"intersection": intersection, "ts": ts, "full": False, "timings": changed}
+                if removed:
+                    msg["removed"] = removed
+                out.append(msg)
+            self.sent[intersection] = timings
+        self.pending = {}
+        return out
+
+    async def next_batch(self, timeout=KEEPALIVE):
+        """Wait for changes and return them as a list of deltas ([] on keepalive timeout)."""
+        wait = self._last_push + self.min_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        while True:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+            self._event.clear()
+            batch = self._deltas()
+            if batch:
+                self._last_push = time.monotonic()
+                self.messages += len(batch)
+                return batch
+
+# ---------------- HUB ----------------
+class SignalHub:
+    """Fan-out of optimized timings to WebSocket / SSE subscribers.
+
+    publish() is called on the event loop by the metrics handlers and only
+    touches in-memory dicts; it skips intersections whose timings did not
+    change, so repeated identical results cost nothing downstream.
+    """
+
+    def __init__(self, max_clients=MAX_CLIENTS):
+        self.max_clients = max_clients
+        self.clients = set()
+        self.current = {}         # intersection -> (ts, timings)
+        self.published = 0
+        self.unchanged = 0
+        self.stale = 0
+
+    def subscribe(self, intersections=None, buffer=CLIENT_BUFFER, min_interval=MIN_INTERVAL):
+        if len(self.clients) >= self.max_clients:
+            return None
+        sub = Subscriber(intersections, buffer, min_interval)
+        for intersection, (ts, timings) in self.current.items():  # initial snapshot
+            if sub.wants(intersection):
+                sub.offer(intersection, ts, timings)
+        self.clients.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self.clients.discard(sub)
+
+    def publish(self, intersection, ts, timings):
+        prev = self.current.get(intersection)
+        if prev is not None and ts < prev[0]:  # replayed (older) posts must not win, as in SignalStore.record
+            self.stale += 1
+            return
+        if prev is not None and prev[1] == timings:
+            self.unchanged += 1
+            return
+        self.current[intersection] = (ts, timings)
+        self.published += 1
+        for sub in self.clients:
+            if sub.wants(intersection):
+                sub.offer(intersection, ts, timings)
+
+    def stats(self):
+        return {"clients": len(self.clients), "intersections": len(self.current),
+                "published": self.published, "unchanged": self.unchanged, "stale": self.stale,
+                "coalesced": sum(s.coalesced for s in self.clients),
+                "dropped": sum(s.dropped for s in self.clients),
+                "pending": sum(len(s.pending) for s in self.clients)}
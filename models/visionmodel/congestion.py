@@ -0,0 +1,105 @@
+from collections import deque
+import cv2
+import numpy as np
+
+VEHICLE_CLASSES = {"car", "bus", "truck", "motorcycle", "motorbike"}
+
+# ---------------- CONGESTION STATE ----------------
+def congestion_status(smooth_metric):
+    """Overlay label and BGR color for a smoothed congestion metric."""
+    if smooth_metric < 25:
+        return "Light Traffic", (0, 255, 0)
+    elif smooth_metric < 55:
+        return "Moderate Traffic", (0, 255, 255)
+    return "Heavy Traffic", (0, 0, 255)
+
+class CongestionState:
+    """Congestion state of one camera stream: smoothing history, grid mask, approach counts.
+
+    `update` takes one ultralytics result for a frame of size (W, H) and
+    returns the per-frame metrics plus the kept boxes (int xyxy array) for
+    optional drawing; vehicles_per_frame accumulates counts for the final
+    summary.
+    """
+
+    def __init__(self, W, H, names, vehicle_classes, grid_size=(8, 8), smooth_window=8, min_box_size=25):
+        self.W, self.H = W, H
+        self.names = names
+        self.vehicle_classes = vehicle_classes
+        # class names are resolved to ids once instead of per box
+        self.vehicle_ids = np.array([i for i, n in names.items() if n.lower() in vehicle_classes], dtype=np.int64)
+        self.grid_h, self.grid_w = grid_size
+        self.cell_h, self.cell_w = H // self.grid_h, W // self.grid_w
+        self.min_box_size = min_box_size
+        self.history = deque(maxlen=smooth_window)
+        self.vehicle_mask = np.zeros(grid_size, dtype=np.float32)
+        self.approach_counts = {"N": 0, "E": 0, "S": 0, "W": 0}
+        self.vehicles_per_frame = []
+
+    def vehicle_detections(self, results):
+        """Vehicle rows (n,6: xyxy, conf, cls) of a result; one device->host copy, then masks only."""
+        data = results.boxes.data
+        data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+        cls = data[:, 5].astype(np.int64)
+        x1, y1, x2, y2 = data[:, :4].astype(np.int64).T  # truncation, same as int()
+        keep = (np.isin(cls, self.vehicle_ids)
+                & (x2 - x1 >= self.min_box_size) & (y2 - y1 >= self.min_box_size))
+        return data[keep]
+
+    def update(self, results):
+        return self.update_detections(self.vehicle_detections(results))
+
+    def update_detections(self, dets):
+        """Update the metric from vehicle rows (detections or tracker output)."""
+        xyxy, conf = dets[:, :4].astype(np.int64), dets[:, 4]
+        x1, y1, x2, y2 = xyxy.T
+        vehicle_count = len(dets)
+
+        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+        north = int((cy < self.H // 2).sum())
+        west = int((cx < self.W // 2).sum())
+        approach_counts = {"N": north, "E": vehicle_count - west, "S": vehicle_count - north, "W": west}
+
+        vehicle_mask = self.rasterize(x1, y1, x2, y2)
+
+        # ---------------- CONGESTION METRIC ----------------
+        coverage = vehicle_mask.mean() * 100.0
+        metric = 0.6 * coverage + 0.4 * min(vehicle_count * 3, 100)
+        self.history.append(metric)
+        smooth_metric = float(np.mean(self.history))
+
+        self.vehicle_mask = vehicle_mask
+        self.approach_counts = approach_counts
+        self.vehicles_per_frame.append(vehicle_count)
+        return {
+            "boxes": xyxy,
+            "conf": conf,
+            "vehicle_count": vehicle_count,
+            "approach_counts": approach_counts,
+            "smooth_metric": smooth_metric,
+        }
+
+    def rasterize(self, x1, y1, x2, y2):
+        """Grid cells touched by any box, via a 2-D difference array and cumulative sums."""
+        grid_h, grid_w = self.grid_h, self.grid_w
+        r1, r2 = np.maximum(0, y1 // self.cell_h), np.minimum(grid_h - 1, y2 // self.cell_h)
+        c1, c2 = np.maximum(0, x1 // self.cell_w), np.minimum(grid_w - 1, x2 // self.cell_w)
+        ok = (r1 <= r2) & (c1 <= c2)
+        r1, r2, c1, c2 = r1[ok], r2[ok] + 1, c1[ok], c2[ok] + 1
+        diff = np.zeros((grid_h + 1, grid_w + 1), dtype=np.int32)
+        np.add.at(diff, (r1, c1), 1)
+        np.add.at(diff, (r1, c2), -1)
+        np.add.at(diff, (r2, c1), -1)
+        np.add.at(diff, (r2, c2), 1)
+        cover = diff.cumsum(axis=0).cumsum(axis=1)[:grid_h, :grid_w]
+        return (cover > 0).astype(np.float32)
+
+# ---------------- DRAWING ----------------
+def draw_detections(frame, boxes, ids=None):
+    """Draw boxes and centers from CongestionState.update; kept apart from metric computation."""
+    for i, (x1, y1, x2, y2) in enumerate(np.asarray(boxes).tolist()):
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 180, 0), 2)
+        cv2.circle(frame, ((x1 + x2) // 2, (y1 + y2) // 2), 3, (0, 255, 0), -1)
+        if ids is not None:
+            cv2.putText(frame, str(ids[i]), (x1, max(0, y1 - 5)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 180, 0), 1)
+    return frame
@@ -0,0 +1,328 @@
+import os
+import re
+import ast
+import json
+import time
+import hashlib
+import argparse
+import cv2
+import numpy as np
+
+# ---------------- CONFIG ----------------
+MODEL_PATH = "yolov8m.pt"
+EXPORT_DIR = "exported"
+IMGSZ = 640
+IOU_THRESH = 0.7        # NMS IoU, same default as ultralytics predict
+MAX_DET = 300
+CALIB_VIDEO = "video1.mp4"
+CALIB_FRAMES = 64
+BACKENDS = ("torch", "onnx", "onnx-int8", "openvino", "openvino-int8")
+
+# ---------------- RESULTS ----------------
+class _Boxes:
+    def __init__(self, data):
+        self.data = data  # (n, 6): x1, y1, x2, y2, conf, cls in frame pixels
+
+    def __len__(self):
+        return len(self.data)
+
+class Detections:
+    """Minimal stand-in for an ultralytics Results: `.boxes.data` and `.names`."""
+
+    def __init__(self, data, names):
+        self.boxes = _Boxes(data)
+        self.names = names
+
+# ---------------- PRE / POST PROCESSING ----------------
+def letterbox(frame, imgsz=IMGSZ, stride=32):
+    """ultralytics LetterBox(auto=True): keep aspect, pad to a multiple of `stride`."""
+    h, w = frame.shape[:2]
+    r = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+    dw, dh = (imgsz - new_w) % stride / 2, (imgsz - new_h) % stride / 2
+    if (w, h) != (new_w, new_h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return frame, r, (left, top)
+
+def preprocess(frames, imgsz=IMGSZ):
+    """BGR frames of one size -> NCHW float32 RGB batch plus the letterbox geometry."""
+    boxed = [letterbox(f, imgsz) for f in frames]
+    batch = np.stack([b[0] for b in boxed])[..., ::-1].transpose(0, 3, 1, 2)
+    batch = np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+    return batch, boxed[0][1], boxed[0][2]
+
+def postprocess(pred, conf, ratio, pad, shape, iou=IOU_THRESH, max_det=MAX_DET):
+    """Raw YOLOv8 head output (4 + nc, anchors) for one image -> (n, 6) boxes in frame pixels."""
+    pred = pred.T
+    scores = pred[:, 4:]
+    cls = scores.argmax(axis=1)
+    best = scores[np.arange(len(cls)), cls]
+    keep = best > conf
+    if not keep.any():
+        return np.zeros((0, 6), dtype=np.float32)
+    xywh, best, cls = pred[keep, :4], best[keep], cls[keep]
+    xyxy = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+    ltwh = np.concatenate([xyxy[:, :2], xyxy[:, 2:] - xyxy[:, :2]], axis=1)
+    idx = np.asarray(cv2.dnn.NMSBoxesBatched(ltwh.tolist(), best.tolist(), cls.tolist(), conf, iou), dtype=int).reshape(-1)
+    idx = idx[np.argsort(-best[idx])][:max_det]
+    xyxy = (xyxy[idx] - np.array(pad * 2)) / ratio
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, shape[1])
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, shape[0])
+    return np.concatenate([xyxy, best[idx, None], cls[idx, None]], axis=1).astype(np.float32)
+
+# ---------------- BACKENDS ----------------
+class TorchDetector:
+    """PyTorch weights through ultralytics (the original vision.py path)."""
+
+    def __init__(self, weights=MODEL_PATH, device=None, threads=0):
+        import torch
+        from ultralytics import YOLO
+        if threads:
+            torch.set_num_threads(threads)
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = YOLO(weights)
+        self.model.to(self.device)
+        self.names = self.model.names
+
+    def __call__(self, frames, conf):
+        return self.model(frames, conf=conf, verbose=False, device=self.device)
+
+class _ExportedDetector:
+    """Shared letterbox / decode / NMS for exported graphs; subclasses implement _run."""
+
+    device = "cpu"
+
+    def __call__(self, frames, conf):
+        if isinstance(frames, np.ndarray):
+            frames = [frames]
+        # frames of different sizes get separate passes; same-size frames share one batch
+        by_shape = {}
+        for i, f in enumerate(frames):
+            by_shape.setdefault(f.shape, []).append(i)
+        results = [None] * len(frames)
+        for shape, idxs in by_shape.items():
+            batch, ratio, pad = preprocess([frames[i] for i in idxs])
+            preds = self._run(batch)
+            for i, pred in zip(idxs, preds):
+                results[i] = Detections(postprocess(pred, conf, ratio, pad, shape[:2]), self.names)
+        return results
+
+class OnnxDetector(_ExportedDetector):
+    def __init__(self, onnx_path, names, threads=0):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.intra_op_num_threads = threads or (os.cpu_count() or 1)
+        opts.inter_op_num_threads = 1
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        self.session = ort.InferenceSession(onnx_path, opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.names = names
+
+    def _run(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+class OpenVinoDetector(_ExportedDetector):
+    def __init__(self, xml_path, names, threads=0):
+        import openvino as ov
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.compiled = ov.Core().compile_model(xml_path, "CPU", config)
+        self.names = names
+
+    def _run(self, batch):
+        return self.compiled(batch)[0]
+
+# ---------------- EXPORT / QUANTIZATION ----------------
+def _stem(weights):
+    return os.path.splitext(os.path.basename(weights))[0]
+
+def onnx_names(onnx_path):
+    import onnx
+    meta = {p.key: p.value for p in onnx.load(onnx_path, load_external_data=False).metadata_props}
+    return ast.literal_eval(meta["names"])
+
+def export_onnx(weights=MODEL_PATH, export_dir=EXPORT_DIR, imgsz=IMGSZ):
+    """FP32 ONNX with dynamic batch/height/width, exported once and cached."""
+    path = os.path.join(export_dir, _stem(weights) + ".onnx")
+    if not os.path.exists(path):
+        from ultralytics import YOLO
+        os.makedirs(export_dir, exist_ok=True)
+        exported = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        os.replace(exported, path)
+    return path
+
+def calibration_frames(video=CALIB_VIDEO, n=CALIB_FRAMES):
+    """n frames spread evenly over the video."""
+    cap = cv2.VideoCapture(video)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or n
+    wanted = set(np.linspace(0, total - 1, min(n, total)).astype(int).tolist())
+    frames, i = [], 0
+    while len(frames) < len(wanted):
+        if i in wanted:
+            ret, frame = cap.read()
+        else:
+            ret, frame = cap.grab(), None
+        if not ret:
+            break
+        if frame is not None:
+            frames.append(frame)
+        i += 1
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"No calibration frames read from {video}")
+    return frames
+
+def _calib_tag(video, n):
+    """Cache key part for an INT8 graph: calibration clip name plus a hash of its path, size, mtime and n."""
+    st = os.stat(video)
+    key = f"{os.path.abspath(video)}|{st.st_size}|{st.st_mtime_ns}|{n}"
+    return f"{_stem(video)}-{hashlib.blake2b(key.encode(), digest_size=4).hexdigest()}"
+
+def quantize_onnx(fp32_path, video=CALIB_VIDEO, n=CALIB_FRAMES):
+    """Static INT8 (QDQ) quantization calibrated on frames of `video`.
+
+    The Detect head (box decode / DFL / class sigmoid) stays in float;
+    quantizing it costs far more accuracy than it saves time.
+    """
+    path = fp32_path.replace(".onnx", f".int8.{_calib_tag(video, n)}.onnx")
+    if os.path.exists(path):
+        return path
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                          QuantType, quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self, frames, input_name):
+            self.batches = iter([{input_name: preprocess([f])[0]} for f in frames])
+
+        def get_next(self):
+            return next(self.batches, None)
+
+    prepped = fp32_path.replace(".onnx", ".prep.onnx")
+    quant_pre_process(fp32_path, prepped, skip_symbolic_shape=True)
+    model = onnx.load(prepped)
+    layers = [re.match(r"/model\.(\d+)/", n.name) for n in model.graph.node]
+    head = max(int(m.group(1)) for m in layers if m)
+    exclude = [n.name for n in model.graph.node if n.name.startswith(f"/model.{head}/")]
+    input_name = model.graph.input[0].name
+    quantize_static(prepped, path, _Reader(calibration_frames(video, n), input_name),
+                    quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    calibrate_method=CalibrationMethod.MinMax, nodes_to_exclude=exclude)
+    os.remove(prepped)
+    return path
+
+def export_openvino(onnx_path, int8=False, video=CALIB_VIDEO, n=CALIB_FRAMES):
+    """OpenVINO IR converted from the FP32 ONNX; int8 uses NNCF post-training quantization."""
+    path = onnx_path.replace(".onnx", f".int8.{_calib_tag(video, n)}.xml" if int8 else ".xml")
+    if os.path.exists(path):
+        return path
+    import openvino as ov
+    model = ov.convert_model(onnx_path)
+    if int8:
+        import nncf
+        head = nncf.IgnoredScope(patterns=[r".*/model\.\d+/dfl/.*", r".*Sigmoid.*"], validate=False)
+        data = nncf.Dataset(calibration_frames(video, n), lambda f: preprocess([f])[0])
+        model = nncf.quantize(model, data, preset=nncf.QuantizationPreset.MIXED,
+                              subset_size=n, ignored_scope=head)
+    ov.save_model(model, path)
+    return path
+
+def load_detector(backend="torch", weights=MODEL_PATH, device=None, threads=0, export_dir=EXPORT_DIR,
+                  calib_video=CALIB_VIDEO):
+    """Detector for `backend`; exported/quantized graphs are built on first use and cached.
+
+    INT8 backends are calibrated on `calib_video` and cached per clip.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend {backend!r}; choose from {BACKENDS}")
+    if backend == "torch":
+        return TorchDetector(weights, device, threads)
+    onnx_path = export_onnx(weights, export_dir)
+    names = onnx_names(onnx_path)
+    if backend == "onnx":
+        return OnnxDetector(onnx_path, names, threads)
+    if backend == "onnx-int8":
+        return OnnxDetector(quantize_onnx(onnx_path, video=calib_video), names, threads)
+    return OpenVinoDetector(export_openvino(onnx_path, int8=backend == "openvino-int8", video=calib_video),
+                            names, threads)
+
+# ---------------- BENCHMARK ----------------
+def benchmark(backends, weights=MODEL_PATH, video=CALIB_VIDEO, n_frames=120, frame_resize=720,
+              conf=0.3, threads=0, warmup=5, calib_video=None):
+    """Latency, FPS and per-frame vehicle-count delta vs the first backend (the baseline).
+
+    INT8 backends are calibrated on `calib_video`, by default the timed `video`.
+    """
+    from congestion import CongestionState, VEHICLE_CLASSES
+
+    frames = calibration_frames(video, n_frames)
+    H0, W0 = frames[0].shape[:2]
+    W, H = int(W0 * frame_resize / H0), frame_resize
+    frames = [cv2.resize(f, (W, H)) for f in frames]
+
+    rows, baseline = [], None
+    for backend in backends:
+        det = load_detector(backend, weights, threads=threads, calib_video=calib_video or video)
+        state = CongestionState(W, H, det.names, VEHICLE_CLASSES)
+        for f in frames[:warmup]:
+            det(f, conf)
+        times, counts = [], []
+        for f in frames:
+            t0 = time.perf_counter()
+            res = det(f, conf)[0]
+            times.append(time.perf_counter() - t0)
+            counts.append(len(state.vehicle_detections(res)))
+        counts = np.array(counts)
+        if baseline is None:
+            baseline = counts
+        times = np.array(times) * 1000
+        rows.append({
+            "backend": backend,
+            "mean_ms": round(float(times.mean()), 2),
+            "p50_ms": round(float(np.percentile(times, 50)), 2),
+            "p95_ms": round(float(np.percentile(times, 95)), 2),
+            "fps": round(1000.0 / float(times.mean()), 2),
+            "avg_vehicles": round(float(counts.mean()), 3),
+            "count_mae_vs_baseline": round(float(np.abs(counts - baseline).mean()), 3),
+            "count_delta_pct": round(100.0 * (counts.sum() - baseline.sum()) / max(baseline.sum(), 1), 2),
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and benchmark detector backends.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="build the exported graph for a backend")
+    ex.add_argument("backend", choices=BACKENDS[1:])
+    bench = sub.add_parser("bench", help="latency / FPS / count delta vs the first backend")
+    bench.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"], choices=BACKENDS)
+    bench.add_argument("--frames", type=int, default=120)
+    bench.add_argument("--out", default=None, help="also write the rows as JSON")
+    for p in (ex, bench):
+        p.add_argument("--weights", default=MODEL_PATH)
+        p.add_argument("--video", default=CALIB_VIDEO, help="INT8 calibration clip (bench: also the timed clip)")
+        p.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.cmd == "export":
+        det = load_detector(args.backend, args.weights, threads=args.threads, calib_video=args.video)
+        print(f"[INFO] {args.backend} detector ready ({len(det.names)} classes)")
+        return
+
+    rows = benchmark(args.backends, args.weights, args.video, args.frames, threads=args.threads)
+    print(f"{'backend':<14}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'FPS':>8}{'veh/frame':>11}{'count MAE':>11}{'delta %':>9}")
+    for r in rows:
+        print(f"{r['backend']:<14}{r['mean_ms']:>9.2f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['fps']:>8.2f}"
+              f"{r['avg_vehicles']:>11.2f}{r['count_mae_vs_baseline']:>11.3f}{r['count_delta_pct']:>9.2f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import threading
+from datetime import datetime
+import numpy as np
+
+# ---------------- CONFIG ----------------
+PREDICTOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "traffic_predictor")
+MODEL_FILE = None           # None = traffic_predictor's multi-horizon model (python multi_horizon.py)
+HORIZON = "15min"           # horizon of that model to blend; the main model looks 48 h ahead, far too late
+STATE_FILE = "forecast_state.json"  # per-approach feature history, kept across restarts; None = off
+REFRESH_INTERVAL = 30.0     # seconds between background forecast passes
+TTL = 120.0                 # a cached forecast older than this is ignored
+SAMPLE_MINUTES = 15         # the forecaster's sampling period (traffic_predictor FREQ_MINUTES)
+VOLUME_SCALE = 25.0         # mean in-frame vehicles per approach -> 15-min volume (model range ~50-150); calibrate per camera
+RATIO_RANGE = (0.5, 2.0)    # predicted / current load is clipped to this
+MAX_GAP_FILL = 4            # up to this many missing buckets (camera down, restart) repeat the last value;
+                            # a longer gap starts that approach's history over
+CLOSE_TIMEOUT = 5.0         # seconds close() waits for the refresh thread before giving up on saving
+STATE_VERSION = 1
+
+def _bucket(ts):
+    return int(ts // (SAMPLE_MINUTES * 60))
+
+def _bucket_time(b):
+    return datetime.fromtimestamp(b * SAMPLE_MINUTES * 60)
+
+# ---------------- FORECASTER ----------------
+class SignalForecaster:
+    """Per-intersection load forecasts for the optimizer, computed off the request path.
+
+    observe() (hot path) only adds counts into the current SAMPLE_MINUTES
+    bucket of each approach. A background thread folds closed buckets into
+    traffic_predictor's StreamingFeatureEngine (which assumes consecutive
+    buckets, so gaps are filled or reset first), runs one batched predict for
+    every approach, and caches predicted/current load ratios with a TTL;
+    get() is a dict lookup. Until the model has loaded (in the background,
+    once) or when it is unavailable, get() returns None and the optimizer
+    behaves as before.
+    """
+
+    def __init__(self, model_file=MODEL_FILE, state_file=STATE_FILE, refresh_interval=REFRESH_INTERVAL,
+                 ttl=TTL, volume_scale=VOLUME_SCALE, horizon=HORIZON):
+        self.model_file = model_file
+        self.horizon = horizon
+        self.state_file = state_file
+        self.refresh_interval = refresh_interval
+        self.ttl = ttl
+        self.volume_scale = volume_scale
+        self.artifact = None
+        self.engine = None
+        self.error = None
+        self.cache = {}           # intersection -> {"total", "approaches", "expires", "ts"}
+        self.refreshes = 0
+        self.last_refresh_ms = 0.0
+        self.gap_fills = 0
+        self.gap_resets = 0
+        self._last = {}           # engine site key -> (last consumed bucket, its total)
+        self._open = {}           # (intersection, approach) -> [bucket, sum, n]
+        self._closed = []         # (intersection, approach, bucket, mean) waiting for the engine
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="signal-forecaster", daemon=True)
+        self._thread.start()
+
+    # ---------- hot path ----------
+    def observe(self, intersection, ts, counts):
+        b = _bucket(ts)
+        with self._lock:
+            for d, v in counts.items():
+                acc = self._open.get((intersection, d))
+                if acc is None:
+                    self._open[(intersection, d)] = [b, v, 1]
+                elif acc[0] == b:
+                    acc[1] += v
+                    acc[2] += 1
+                elif b > acc[0]:  # late samples of an older bucket are ignored
+                    self._closed.append((intersection, d, acc[0], acc[1] / acc[2]))
+                    acc[:] = [b, v, 1]
+
+    def get(self, intersection):
+        fc = self.cache.get(intersection)
+        if fc is None or fc["expires"] < time.time():
+            return None
+        return fc
+
+    # ---------- background ----------
+    def _load(self):
+        if PREDICTOR_DIR not in sys.path:
+            sys.path.append(PREDICTOR_DIR)
+        from multi_horizon import MULTI_MODEL_FILE, MultiHorizonForecaster
+        from streaming_features import StreamingFeatureEngine
+
+        path = self.model_file or os.path.join(PREDICTOR_DIR, MULTI_MODEL_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} (train it with traffic_predictor/multi_horizon.py)")
+        artifact = MultiHorizonForecaster.load(path)
+        if self.horizon not in artifact.horizons:
+            raise KeyError(f"horizon {self.horizon!r} not in {path}; available: {list(artifact.horizons)}")
+        engine = StreamingFeatureEngine()
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                engine, self._last = self._read_state(self.state_file)
+            except (ValueError, KeyError) as e:
+                print(f"[WARN] Ignoring forecast state {self.state_file}: {e}")
+        self.engine, self.artifact = engine, artifact
+        print(f"[INFO] Forecaster loaded from {path}, horizon {self.horizon} ({len(engine.sites)} approach histories)")
+
+    def _run(self):
+        try:
+            self._load()
+        except Exception as e:  # optional: the optimizer works without forecasts
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"[WARN] Forecaster unavailable, optimizing on live counts only ({self.error})")
+            return
+        while not self._stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                self.refresh()
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+            self.last_refresh_ms = 1000 * (time.perf_counter() - t0)
+            self._stop.wait(self.refresh_interval)
+
+    def _catch_up(self, key, b):
+        """Engine state of `key` ready to take bucket b: buckets missing since the last
+        consumed one are filled, a gap over MAX_GAP_FILL starts over. None if b is not newer."""
+        from streaming_features import SiteFeatureState
+
+        st, last = self.engine.sites.get(key), self._last.get(key)
+        if st is None or last is None:
+            st = self.engine.sites[key] = SiteFeatureState()
+            return st
+        last_b, last_total = last
+        if b <= last_b:
+            return None
+        missing = b - last_b - 1
+        if missing > MAX_GAP_FILL:
+            st = self.engine.sites[key] = SiteFeatureState()
+            del self._last[key]
+            self.gap_resets += 1
+        elif missing:
+            # no samples came in, so nothing better than carrying the last load forward
+            for m in range(last_b + 1, b):
+                st.update(_bucket_time(m), last_total)
+            self._last[key] = (b - 1, last_total)
+            self.gap_fills += 1
+        return st
+
+    def refresh(self):
+        from streaming_features import time_features
+
+        now_bucket = _bucket(time.time())
+        with self._lock:
+            # buckets of approaches that went quiet are complete; they stop being forecast
+            for key in [k for k, acc in self._open.items() if acc[0] < now_bucket]:
+                b, total, n = self._open.pop(key)
+                self._closed.append((*key, b, total / n))
+            closed, self._closed = self._closed, []
+            current = [(key, acc[0], acc[1] / acc[2]) for key, acc in self._open.items()]
+        engine = self.engine
+        for intersection, d, b, mean in closed:
+            key = f"{intersection}/{d}"
+            st = self._catch_up(key, b)
+            if st is None:
+                continue
+            st.update(_bucket_time(b), mean * self.volume_scale)
+            self._last[key] = (b, mean * self.volume_scale)
+        if not current:
+            self.cache = {}
+            return
+
+        # the open (partial) bucket is scored without being consumed
+        rows, levels, keys = [], [], []
+        for (intersection, d), b, mean in current:
+            # buckets before the open one can no longer arrive, so a gap is filled / reset now
+            st = self._catch_up(f"{intersection}/{d}", b)
+            if st is None:
+                continue
+            total = mean * self.volume_scale
+            x = st.features(time_features(_bucket_time(b)), total)
+            rows.append(x)
+            # compare against recent load (1h mean) rather than one noisy bucket
+            levels.append(max(x[engine.feature_cols.index("rolling_mean_1h")], 1.0))
+            keys.append((intersection, d))
+        if not rows:
+            self.cache = {}
+            return
+        preds = self.artifact.predict(np.vstack(rows), [self.horizon])[self.horizon]
+        ratios = np.clip(preds / np.asarray(levels), *RATIO_RANGE)
+
+        now = time.time()
+        cache = {}
+        for (intersection, d), r, level in zip(keys, ratios.tolist(), levels):
+            fc = cache.setdefault(intersection, {"approaches": {}, "load": 0.0, "predicted": 0.0,
+                                                 "ts": now, "expires": now + self.ttl})
+            fc["approaches"][d] = round(r, 3)
+            fc["load"] += level
+            fc["predicted"] += level * r
+        for fc in cache.values():
+            fc["total"] = round(fc["predicted"] / fc["load"], 3)
+        self.cache = cache  # swapped whole; readers never see a half-built dict
+        self.refreshes += 1
+
+    # ---------- state file ----------
+    @staticmethod
+    def _read_state(path):
+        from streaming_features import StreamingFeatureEngine
+
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("version") != STATE_VERSION or "engine" not in state:
+            raise ValueError("no bucket times (older or unknown format), starting fresh")
+        last = {k: tuple(v) for k, v in state["last"].items()}
+        return StreamingFeatureEngine.restore(state["engine"]), last
+
+    def _write_state(self, path):
+        state = {"version": STATE_VERSION, "engine": self.engine.snapshot(),
+                 "last": {k: list(v) for k, v in self._last.items()}}
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    # ---------- lifecycle ----------
+    def stats(self):
+        return {"loaded": self.artifact is not None, "horizon": self.horizon, "error": self.error,
+                "intersections": len(self.cache),
+                "approaches": len(self._open), "refreshes": self.refreshes,
+                "gap_fills": self.gap_fills, "gap_resets": self.gap_resets,
+                "last_refresh_ms": round(self.last_refresh_ms, 2)}
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=CLOSE_TIMEOUT)
+        if self._thread.is_alive():
+            # a refresh may be midway through updating the engine; keep the last saved state
+            print(f"[WARN] Forecaster still refreshing after {CLOSE_TIMEOUT}s; not saving {self.state_file}")
+            return
+        if self.engine is not None and self.state_file:
+            self._write_state(self.state_file)
@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import itertools
+import numpy as np
+import httpx
+
+from looplag import percentiles
+
+# ---------------- CONFIG ----------------
+REQUESTS = 2000           # per scenario
+CONCURRENCY = (1, 16, 64)
+APPROACHES = (4,)
+ENDPOINTS = ("metrics", "signals")
+INTERSECTIONS = 50        # distinct camera ids the payloads rotate through
+PAYLOAD_POOL = 256        # pre-built payloads per scenario, so generation is not timed
+LAG_MIN_SAMPLES = 20      # fewer server probe wakeups than this: its loop barely yielded, lag is not reported
+DRAIN_TIMEOUT = 30.0      # wait for the log writer before measuring file growth
+OUT_PATH = "loadtest.json"
+
+APPROACH_NAMES = ["N", "E", "S", "W", "NE", "SE", "SW", "NW"]
+
+# ---------------- PAYLOADS ----------------
+def make_payloads(approaches, queues, n=PAYLOAD_POOL, intersections=INTERSECTIONS, seed=0):
+    rng = np.random.default_rng(seed)
+    names = APPROACH_NAMES[:approaches] + [f"A{i}" for i in range(len(APPROACH_NAMES), approaches)]
+    out = []
+    for i in range(n):
+        p = {"camera": f"int{i % intersections}",
+             "counts": {d: int(v) for d, v in zip(names, rng.integers(0, 40, approaches))},
+             "overall_congestion": float(rng.uniform(0, 100))}
+        if queues:
+            p["queues"] = {d: int(v) for d, v in zip(names, rng.integers(0, 15, approaches))}
+        out.append(p)
+    return out
+
+def request_for(endpoint, payloads, intersections=INTERSECTIONS):
+    """Returns f(client, i) issuing the i-th request of a scenario."""
+    if endpoint == "metrics":
+        return lambda c, i: c.post("/metrics", json=payloads[i % len(payloads)])
+    if endpoint == "bulk":
+        return lambda c, i: c.post("/metrics/bulk", json=payloads[(i * 8) % len(payloads):][:8])
+    if endpoint == "signals":
+        return lambda c, i: c.get("/signals", params={"intersection": f"int{i % intersections}"})
+    if endpoint == "mixed":  # one write per four reads, like dashboards polling a live feed
+        post, get = request_for("metrics", payloads), request_for("signals", payloads, intersections)
+        return lambda c, i: post(c, i) if i % 5 == 0 else get(c, i)
+    raise ValueError(f"unknown endpoint {endpoint!r}")
+
+# ---------------- MEASUREMENT ----------------
+def log_bytes(db_path):
+    if not db_path:
+        return None
+    return sum(os.path.getsize(p) for p in (db_path, db_path + "-wal") if os.path.exists(p))
+
+async def wait_for_writer(client, timeout=DRAIN_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = (await client.get("/storage/stats")).json()
+        if stats.get("rows_pending", stats.get("rows_queued", 0)) == 0:
+            return stats
+        await asyncio.sleep(0.05)
+    return stats
+
+async def server_loop_lag(client, reset=False):
+    """The server's own event-loop lag probe (looplag.LoopLag in serverr's lifespan); None if it has none."""
+    try:
+        r = await client.get("/debug/looplag", params={"reset": reset})
+    except httpx.HTTPError:
+        return None
+    return r.json() if r.status_code == 200 else None
+
+async def run_scenario(client, endpoint, concurrency, approaches, queues, requests, db_path=None, seed=0,
+                       forecast=None):
+    send = request_for(endpoint, make_payloads(approaches, queues, seed=seed))
+    if endpoint == "signals":  # make sure there is something to read
+        for p in make_payloads(approaches, queues, n=INTERSECTIONS, seed=seed):
+            await client.post("/metrics", json=p)
+    counter = itertools.count()
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            t0 = time.perf_counter()
+            try:
+                r = await send(client, i)
+                ok = r.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(1000 * (time.perf_counter() - t0))
+            errors += not ok
+
+    before = await wait_for_writer(client)
+    bytes_before = log_bytes(db_path)
+    await server_loop_lag(client, reset=True)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    lag = await server_loop_lag(client)
+    after = await wait_for_writer(client)
+    bytes_after = log_bytes(db_path)
+    # over ASGITransport requests often never yield, leaving one catch-up sample that is just the elapsed time
+    lag_samples = lag["samples"] if lag else 0
+    return {
+        "endpoint": endpoint, "concurrency": concurrency, "approaches": approaches, "queues": queues,
+        "forecast": forecast, "requests": requests, "errors": errors, "seconds": elapsed,
+        "throughput_rps": requests / elapsed,
+        "latency_ms": percentiles(latencies),
+        "loop_lag_ms": lag["lag_ms"] if lag_samples >= LAG_MIN_SAMPLES else None,
+        "loop_lag_samples": lag_samples,
+        "log_rows": after.get("rows_written", 0) - before.get("rows_written", 0),
+        "log_bytes": None if bytes_before is None else bytes_after - bytes_before,
+    }
+
+def scenario_key(s):
+    key = f"{s['endpoint']}/c{s['concurrency']}/a{s['approaches']}/{'q' if s['queues'] else 'noq'}"
+    return key + "/fc" if s.get("forecast") else key
+
+# ---------------- TARGETS ----------------
+class InProcessServer:
+    """serverr.app on an ASGI transport (no sockets), with its lifespan and a scratch log.
+
+    The forecaster (model load + refresh thread) is off unless forecast=True,
+    so it does not share the measured process by accident.
+    """
+
+    def __init__(self, forecast=False):
+        import serverr
+        self.serverr = serverr
+        self.forecast = forecast
+        self.tmp = tempfile.mkdtemp(prefix="loadtest-")
+        self.db_path = os.path.join(self.tmp, "optimizer_log.db")
+        serverr.DB_PATH = self.db_path
+        serverr.FORECAST = forecast
+        serverr.FORECAST_STATE = os.path.join(self.tmp, "forecast_state.json")
+        self._lifespan = serverr.app.router.lifespan_context(serverr.app)
+
+    async def __aenter__(self):
+        await self._lifespan.__aenter__()
+        transport = httpx.ASGITransport(app=self.serverr.app)
+        self.client = httpx.AsyncClient(transport=transport, base_url="http://loadtest")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        await self._lifespan.__aexit__(*exc)
+
+class LocalServer:
+    """An already running uvicorn (e.g. python serverr.py); pass --db to track log growth."""
+
+    def __init__(self, url, db_path=None, max_connections=max(CONCURRENCY)):
+        self.url = url
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.forecast = None  # whatever the running server is configured with
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        self.client = httpx.AsyncClient(base_url=self.url, limits=limits, timeout=30.0)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+
+# ---------------- REPORT ----------------
+def print_table(scenarios):
+    print(f"{'scenario':<28} {'req/s':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'lag p99':>8} {'rows':>6} {'log KB':>7} {'err':>4}")
+    for s in scenarios:
+        lat = s["latency_ms"]
+        kb = "-" if s["log_bytes"] is None else f"{s['log_bytes'] / 1024:.0f}"
+        lag = "-" if not s["loop_lag_ms"] else f"{s['loop_lag_ms']['p99']:.2f}"
+        print(f"{scenario_key(s):<28} {s['throughput_rps']:>8.0f} {lat['p50']:>7.2f} {lat['p95']:>7.2f} "
+              f"{lat['p99']:>7.2f} {lag:>8} {s['log_rows']:>6} {kb:>7} {s['errors']:>4}")
+    if any(not s["loop_lag_ms"] for s in scenarios):
+        print(f"(lag '-': fewer than {LAG_MIN_SAMPLES} samples from the server's loop probe: it did not yield "
+              f"during the run, or the server has no /debug/looplag)")
+
+def compare(current, baseline_path):
+    """Prints throughput / p99 ratios against a previous run's JSON."""
+    with open(baseline_path) as f:
+        base = {scenario_key(s): s for s in json.load(f)["scenarios"]}
+    print(f"\nvs {baseline_path}:")
+    for s in current:
+        b = base.get(scenario_key(s))
+        if b is None:
+            continue
+        print(f"  {scenario_key(s):<28} throughput x{s['throughput_rps'] / b['throughput_rps']:.2f}  "
+              f"p99 x{s['latency_ms']['p99'] / max(b['latency_ms']['p99'], 1e-9):.2f}")
+
+# ---------------- MAIN ----------------
+async def main(args):
+    if args.url:
+        targets = [lambda: LocalServer(args.url, args.db, max(args.concurrency))]
+    else:  # the forecaster lives in the app's lifespan, so each setting is its own in-process server
+        # built lazily: InProcessServer() repoints serverr's module config
+        targets = [lambda fc=fc: InProcessServer(forecast=fc) for fc in args.forecast]
+    scenarios = []
+    seed = 0
+    for make_target in targets:
+        async with make_target() as target:
+            grid = itertools.product(args.endpoints, args.concurrency, args.approaches, args.queues)
+            for endpoint, conc, k, q in grid:
+                s = await run_scenario(target.client, endpoint, conc, k, q, args.requests, target.db_path, seed,
+                                       target.forecast)
+                seed += 1
+                scenarios.append(s)
+                print(f"[INFO] {scenario_key(s)}: {s['throughput_rps']:.0f} req/s, p99 {s['latency_ms']['p99']:.2f} ms")
+    report = {"meta": {"time": time.time(), "target": args.url or "in-process", "python": sys.version.split()[0],
+                       "platform": platform.platform(), "cpus": os.cpu_count()},
+              "scenarios": scenarios}
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print()
+    print_table(scenarios)
+    print(f"\n[INFO] Results written to {args.out}")
+    if args.compare:
+        compare(scenarios, args.compare)
+
+if __name__ == "__main__":
+    # python loadtest.py                                  # in-process, default grid
+    # python loadtest.py --url http://127.0.0.1:8000 --db optimizer_log.db
+    # python loadtest.py --endpoints mixed --concurrency 256 --compare loadtest.json
+    ap = argparse.ArgumentParser(description="Load test for the signal optimizer API")
+    ap.add_argument("--url", help="local server to target instead of running serverr in-process")
+    ap.add_argument("--db", help="log database of --url's server, for log-growth numbers")
+    ap.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=["metrics", "bulk", "signals", "mixed"])
+    ap.add_argument("--concurrency", nargs="+", type=int, default=list(CONCURRENCY))
+    ap.add_argument("--approaches", nargs="+", type=int, default=list(APPROACHES))
+    ap.add_argument("--queues", nargs="+", type=lambda v: v.lower() in ("1", "yes", "true", "q"),
+                    default=[False, True], help="with/without queues, e.g. --queues no yes")
+    ap.add_argument("--forecast", nargs="+", type=lambda v: v.lower() in ("1", "yes", "true", "fc"),
+                    default=[False], help="in-process only: run with the forecaster off/on, e.g. --forecast no yes")
+    ap.add_argument("--requests", type=int, default=REQUESTS)
+    ap.add_argument("--out", default=OUT_PATH)
+    ap.add_argument("--compare", help="previous results JSON to compare against")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,56 @@
+import asyncio
+import collections
+import numpy as np
+
+# ---------------- CONFIG ----------------
+LAG_INTERVAL = 0.01       # probe period (seconds)
+MAX_SAMPLES = 60_000      # ~10 minutes of samples at LAG_INTERVAL between reads
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return {}
+    a = np.asarray(samples_ms)
+    return {"p50": float(np.percentile(a, 50)), "p95": float(np.percentile(a, 95)),
+            "p99": float(np.percentile(a, 99)), "max": float(a.max()), "mean": float(a.mean())}
+
+class LoopLag:
+    """Samples how late asyncio.sleep(interval) wakes up on the loop it is started on.
+
+    serverr starts one in its lifespan, so /debug/looplag reports the
+    server's own loop whether it runs in-process or under uvicorn.
+    """
+
+    def __init__(self, interval=LAG_INTERVAL, max_samples=MAX_SAMPLES):
+        self.interval = interval
+        self.samples = collections.deque(maxlen=max_samples)
+        self._task = None
+        self._t0 = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(1000 * (loop.time() - self._t0 - self.interval))
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._t0 = loop.time()
+        self._task = loop.create_task(self._run())
+        return self
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot(self, reset=False):
+        """Lag percentiles (ms) since the last reset; must be called on the probed loop."""
+        samples = list(self.samples)
+        # the sleep still pending counts too; if the loop never yielded, that is the whole period
+        overdue = asyncio.get_running_loop().time() - self._t0 - self.interval
+        if self._task is not None and overdue > 0:
+            samples.append(1000 * overdue)
+        if reset:
+            self.samples.clear()
+        return {"interval_ms": 1000 * self.interval, "samples": len(samples), "lag_ms": percentiles(samples)}
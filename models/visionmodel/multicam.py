@@ -0,0 +1,192 @@
+import os
+import sys
+import time
+import threading
+import cv2
+import numpy as np
+
+from detector import load_detector
+from congestion import CongestionState, congestion_status
+from uplink import MetricsUplink
+
+# ---------------- CONFIG ----------------
+MODEL_PATH = "yolov8m.pt"
+DETECTOR_BACKEND = "torch"  # see detector.BACKENDS
+DETECTOR_THREADS = 0
+SOURCES = {"cam0": "video1.mp4"}   # name -> file path or stream URL (rtsp://...)
+SERVER_URL = "http://127.0.0.1:8000/metrics"
+POST_INTERVAL = 1.0
+
+VEHICLE_CLASSES = {"car", "bus", "truck", "motorcycle", "motorbike"}
+GRID_SIZE = (8, 8)
+SMOOTH_WINDOW = 8
+CONF_THRESH = 0.3
+MIN_BOX_SIZE = 25
+FRAME_RESIZE = 720
+
+MAX_BATCH = 16          # frames per forward pass; larger sets are split
+REALTIME_FILES = True   # pace file sources at their native FPS, like a live camera
+IDLE_SLEEP = 0.005      # wait when no source has a new frame
+STATS_INTERVAL = 5.0
+
+# ---------------- SOURCES ----------------
+class FrameSource:
+    """Reads one camera in its own thread and keeps only its latest frame."""
+
+    def __init__(self, name, uri, realtime=REALTIME_FILES):
+        self.name = name
+        self.uri = uri
+        self.cap = cv2.VideoCapture(uri)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Error opening video: {uri}")
+        # size from the first decoded frame: CAP_PROP_FRAME_HEIGHT is 0 for many RTSP/HTTP streams
+        ret, self._first = self.cap.read()
+        if not ret:
+            self.cap.release()
+            raise RuntimeError(f"No frames from video: {uri}")
+        H0, W0 = self._first.shape[:2]
+        scale = FRAME_RESIZE / H0
+        self.W, self.H = int(W0 * scale), FRAME_RESIZE
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.realtime = realtime and os.path.exists(uri)  # live streams are already paced
+        self.frames_read = 0
+        self.frames_replaced = 0  # frames overwritten before inference picked them up
+        self.finished = False
+        self._latest = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"src-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        t_start = time.perf_counter()
+        frame, self._first = self._first, None
+        while True:
+            if frame is None:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+            frame = cv2.resize(frame, (self.W, self.H))
+            with self._lock:
+                if self._latest is not None:
+                    self.frames_replaced += 1
+                self._latest = frame
+                self.frames_read += 1
+            if self.realtime:
+                delay = t_start + self.frames_read / self.fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            frame = None
+        self.cap.release()
+        self.finished = True
+
+    def take(self):
+        with self._lock:
+            frame, self._latest = self._latest, None
+        return frame
+
+    def exhausted(self):
+        with self._lock:
+            return self.finished and self._latest is None
+
+# ---------------- ENGINE ----------------
+class MultiCameraEngine:
+    """One shared detector over many streams.
+
+    Each step collects the latest pending frame from every source, runs one
+    batched forward pass (split at MAX_BATCH) and routes each result back to
+    that stream's CongestionState.
+    """
+
+    def __init__(self, sources, model, max_batch=MAX_BATCH):
+        self.model = model
+        self.max_batch = max_batch
+        self.sources = {name: FrameSource(name, uri) for name, uri in sources.items()}
+        self.states = {name: CongestionState(src.W, src.H, model.names, VEHICLE_CLASSES,
+                                             GRID_SIZE, SMOOTH_WINDOW, MIN_BOX_SIZE)
+                       for name, src in self.sources.items()}
+        self.latest = {}
+        self.uplink = MetricsUplink(SERVER_URL, POST_INTERVAL)  # all streams share one sender
+        self.batches = 0
+        self.frames = 0
+        self.infer_seconds = 0.0
+
+    def step(self):
+        pending = []
+        for name, src in self.sources.items():
+            frame = src.take()
+            if frame is not None:
+                pending.append((name, frame))
+        for i in range(0, len(pending), self.max_batch):
+            chunk = pending[i:i + self.max_batch]
+            t0 = time.perf_counter()
+            results = self.model([f for _, f in chunk], CONF_THRESH)
+            self.infer_seconds += time.perf_counter() - t0
+            self.batches += 1
+            self.frames += len(chunk)
+            for (name, _), res in zip(chunk, results):
+                self.latest[name] = self.states[name].update(res)
+                self.post(name)
+        return len(pending)
+
+    def post(self, name):
+        m = self.latest[name]
+        self.uplink.submit({
+            "timestamp": time.time(),
+            "camera": name,
+            "counts": m["approach_counts"],
+            "overall_congestion": float(m["smooth_metric"]),
+        })
+
+    def run(self):
+        for src in self.sources.values():
+            src.start()
+        t_start = last_stats = time.perf_counter()
+        while not all(src.exhausted() for src in self.sources.values()):
+            if self.step() == 0:
+                time.sleep(IDLE_SLEEP)
+            if time.perf_counter() - last_stats >= STATS_INTERVAL:
+                self.print_stats(time.perf_counter() - t_start)
+                last_stats = time.perf_counter()
+        self.print_stats(time.perf_counter() - t_start)
+        self.uplink.close()
+        print(f"[INFO] Metrics uplink: {self.uplink.stats()}")
+        return self.summary()
+
+    def print_stats(self, elapsed):
+        avg_batch = self.frames / self.batches if self.batches else 0.0
+        print(f"[INFO] {self.frames} frames in {self.batches} batches (avg {avg_batch:.1f}/batch), "
+              f"{self.frames / max(elapsed, 1e-9):.1f} FPS total, "
+              f"{1000 * self.infer_seconds / max(self.batches, 1):.1f} ms/batch")
+        for name, m in self.latest.items():
+            status, _ = congestion_status(m["smooth_metric"])
+            print(f"  {name:<12} {m['vehicle_count']:>3} vehicles  {status} ({m['smooth_metric']:.1f}%)  "
+                  f"counts {m['approach_counts']}")
+
+    def summary(self):
+        out = {}
+        for name, state in self.states.items():
+            src = self.sources[name]
+            vpf = state.vehicles_per_frame
+            out[name] = {
+                "frames_read": src.frames_read,
+                "frames_analyzed": len(vpf),
+                "frames_replaced": src.frames_replaced,
+                "avg_vehicles": float(np.mean(vpf)) if vpf else 0.0,
+                "max_vehicles": int(max(vpf)) if vpf else 0,
+            }
+        return out
+
+# ---------------- MAIN ----------------
+if __name__ == "__main__":
+    # usage: python multicam.py [name=uri ...]
+    sources = dict(arg.split("=", 1) for arg in sys.argv[1:]) or SOURCES
+    model = load_detector(DETECTOR_BACKEND, MODEL_PATH, threads=DETECTOR_THREADS)
+    print(f"[INFO] Using {DETECTOR_BACKEND} detector on {model.device.upper()}, {len(sources)} stream(s)")
+    summary = MultiCameraEngine(sources, model).run()
+    print("\n========== PER-STREAM SUMMARY ==========")
+    for name, s in summary.items():
+        print(f"{name}: {s['frames_analyzed']}/{s['frames_read']} frames analyzed, "
+              f"avg {s['avg_vehicles']:.1f} vehicles/frame (max {s['max_vehicles']})")
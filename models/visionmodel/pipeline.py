@@ -0,0 +1,172 @@
+import time
+import queue
+import threading
+
+# ---------------- CHANNELS ----------------
+_END = object()  # end-of-stream marker passed down the pipeline
+
+class FrameChannel:
+    """Bounded queue between two stages.
+
+    policy="block" applies backpressure (the producer waits when the
+    consumer falls behind); policy="drop" evicts the oldest queued item so
+    the consumer always sees the freshest frames, as for a live camera.
+    """
+
+    def __init__(self, maxsize, policy="block"):
+        if policy not in ("block", "drop"):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.q = queue.Queue(maxsize=maxsize)
+        self.policy = policy
+        self.dropped = 0
+
+    def put(self, item):
+        if self.policy == "block" or item is _END:
+            self.q.put(item)
+            return
+        while True:
+            try:
+                self.q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.q.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self):
+        return self.q.get()
+
+    def close(self):
+        self.put(_END)
+
+# ---------------- STATS ----------------
+class StageStats:
+    """Throughput counters for one stage (items, busy time, drops)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.started = time.perf_counter()
+        self.channel = None  # input channel, for queue depth / drops
+
+    def record(self, seconds):
+        self.items += 1
+        self.busy += seconds
+
+    def snapshot(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        snap = {
+            "stage": self.name,
+            "items": self.items,
+            "fps": round(self.items / elapsed, 2),
+            "avg_ms": round(1000.0 * self.busy / self.items, 2) if self.items else 0.0,
+            "busy_pct": round(100.0 * self.busy / elapsed, 1),
+        }
+        if self.channel is not None:
+            snap["queue_depth"] = self.channel.q.qsize()
+            snap["dropped"] = self.channel.dropped
+        return snap
+
+# ---------------- PIPELINE ----------------
+class StagedPipeline:
+    """decode thread -> [channel] -> inference thread -> [channel] -> render (caller's thread).
+
+    `produce` is an iterable of work items, `process` maps one item to a
+    result, and `consume` handles results in the calling thread (so
+    cv2.imshow/waitKey stay on the main thread); it may return False to stop.
+    """
+
+    def __init__(self, produce, process, consume, queue_size=4, policy="block"):
+        self.produce = produce
+        self.process = process
+        self.consume = consume
+        self.decoded = FrameChannel(queue_size, policy)
+        self.inferred = FrameChannel(queue_size, policy)
+        self.stop_event = threading.Event()
+        self.stats = {name: StageStats(name) for name in ("decode", "inference", "render")}
+        self.stats["inference"].channel = self.decoded
+        self.stats["render"].channel = self.inferred
+        self.errors = []
+
+    def _decode_loop(self):
+        st = self.stats["decode"]
+        try:
+            it = iter(self.produce)
+            while not self.stop_event.is_set():
+                t0 = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                st.record(time.perf_counter() - t0)
+                self.decoded.put(item)
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            self.decoded.close()
+
+    def _inference_loop(self):
+        st = self.stats["inference"]
+        try:
+            while True:
+                item = self.decoded.get()
+                if item is _END:
+                    break
+                if self.stop_event.is_set():
+                    continue  # drain so the decoder can exit
+                t0 = time.perf_counter()
+                result = self.process(item)
+                st.record(time.perf_counter() - t0)
+                self.inferred.put(result)
+        except Exception as e:
+            self.errors.append(e)
+            self.stop_event.set()
+            while self.decoded.get() is not _END:
+                pass
+        finally:
+            self.inferred.close()
+
+    def run(self):
+        threads = [threading.Thread(target=self._decode_loop, name="decode", daemon=True),
+                   threading.Thread(target=self._inference_loop, name="inference", daemon=True)]
+        for t in threads:
+            t.start()
+        st = self.stats["render"]
+        ended = False
+        try:
+            while True:
+                result = self.inferred.get()
+                if result is _END:
+                    ended = True
+                    break
+                if self.stop_event.is_set():
+                    continue
+                t0 = time.perf_counter()
+                keep_going = self.consume(result)
+                st.record(time.perf_counter() - t0)
+                if keep_going is False:
+                    self.stop_event.set()
+        finally:
+            self.stop_event.set()
+            # if consume raised, keep draining so a blocked inferred.put() can reach _END
+            while not ended:
+                ended = self.inferred.get() is _END
+            for t in threads:
+                t.join()
+        if self.errors:
+            raise self.errors[0]
+        return self.snapshot()
+
+    def snapshot(self):
+        return [st.snapshot() for st in self.stats.values()]
+
+def format_stats(snapshot):
+    lines = []
+    for s in snapshot:
+        extra = f" queue={s['queue_depth']} dropped={s['dropped']}" if "queue_depth" in s else ""
+        lines.append(f"  {s['stage']:<9} {s['items']:>6} items  {s['fps']:>7.2f} it/s  "
+                     f"{s['avg_ms']:>7.2f} ms/it  busy {s['busy_pct']:>5.1f}%{extra}")
+    return "\n".join(lines)
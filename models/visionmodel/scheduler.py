@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+
+# ---------------- ADAPTIVE SCHEDULER ----------------
+class AdaptiveScheduler:
+    """Decides which frames get decoded and which get a detector pass.
+
+    The decode loop skips `frames_to_skip()` frames with cap.grab() (no
+    decode), decodes the next one and asks `should_infer(frame)`. That
+    compares a small blurred grayscale copy with the one taken at the last
+    detector pass: a static scene is skipped (until max_idle frames have
+    passed) and the stride doubles up to max_stride; high motion or a rising
+    smooth_metric (reported via `observe`) drops it back to min_stride.
+    With enabled=False it reproduces a fixed FRAME_SKIP.
+    """
+
+    def __init__(self, min_stride=1, max_stride=16, motion_thresh=0.002, motion_high=0.02,
+                 rise_delta=2.0, max_idle=90, probe_width=160, pixel_delta=25, enabled=True):
+        self.min_stride = min_stride
+        self.max_stride = max_stride
+        self.motion_thresh = motion_thresh
+        self.motion_high = motion_high
+        self.rise_delta = rise_delta
+        self.max_idle = max_idle
+        self.probe_width = probe_width
+        self.pixel_delta = pixel_delta
+        self.enabled = enabled
+
+        self.stride = min_stride
+        self.reference = None      # probe image at the last detector pass
+        self.last_metric = None
+        self.last_motion = 0.0
+        self.idle_frames = 0       # frames advanced since the last detector pass
+        self.grabbed = 0
+        self.decoded = 0
+        self.inferred = 0
+
+    def frames_to_skip(self):
+        return self.stride - 1
+
+    def skipped(self):
+        """Account for a frame consumed with cap.grab() only."""
+        self.grabbed += 1
+        self.idle_frames += 1
+
+    def probe(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.probe_width, max(1, h * self.probe_width // w)),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def motion_score(self, probe):
+        """Fraction of probe pixels that changed since the last detector pass."""
+        if self.reference is None:
+            return 1.0
+        diff = cv2.absdiff(probe, self.reference)
+        return float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+
+    def should_infer(self, frame):
+        self.decoded += 1
+        self.idle_frames += 1
+        if not self.enabled:
+            self.inferred += 1
+            return True
+        probe = self.probe(frame)
+        score = self.last_motion = self.motion_score(probe)
+        if score >= self.motion_high:
+            self.stride = self.min_stride
+        elif score < self.motion_thresh:
+            self.stride = min(self.stride * 2, self.max_stride)
+            if self.idle_frames < self.max_idle:
+                return False
+        else:
+            self.stride = max(self.min_stride, self.stride // 2)
+        self.reference = probe
+        self.idle_frames = 0
+        self.inferred += 1
+        return True
+
+    def observe(self, smooth_metric):
+        """Feed back the congestion metric after a detector pass."""
+        if self.enabled and self.last_metric is not None and smooth_metric - self.last_metric > self.rise_delta:
+            self.stride = self.min_stride
+        self.last_metric = smooth_metric
+
+    def summary(self):
+        total = self.grabbed + self.decoded
+        return {
+            "frames": total,
+            "grabbed_only": self.grabbed,
+            "decoded": self.decoded,
+            "inferred": self.inferred,
+            "inference_ratio": round(self.inferred / total, 3) if total else 0.0,
+        }
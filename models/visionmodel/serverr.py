@@ -1,18 +1,49 @@
 # server.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict
-import uvicorn, csv, time, os
+from typing import Dict, List, Optional
+import uvicorn, time, json, math
+import numpy as np
 
-app = FastAPI(title="Smart Signal Optimizer API")
-LOG_CSV = "optimizer_log.csv"
+from storage import SignalStore, DB_PATH, DEFAULT_INTERSECTION
+from broadcast import SignalHub, MIN_INTERVAL
+from forecast import SignalForecaster, STATE_FILE as FORECAST_STATE
+from looplag import LoopLag
+
+FORECAST = False        # blend predicted near-term load into the timings (see forecast.py); needs the
+                        # multi-horizon model, and /metrics/batch then needs "intersections" to match /metrics
+FORECAST_BLEND = 0.3    # 0 = live counts only, 1 = forecast only
+
+store = None
+forecaster = None
+hub = SignalHub()
+loop_lag = LoopLag()
+
+@asynccontextmanager
+async def lifespan(app):
+    global store, forecaster
+    store = SignalStore(DB_PATH)
+    # loads the model and refreshes forecasts in its own thread; requests only read its cache
+    forecaster = SignalForecaster(state_file=FORECAST_STATE) if FORECAST else None
+    loop_lag.start()  # how late the event loop runs callbacks; see /debug/looplag
+    yield
+    loop_lag.stop()
+    if forecaster is not None:
+        forecaster.close()
+    store.close()
+
+app = FastAPI(title="Smart Signal Optimizer API", lifespan=lifespan)
 
 class Metrics(BaseModel):
     counts: Dict[str,int]
     queues: Dict[str,int] = None
     overall_congestion: float = 0.0
+    camera: Optional[str] = None
+    timestamp: Optional[float] = None
 
-def optimize_signal(counts, queues=None, overall_congestion=0.0):
+def optimize_signal(counts, queues=None, overall_congestion=0.0, forecast=None, blend=FORECAST_BLEND):
     # adaptive base_time derived from counts
     total = sum(counts.values()) + 1e-6
     # base time increases with total vehicles, bounded
@@ -20,8 +51,14 @@ def optimize_signal(counts, queues=None, overall_congestion=0.0):
     weights = {}
     for d,v in counts.items():
         q = (queues.get(d,0) if queues else 0)
+        if forecast is not None:
+            # forecast ratios (predicted / recent load) shift each approach's share
+            v = v * (1 - blend + blend * forecast["approaches"].get(d, 1.0))
         weights[d] = max(0.1, v + 2*q)
     s = sum(weights.values())
+    if forecast is not None:
+        # rising load picks the larger scale earlier, falling load later
+        overall_congestion = min(100.0, overall_congestion * (1 - blend + blend * forecast["total"]))
     scale = 50.0 if overall_congestion>70 else 30.0 if overall_congestion>40 else 15.0
     raw = {d: max(8.0, min(60.0, round(base_time + (weights[d]/s)*scale,1))) for d in weights}
     # normalize to 120s total cycle optionally
@@ -32,28 +69,239 @@ def optimize_signal(counts, queues=None, overall_congestion=0.0):
         raw = {k: round(v*factor,1) for k,v in raw.items()}
     return {"base": {d: round(base_time,1) for d in counts}, "optimized": raw}
 
+# ---------------- BATCH (columnar) ----------------
+def _round1(x):
+    """Elementwise round(x, 1) with Python's result; np.round differs on some near-half values."""
+    y = np.round(x, 1)
+    t = x * 10.0
+    near = np.abs(t - np.floor(t) - 0.5) < 1e-6
+    if near.any():
+        y[near] = [round(v, 1) for v in x[near].tolist()]
+    return y
+
+def _rowsum(x):
+    # left-to-right like sum() over a dict; np.sum's pairwise order can differ in the last bit
+    s = x[:, 0].copy()
+    for j in range(1, x.shape[1]):
+        s += x[:, j]
+    return s
+
+def optimize_signals_batch(counts, queues=None, overall_congestion=None, present=None, forecasts=None,
+                           blend=FORECAST_BLEND):
+    """optimize_signal over n intersections x k approaches at once.
+
+    counts/queues are (n, k); `present` masks approaches an intersection
+    does not have. `forecasts` is an optional (ratios (n, k), totals (n,))
+    pair, NaN for rows without a forecast. Returns base (n,) and optimized
+    (n, k) (NaN where absent), identical to calling optimize_signal per
+    intersection.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    n, k = counts.shape
+    present = np.ones((n, k), dtype=bool) if present is None else np.asarray(present, dtype=bool)
+    counts = np.where(present, counts, 0)
+    queues = np.zeros_like(counts) if queues is None else np.where(present, np.asarray(queues, dtype=np.int64), 0)
+    cong = np.zeros(n) if overall_congestion is None else np.asarray(overall_congestion, dtype=float)
+
+    total = counts.sum(axis=1) + 1e-6
+    base_time = np.maximum(8.0, np.minimum(25.0, 8.0 + (total/4.0)))
+    v = counts
+    if forecasts is not None:
+        ratios, totals = forecasts
+        has_fc = ~np.isnan(totals)
+        v = np.where(has_fc[:, None], counts * (1 - blend + blend * ratios), counts)
+        cong = np.where(has_fc, np.minimum(100.0, cong * (1 - blend + blend * np.nan_to_num(totals))), cong)
+    weights = np.where(present, np.maximum(0.1, v + 2*queues), 0.0)
+    s = _rowsum(weights)
+    scale = np.where(cong > 70, 50.0, np.where(cong > 40, 30.0, 15.0))
+    with np.errstate(invalid="ignore", divide="ignore"):  # rows with no approaches: 0/0, masked below
+        raw = np.maximum(8.0, np.minimum(60.0, _round1(base_time[:, None] + (weights/s[:, None])*scale[:, None])))
+    raw = np.where(present, raw, 0.0)
+    total_alloc = _rowsum(raw)
+    over = total_alloc > 120.0
+    if over.any():
+        factor = 120.0 / total_alloc[over]
+        raw[over] = _round1(raw[over]*factor[:, None])
+    return _round1(base_time), np.where(present, raw, np.nan)
+
+def _batch_forecasts(intersections, approaches):
+    """Cached forecast ratios for a batch's rows, in optimize_signals_batch's (ratios, totals) form."""
+    if forecaster is None or not intersections:
+        return None
+    n, k = len(intersections), len(approaches)
+    ratios, totals = np.ones((n, k)), np.full(n, np.nan)
+    for i, intersection in enumerate(intersections):
+        fc = forecaster.get(intersection or DEFAULT_INTERSECTION)
+        if fc is not None:
+            totals[i] = fc["total"]
+            ratios[i] = [fc["approaches"].get(d, 1.0) for d in approaches]
+    return (ratios, totals) if not np.isnan(totals).all() else None
+
+def _is_number(v):
+    # json.loads also yields NaN / Infinity; those are not valid values either
+    return isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+
+def _matrix(payload, key, n, k):
+    """(n, k) float matrix of non-negative whole numbers, NaN for null; ValueError otherwise.
+
+    Like /metrics' int fields, 2.0 is accepted and 2.5 is not.
+    """
+    rows = payload[key]
+    if not isinstance(rows, list) or len(rows) != n or any(not isinstance(r, list) or len(r) != k for r in rows):
+        raise ValueError(f"{key} must be {n} x {k}")
+    if any(v is not None and not _is_number(v) for row in rows for v in row):
+        raise ValueError(f"{key} must hold numbers or null")
+    a = np.asarray([[np.nan if v is None else v for v in row] for row in rows], dtype=float)
+    vals = a[~np.isnan(a)]
+    if (vals < 0).any() or (vals != np.floor(vals)).any():
+        raise ValueError(f"{key} must be non-negative integers or null")
+    return a
+
+@app.post("/metrics/batch")
+async def receive_batch(request: Request):
+    """Columnar bulk optimization, no per-item validation models.
+
+    Body: {"approaches": [k names], "counts": [[n x k]], "queues": [[n x k]] (optional),
+    "overall_congestion": [n] (optional), "intersections": [n ids] (optional)};
+    null marks an approach an intersection does not have. Counts and queues must
+    be non-negative integers or null and congestion values numbers (null is
+    rejected, as in /metrics); anything else is a 422. Stateless: results are
+    returned, not logged. With FORECAST on, rows whose intersection has a
+    cached forecast get the same blend as /metrics.
+    """
+    try:
+        payload = json.loads(await request.body())
+        approaches = list(payload["approaches"])
+        n, k = len(payload["counts"]), len(approaches)
+        counts = _matrix(payload, "counts", n, k)
+        queues = _matrix(payload, "queues", n, k) if payload.get("queues") is not None else None
+        cong = payload.get("overall_congestion")
+        if cong is not None:
+            # as in /metrics, a congestion value is a number; null entries are rejected, not read as 0
+            if len(cong) != n or not all(_is_number(c) for c in cong):
+                raise ValueError(f"overall_congestion must have {n} numbers")
+            cong = np.asarray(cong, dtype=float)
+        intersections = payload.get("intersections")
+        if intersections is not None and len(intersections) != n:
+            raise ValueError(f"intersections must have {n} values")
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=f"bad batch payload: {e}")
+    present = ~np.isnan(counts)
+    if queues is not None:
+        queues = np.nan_to_num(queues)
+    base, opt = optimize_signals_batch(np.nan_to_num(counts), queues, cong, present,
+                                       _batch_forecasts(intersections, approaches))
+    opt_out = opt.astype(object)
+    opt_out[~present] = None
+    return {"approaches": approaches, "intersections": payload.get("intersections"),
+            "base": base.tolist(), "optimized": opt_out.tolist()}
+
+def handle_metrics(items):
+    results = []
+    for m in items:
+        intersection, ts = m.camera or DEFAULT_INTERSECTION, m.timestamp or time.time()
+        fc = None
+        if forecaster is not None:
+            forecaster.observe(intersection, ts, m.counts)
+            fc = forecaster.get(intersection)  # cached; never runs the model here
+        res = optimize_signal(m.counts, m.queues or {}, m.overall_congestion, fc)
+        # in-memory latest + queued for the background writer; no disk I/O here
+        store.record(intersection, ts, m.counts, m.queues, m.overall_congestion, res["base"], res["optimized"])
+        hub.publish(intersection, ts, res["optimized"])
+        out = {"original_timings": res["base"], "optimized_timings": res["optimized"]}
+        if fc is not None:
+            out["forecast_ratio"] = fc["total"]
+        results.append(out)
+    return results
+
 @app.post("/metrics")
 async def receive(m: Metrics):
-    res = optimize_signal(m.counts, m.queues or {}, m.overall_congestion)
-    # log
-    if not os.path.exists(LOG_CSV):
-        with open(LOG_CSV,'w',newline='') as f:
-            w = csv.writer(f); w.writerow(["ts","counts","queues","cong","base","opt"])
-    with open(LOG_CSV,'a',newline='') as f:
-        w = csv.writer(f)
-        w.writerow([time.time(), m.counts, m.queues, m.overall_congestion, res["base"], res["optimized"]])
-    return {"original_timings": res["base"], "optimized_timings": res["optimized"]}
+    return handle_metrics([m])[0]
+
+@app.post("/metrics/bulk")
+async def receive_bulk(items: List[Metrics]):
+    # several cameras per request (see uplink.MetricsUplink); one log append for all of them
+    return handle_metrics(items)
 
 @app.get("/signals")
-def get_signals():
-    # return last row of CSV if exists
-    if os.path.exists(LOG_CSV):
-        with open(LOG_CSV,'r') as f:
-            rows = list(csv.reader(f))
-            if len(rows)>1:
-                last = rows[-1]
-                return {"last": last}
-    return {"last": None}
+def get_signals(intersection: Optional[str] = None):
+    # latest row, overall or for one intersection (camera id); served from memory
+    return {"last": store.get_latest(intersection)}
+
+@app.get("/signals/latest")
+def get_all_signals():
+    return store.latest
+
+# ---------------- PUSH (WebSocket / SSE) ----------------
+# Clients get {"intersection", "ts", "full", "timings"[, "removed"]} updates: the first
+# message per intersection is full, later ones carry only approaches whose timing changed.
+@app.websocket("/ws/signals")
+async def signals_ws(ws: WebSocket, intersection: Optional[List[str]] = Query(None),
+                     interval: float = MIN_INTERVAL):
+    if not 0 <= interval <= 60:
+        await ws.close(code=1008)
+        return
+    sub = hub.subscribe(intersection, min_interval=interval)
+    if sub is None:
+        await ws.close(code=1013)  # try again later
+        return
+    await ws.accept()
+    try:
+        while True:
+            batch = await sub.next_batch()
+            await ws.send_json({"type": "timings", "updates": batch} if batch else {"type": "keepalive"})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        hub.unsubscribe(sub)
+
+@app.get("/signals/stream")
+async def signals_sse(request: Request, intersection: Optional[List[str]] = Query(None),
+                      interval: float = MIN_INTERVAL):
+    if not 0 <= interval <= 60:
+        raise HTTPException(status_code=400, detail="interval must be in [0, 60]")
+    sub = hub.subscribe(intersection, min_interval=interval)
+    if sub is None:
+        raise HTTPException(status_code=503, detail="too many subscribers")
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                batch = await sub.next_batch()
+                yield f"event: timings\ndata: {json.dumps(batch)}\n\n" if batch else ": keepalive\n\n"
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/stream/stats")
+def stream_stats():
+    return hub.stats()
+
+@app.get("/history")
+def get_history(intersection: Optional[str] = None, start: Optional[float] = None,
+                end: Optional[float] = None, limit: int = 1000):
+    if limit < 1 or limit > 100_000:
+        raise HTTPException(status_code=400, detail="limit must be in [1, 100000]")
+    return {"rows": store.history(intersection, start, end, limit)}
+
+@app.get("/forecast")
+def get_forecast(intersection: Optional[str] = None):
+    if forecaster is None:
+        return {"enabled": False}
+    if intersection is not None:
+        return {"forecast": forecaster.get(intersection), **forecaster.stats()}
+    return {"forecasts": forecaster.cache, **forecaster.stats()}
+
+@app.get("/debug/looplag")
+async def get_loop_lag(reset: bool = False):
+    # async so it runs on the probed loop; reset=true starts a new measurement window
+    return loop_lag.snapshot(reset)
+
+@app.get("/storage/stats")
+def storage_stats():
+    return store.stats()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
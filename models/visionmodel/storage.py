@@ -0,0 +1,135 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+# ---------------- CONFIG ----------------
+DB_PATH = "optimizer_log.db"
+BATCH_SIZE = 500          # rows per transaction
+FLUSH_INTERVAL = 0.5      # seconds a partial batch may wait
+MAX_QUEUE = 100_000       # rows waiting for the writer; record() drops beyond this
+DEFAULT_INTERSECTION = "default"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    ts REAL NOT NULL,
+    intersection TEXT NOT NULL,
+    counts TEXT, queues TEXT, cong REAL, base TEXT, opt TEXT
+);
+CREATE INDEX IF NOT EXISTS signals_by_intersection ON signals (intersection, ts);
+CREATE INDEX IF NOT EXISTS signals_by_ts ON signals (ts);
+"""
+COLUMNS = ("ts", "intersection", "counts", "queues", "cong", "base", "opt")
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+# ---------------- STORE ----------------
+class SignalStore:
+    """Latest timings per intersection in memory, history in SQLite (WAL).
+
+    record() only updates a dict and enqueues the row, so request handlers
+    never touch the disk; a writer thread commits rows in batches. Reads of
+    the latest state are dict lookups; history() runs an indexed range
+    query on its own connection, which WAL lets proceed alongside writes.
+    """
+
+    def __init__(self, path=DB_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_queue=MAX_QUEUE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.latest = {}
+        self.last = None          # most recent row over all intersections
+        self.rows_recorded = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._read_conn = _connect(path)
+        self._read_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._writer, name="signal-store-writer", daemon=True)
+        self._thread.start()
+
+    # ---------- write ----------
+    def record(self, intersection, ts, counts, queues, cong, base, opt):
+        row = {"ts": ts, "intersection": intersection, "counts": counts, "queues": queues,
+               "cong": cong, "base": base, "opt": opt}
+        current = self.latest.get(intersection)
+        if current is None or ts >= current["ts"]:  # replayed (older) rows must not win
+            self.latest[intersection] = row
+        if self.last is None or ts >= self.last["ts"]:
+            self.last = row
+        self.rows_recorded += 1
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.rows_dropped += 1
+        return row
+
+    def _writer(self):
+        conn = _connect(self.path)
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if batch:
+                with conn:
+                    conn.executemany("INSERT INTO signals VALUES (?, ?, ?, ?, ?, ?, ?)", [
+                        (r["ts"], r["intersection"], json.dumps(r["counts"]), json.dumps(r["queues"]),
+                         r["cong"], json.dumps(r["base"]), json.dumps(r["opt"])) for r in batch])
+                self.rows_written += len(batch)
+        conn.close()
+
+    def close(self, timeout=10.0):
+        self._stop.set()
+        self._thread.join(timeout)
+        self._read_conn.close()
+
+    # ---------- read ----------
+    def get_latest(self, intersection=None):
+        if intersection is not None:
+            return self.latest.get(intersection)
+        return self.last
+
+    def history(self, intersection=None, start=None, end=None, limit=1000):
+        """Rows with start <= ts < end, oldest first."""
+        sql, args = "SELECT * FROM signals WHERE 1=1", []
+        if intersection is not None:
+            sql += " AND intersection = ?"
+            args.append(intersection)
+        if start is not None:
+            sql += " AND ts >= ?"
+            args.append(start)
+        if end is not None:
+            sql += " AND ts < ?"
+            args.append(end)
+        sql += " ORDER BY ts LIMIT ?"
+        args.append(limit)
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, args).fetchall()
+        out = []
+        for r in rows:
+            row = dict(zip(COLUMNS, r))
+            for k in ("counts", "queues", "base", "opt"):
+                row[k] = json.loads(row[k]) if row[k] is not None else None
+            out.append(row)
+        return out
+
+    def stats(self):
+        return {"intersections": len(self.latest), "rows_written": self.rows_written,
+                "rows_queued": self._queue.qsize(), "rows_dropped": self.rows_dropped,
+                "rows_pending": self.rows_recorded - self.rows_written - self.rows_dropped}
@@ -0,0 +1,187 @@
+import json
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------- CONFIG ----------------
+MIN_SECONDS = 1e-5        # histogram range: 10 us ..
+MAX_SECONDS = 10.0        # .. 10 s, log-spaced
+BUCKETS_PER_DOUBLING = 4  # ~19% bucket width, so percentiles are within ~10%
+DUMP_INTERVAL = 5.0
+
+# ---------------- HISTOGRAM ----------------
+def _bounds():
+    bounds, b = [], MIN_SECONDS
+    while b < MAX_SECONDS:
+        bounds.append(b)
+        b *= 2 ** (1 / BUCKETS_PER_DOUBLING)
+    return bounds
+
+BOUNDS = _bounds()
+
+class Histogram:
+    """Fixed log-spaced buckets: O(log buckets) per sample, no allocation, constant memory."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_right(BOUNDS, seconds)] += 1
+        self.n += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        if not self.n:
+            return 0.0
+        rank, seen = q / 100 * self.n, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                # upper edge of the bucket, capped by the largest sample seen
+                return min(BOUNDS[i] if i < len(BOUNDS) else self.max, self.max)
+        return self.max
+
+    def snapshot(self):
+        ms = lambda s: round(1000 * s, 3)
+        return {"count": self.n, "mean_ms": ms(self.total / self.n) if self.n else 0.0,
+                "p50_ms": ms(self.percentile(50)), "p90_ms": ms(self.percentile(90)),
+                "p99_ms": ms(self.percentile(99)), "max_ms": ms(self.max), "total_s": round(self.total, 3)}
+
+# ---------------- TELEMETRY ----------------
+class Telemetry:
+    """Per-stage timing histograms plus counters, for the vision hot path.
+
+    Stages are timed by chaining laps:  t = tel.clock(); ...; t = tel.lap("decode", t).
+    Gauges are callables evaluated only when a snapshot is taken (e.g. the
+    uplink's drop counters). Snapshots can be served over HTTP on
+    127.0.0.1:<http_port> (GET /stats) and/or appended to a JSON-lines file
+    every dump_interval seconds. Use NULL_TELEMETRY when disabled.
+    """
+
+    enabled = True
+
+    def __init__(self, http_port=0, dump_path=None, dump_interval=DUMP_INTERVAL):
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.time()
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self._stop = threading.Event()
+        self._threads = []
+        self._server = None
+        if http_port:
+            self._server = ThreadingHTTPServer(("127.0.0.1", http_port), self._handler())
+            self._threads.append(threading.Thread(target=self._server.serve_forever, name="telemetry-http",
+                                                  daemon=True))
+        if dump_path:
+            self._threads.append(threading.Thread(target=self._dump_loop, name="telemetry-dump", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    # ---------- hot path ----------
+    clock = staticmethod(time.perf_counter)
+
+    def lap(self, stage, t0):
+        """Records now - t0 under `stage` and returns now, to start the next stage."""
+        now = time.perf_counter()
+        hist = self.stages.get(stage)
+        if hist is None:
+            hist = self.stages[stage] = Histogram()
+        hist.add(now - t0)
+        return now
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    # ---------- reporting ----------
+    def gauge(self, name, fn):
+        self.gauges[name] = fn
+
+    def snapshot(self):
+        snap = {"ts": time.time(), "uptime_s": round(time.time() - self.started, 3),
+                "stages": {name: h.snapshot() for name, h in list(self.stages.items())},
+                "counters": dict(self.counters)}
+        for name, fn in list(self.gauges.items()):
+            try:
+                snap[name] = fn()
+            except Exception as e:  # a gauge must never break reporting
+                snap[name] = {"error": str(e)}
+        return snap
+
+    def dump(self):
+        with open(self.dump_path, "a") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+    def _dump_loop(self):
+        while not self._stop.wait(self.dump_interval):
+            self.dump()
+
+    def _handler(self):
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/stats"):
+                    self.send_error(404)
+                    return
+                body = json.dumps(telemetry.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.dump_path:
+            self.dump()  # final state, even for runs shorter than one interval
+
+class _NullTelemetry:
+    """Disabled telemetry: every hot-path call is an empty method."""
+
+    enabled = False
+
+    @staticmethod
+    def clock():
+        return 0.0
+
+    def lap(self, stage, t0):
+        return 0.0
+
+    def count(self, name, n=1):
+        pass
+
+    def gauge(self, name, fn):
+        pass
+
+    def snapshot(self):
+        return None
+
+    def close(self):
+        pass
+
+NULL_TELEMETRY = _NullTelemetry()
+
+def format_snapshot(snap):
+    lines = [f"  {'stage':<10} {'count':>7} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  (ms)"]
+    for name, s in snap["stages"].items():
+        lines.append(f"  {name:<10} {s['count']:>7} {s['mean_ms']:>9.3f} {s['p50_ms']:>9.3f} {s['p90_ms']:>9.3f} "
+                     f"{s['p99_ms']:>9.3f} {s['max_ms']:>9.3f}")
+    if snap["counters"]:
+        lines.append("  counters: " + ", ".join(f"{k}={v}" for k, v in snap["counters"].items()))
+    return "\n".join(lines)
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import serverr
+from serverr import optimize_signal, optimize_signals_batch
+
+APPROACHES = ["north", "south", "east", "west"]
+
+def random_batch(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    k = len(APPROACHES)
+    counts = rng.integers(0, 80, (n, k))
+    queues = rng.integers(0, 30, (n, k))
+    cong = rng.uniform(0, 100, n).round(1)
+    present = rng.random((n, k)) > 0.15
+    present[:5] = False  # rows with no approaches at all
+    return counts, queues, cong, present
+
+def per_row(counts, queues, cong, present, forecasts=None):
+    base, opt = np.full(len(counts), np.nan), np.full(counts.shape, np.nan)
+    for i in range(len(counts)):
+        names = [d for d, p in zip(APPROACHES, present[i]) if p]
+        row = {d: int(counts[i, j]) for j, d in enumerate(APPROACHES) if present[i, j]}
+        q = {d: int(queues[i, j]) for j, d in enumerate(APPROACHES) if present[i, j]}
+        fc = None
+        if forecasts is not None and not np.isnan(forecasts[1][i]):
+            fc = {"approaches": dict(zip(APPROACHES, forecasts[0][i])), "total": forecasts[1][i]}
+        res = optimize_signal(row, q, float(cong[i]), fc)
+        if names:
+            base[i] = res["base"][names[0]]
+        for j, d in enumerate(APPROACHES):
+            if d in res["optimized"]:
+                opt[i, j] = res["optimized"][d]
+    return base, opt
+
+@pytest.mark.parametrize("with_forecasts", [False, True])
+def test_batch_matches_per_row(with_forecasts):
+    counts, queues, cong, present = random_batch()
+    forecasts = None
+    if with_forecasts:
+        rng = np.random.default_rng(1)
+        totals = rng.uniform(0.5, 2.0, len(counts))
+        totals[rng.random(len(counts)) < 0.3] = np.nan  # rows without a forecast
+        forecasts = (rng.uniform(0.5, 2.0, counts.shape), totals)
+    base, opt = optimize_signals_batch(counts, queues, cong, present, forecasts)
+    exp_base, exp_opt = per_row(counts, queues, cong, present, forecasts)
+    has_any = present.any(axis=1)
+    np.testing.assert_array_equal(base[has_any], exp_base[has_any])
+    np.testing.assert_array_equal(opt, exp_opt)
+
+def test_batch_endpoint_matches_per_row():
+    counts, queues, cong, present = random_batch(n=200, seed=2)
+    body = {"approaches": APPROACHES,
+            "counts": [[int(v) if p else None for v, p in zip(r, pr)] for r, pr in zip(counts, present)],
+            "queues": queues.tolist(), "overall_congestion": cong.tolist()}
+    resp = TestClient(serverr.app).post("/metrics/batch", json=body)  # stateless: no lifespan needed
+    assert resp.status_code == 200
+    opt = np.array([[np.nan if v is None else v for v in r] for r in resp.json()["optimized"]])
+    np.testing.assert_array_equal(opt, per_row(counts, queues, cong, present)[1])
+
+def test_batch_endpoint_rejects_mismatched_lengths():
+    client = TestClient(serverr.app)
+    body = {"approaches": ["north"], "counts": [[1], [2]], "intersections": ["a"]}
+    assert client.post("/metrics/batch", json=body).status_code == 422
+    body = {"approaches": ["north"], "counts": [[1, 2]]}
+    assert client.post("/metrics/batch", json=body).status_code == 422
+
+@pytest.mark.parametrize("change", [
+    {"counts": [[1.5, 2]]},                  # /metrics rejects non-integer counts too
+    {"counts": [[-1, 2]]},
+    {"counts": [["3", 2]]},
+    {"counts": [[True, 2]]},
+    {"queues": [[0, 0.5]]},
+    {"queues": [[0, -2]]},
+    {"overall_congestion": [None]},          # not silently the lowest congestion scale
+    {"overall_congestion": ["high"]},
+    {"counts": [[1, 2], [3, 4]]},
+    {"counts": [[1]]},
+])
+def test_batch_endpoint_rejects_bad_values(change):
+    body = {"approaches": ["north", "south"], "counts": [[1, 2]], "queues": [[0, 1]],
+            "overall_congestion": [50.0], **change}
+    assert TestClient(serverr.app).post("/metrics/batch", json=body).status_code == 422
+
+def test_batch_endpoint_accepts_whole_floats_and_nulls():
+    body = {"approaches": ["north", "south"], "counts": [[1.0, None]], "queues": [[None, 0]],
+            "overall_congestion": [80]}
+    resp = TestClient(serverr.app).post("/metrics/batch", json=body)
+    assert resp.status_code == 200
+    assert resp.json()["optimized"][0] == [optimize_signal({"north": 1}, {"north": 0}, 80.0)["optimized"]["north"], None]
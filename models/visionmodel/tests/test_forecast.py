@@ -0,0 +1,75 @@
+import os
+import sys
+import threading
+import pytest
+
+import forecast
+from forecast import SignalForecaster, SAMPLE_MINUTES, MAX_GAP_FILL
+
+sys.path.append(forecast.PREDICTOR_DIR)
+from streaming_features import StreamingFeatureEngine  # noqa: E402
+
+BUCKET = SAMPLE_MINUTES * 60
+T0 = 1_700_000_100 // BUCKET * BUCKET  # long closed by the time refresh() runs
+
+class StubModel:
+    def predict(self, X, horizons):
+        return {h: X[:, 0] for h in horizons}
+
+@pytest.fixture
+def fc(tmp_path):
+    f = SignalForecaster(model_file=str(tmp_path / "missing.tpm"), state_file=str(tmp_path / "state.json"),
+                         volume_scale=1.0)
+    f._thread.join()  # the model is missing, so the background thread exits after _load
+    f.engine, f.artifact = StreamingFeatureEngine(), StubModel()
+    return f
+
+def feed(fc, buckets, value=lambda b: 10 + b % 7):
+    for b in buckets:
+        fc.observe("x", T0 + b * BUCKET, {"N": value(b)})
+    fc.refresh()
+
+def test_consecutive_buckets(fc):
+    feed(fc, range(10))
+    st = fc.engine.sites["x/N"]
+    assert st.count == 10 and fc.gap_fills == fc.gap_resets == 0
+
+def test_short_gap_is_filled_with_last_value(fc):
+    gap = MAX_GAP_FILL
+    buckets = list(range(5)) + list(range(5 + gap, 10 + gap))
+    feed(fc, buckets)
+    assert fc.gap_fills == 1 and fc.engine.sites["x/N"].count == 10 + gap
+    # same as replaying the series with the missing buckets carrying the last value forward
+    ref = StreamingFeatureEngine()
+    for b in range(10 + gap):
+        ref.update("s", forecast._bucket_time(T0 // BUCKET + b), 10 + (b if b in buckets else 4) % 7)
+    assert fc.engine.sites["x/N"].to_dict()["buf"] == ref.sites["s"].to_dict()["buf"]
+
+def test_long_gap_resets_history(fc):
+    feed(fc, list(range(5)) + [5 + MAX_GAP_FILL + 1, 6 + MAX_GAP_FILL + 1])
+    assert fc.gap_resets == 1 and fc.engine.sites["x/N"].count == 2
+
+def test_gap_across_restart(fc, tmp_path):
+    feed(fc, range(5))
+    fc.close()
+    fresh = SignalForecaster(model_file=str(tmp_path / "missing.tpm"), state_file=fc.state_file, volume_scale=1.0)
+    fresh._thread.join()
+    fresh.engine, fresh._last = fresh._read_state(fc.state_file)
+    fresh.artifact = StubModel()
+    feed(fresh, [100, 101])
+    assert fresh.gap_resets == 1 and fresh.engine.sites["x/N"].count == 2
+
+def test_old_state_format_is_rejected(fc, tmp_path):
+    path = str(tmp_path / "old.json")
+    StreamingFeatureEngine().save(path)
+    with pytest.raises(ValueError):
+        fc._read_state(path)
+
+def test_close_does_not_save_while_refresh_is_running(fc, monkeypatch):
+    monkeypatch.setattr(forecast, "CLOSE_TIMEOUT", 0.05)
+    release = threading.Event()
+    fc._thread = threading.Thread(target=release.wait, daemon=True)
+    fc._thread.start()
+    fc.close()
+    release.set()
+    assert not os.path.exists(fc.state_file)
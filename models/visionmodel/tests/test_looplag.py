@@ -0,0 +1,17 @@
+import time
+from fastapi.testclient import TestClient
+
+import serverr
+
+def test_debug_looplag_samples_the_server_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(serverr, "DB_PATH", str(tmp_path / "log.db"))
+    with TestClient(serverr.app) as client:  # runs the lifespan, which starts the probe
+        client.get("/debug/looplag", params={"reset": True})
+        time.sleep(0.3)
+        snap = client.get("/debug/looplag").json()
+        assert snap["interval_ms"] == 1000 * serverr.loop_lag.interval
+        assert snap["samples"] >= 10
+        assert 0 <= snap["lag_ms"]["p50"] <= snap["lag_ms"]["max"]
+        # reset=true starts a new window
+        client.get("/debug/looplag", params={"reset": True})
+        assert client.get("/debug/looplag").json()["samples"] <= 2
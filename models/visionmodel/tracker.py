@@ -0,0 +1,197 @@
+from collections import deque
+import numpy as np
+
+# ---------------- CONFIG ----------------
+HIGH_CONF = 0.5      # ByteTrack-style: match confident detections first, then the rest
+IOU_MATCH = 0.3
+MIN_HITS = 2         # detections before a track is confirmed (and counted once)
+MAX_MISSES = 2       # detector passes a track may go unmatched before it is dropped
+ALPHA, BETA = 0.7, 0.3   # constant-velocity (alpha-beta) filter gains
+FLOW_WINDOW = 60.0   # seconds of confirmed tracks used for flow rates
+
+# ---------------- MATCHING ----------------
+def iou_matrix(a, b):
+    """Pairwise IoU of xyxy boxes a (n,4) and b (m,4)."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+def greedy_match(iou, thresh):
+    """Highest-IoU-first one-to-one matching; returns (row, col) pairs."""
+    pairs, used_r, used_c = [], set(), set()
+    if iou.size == 0:
+        return pairs
+    for idx in np.argsort(-iou, axis=None):
+        r, c = divmod(int(idx), iou.shape[1])
+        if iou[r, c] < thresh:
+            break
+        if r in used_r or c in used_c:
+            continue
+        pairs.append((r, c))
+        used_r.add(r)
+        used_c.add(c)
+    return pairs
+
+# ---------------- COUNTING ----------------
+class FlowCounter:
+    """Unique-vehicle counts and per-approach flow (vehicles/min).
+
+    A vehicle is attributed to approaches with the same N/S and E/W halves
+    rule as CongestionState, using its center when its track is confirmed.
+    """
+
+    def __init__(self, W, H, window=FLOW_WINDOW):
+        self.W, self.H = W, H
+        self.window = window
+        self.unique = 0
+        self.totals = {"N": 0, "E": 0, "S": 0, "W": 0}
+        self._events = deque()  # (t, ns, ew)
+
+    def count(self, box, t):
+        cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        ns = "N" if cy < self.H // 2 else "S"
+        ew = "W" if cx < self.W // 2 else "E"
+        self.unique += 1
+        self.totals[ns] += 1
+        self.totals[ew] += 1
+        self._events.append((t, ns, ew))
+
+    def flow_per_min(self, t):
+        while self._events and self._events[0][0] < t - self.window:
+            self._events.popleft()
+        flow = {"N": 0, "E": 0, "S": 0, "W": 0}
+        for _, ns, ew in self._events:
+            flow[ns] += 1
+            flow[ew] += 1
+        span = min(self.window, t) if t > 0 else self.window
+        return {k: round(v * 60.0 / span, 2) for k, v in flow.items()}
+
+# ---------------- IOU TRACKER ----------------
+class Track:
+    __slots__ = ("id", "box", "v", "t", "conf", "cls", "hits", "misses", "counted")
+
+    def __init__(self, tid, det, t):
+        self.id = tid
+        self.box = det[:4].astype(float)
+        self.v = np.zeros(4)  # px/s for each box edge
+        self.t = t
+        self.conf, self.cls = float(det[4]), float(det[5])
+        self.hits, self.misses, self.counted = 1, 0, False
+
+    def predict(self, t):
+        return self.box + self.v * (t - self.t)
+
+    def correct(self, det, t):
+        dt = t - self.t
+        pred = self.predict(t)
+        resid = det[:4] - pred
+        self.box = pred + ALPHA * resid
+        if dt > 0:
+            self.v = self.v + BETA * resid / dt
+        self.t = t
+        self.conf, self.cls = float(det[4]), float(det[5])
+        self.hits += 1
+        self.misses = 0
+
+class IoUTracker:
+    """IoU tracker with ByteTrack-style two-stage association.
+
+    `update(dets, t)` runs on detector frames (dets is (n,6) xyxy/conf/cls);
+    `predict(t)` moves confirmed tracks forward with their constant-velocity
+    estimate on frames the detector skips. Both return (boxes (n,6), ids).
+    """
+
+    def __init__(self, W, H, high_conf=HIGH_CONF, iou_match=IOU_MATCH, min_hits=MIN_HITS, max_misses=MAX_MISSES):
+        self.high_conf = high_conf
+        self.iou_match = iou_match
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.tracks = []
+        self.next_id = 1
+        self.counter = FlowCounter(W, H)
+
+    def update(self, dets, t, frame=None):
+        dets = np.asarray(dets, dtype=float).reshape(-1, 6)
+        preds = np.array([tr.predict(t) for tr in self.tracks]).reshape(-1, 4)
+        free_tracks = list(range(len(self.tracks)))
+        high = dets[:, 4] >= self.high_conf
+        for group in (np.flatnonzero(high), np.flatnonzero(~high)):
+            iou = iou_matrix(preds[free_tracks], dets[group, :4])
+            matched = set()
+            for r, c in greedy_match(iou, self.iou_match):
+                self.tracks[free_tracks[r]].correct(dets[group[c]], t)
+                matched.add(r)
+                high[group[c]] = False  # consumed; not a new track
+            free_tracks = [ti for i, ti in enumerate(free_tracks) if i not in matched]
+
+        for ti in free_tracks:
+            self.tracks[ti].misses += 1
+        self.tracks = [tr for tr in self.tracks if tr.misses <= self.max_misses]
+        for det in dets[high]:
+            self.tracks.append(Track(self.next_id, det, t))
+            self.next_id += 1
+
+        for tr in self.tracks:
+            if not tr.counted and tr.hits >= self.min_hits:
+                tr.counted = True
+                self.counter.count(tr.box, t)
+        return self._output(t)
+
+    def predict(self, t):
+        return self._output(t)
+
+    def _output(self, t):
+        live = [tr for tr in self.tracks if tr.counted and tr.misses == 0]
+        boxes = np.array([[*tr.predict(t), tr.conf, tr.cls] for tr in live]).reshape(-1, 6)
+        return boxes, np.array([tr.id for tr in live], dtype=np.int64)
+
+# ---------------- DEEPSORT (optional) ----------------
+class DeepSortTracker:
+    """deep-sort-realtime adapter with the IoUTracker interface.
+
+    Appearance embeddings need the frame, so propagation between detector
+    frames holds the last confirmed boxes instead of extrapolating.
+    """
+
+    def __init__(self, W, H, min_hits=MIN_HITS, max_misses=MAX_MISSES):
+        try:
+            from deep_sort_realtime.deepsort_tracker import DeepSort
+        except ImportError as e:
+            raise RuntimeError("TRACKER='deepsort' needs `pip install deep-sort-realtime`") from e
+        self.ds = DeepSort(max_age=max_misses, n_init=min_hits)
+        self.counter = FlowCounter(W, H)
+        self.counted = set()
+        self._last = (np.zeros((0, 6)), np.zeros(0, dtype=np.int64))
+
+    def update(self, dets, t, frame=None):
+        dets = np.asarray(dets, dtype=float).reshape(-1, 6)
+        raw = [([x1, y1, x2 - x1, y2 - y1], conf, int(cls)) for x1, y1, x2, y2, conf, cls in dets.tolist()]
+        rows, ids = [], []
+        for trk in self.ds.update_tracks(raw, frame=frame):
+            if not trk.is_confirmed() or trk.time_since_update > 0:
+                continue
+            box = trk.to_ltrb()
+            if trk.track_id not in self.counted:
+                self.counted.add(trk.track_id)
+                self.counter.count(box, t)
+            rows.append([*box, trk.get_det_conf() or 0.0, trk.get_det_class() or 0])
+            ids.append(int(trk.track_id))
+        self._last = (np.array(rows, dtype=float).reshape(-1, 6), np.array(ids, dtype=np.int64))
+        return self._last
+
+    def predict(self, t):
+        return self._last
+
+def make_tracker(kind, W, H):
+    if kind in (None, "", "none"):
+        return None
+    if kind == "iou":
+        return IoUTracker(W, H)
+    if kind == "deepsort":
+        return DeepSortTracker(W, H)
+    raise ValueError(f"Unknown tracker: {kind}")
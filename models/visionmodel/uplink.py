@@ -0,0 +1,185 @@
+import os
+import json
+import glob
+import time
+import queue
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# ---------------- CONFIG ----------------
+SERVER_URL = "http://127.0.0.1:8000/metrics"
+POST_INTERVAL = 1.0
+QUEUE_SIZE = 1024           # payloads waiting for the sender; submit() drops when full
+TIMEOUT = 2.0
+MAX_RETRIES = 5             # failed sends of one batch before it is spooled to disk
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+SPOOL_DIR = "metrics_spool"
+SPOOL_SEGMENT_BYTES = 1 << 20
+SPOOL_MAX_BYTES = 64 << 20  # oldest segments are dropped beyond this
+REPLAY_CHUNK = 500
+
+# ---------------- UPLINK ----------------
+class MetricsUplink:
+    """One background sender for metrics payloads.
+
+    submit() never blocks: payloads go through a bounded queue to a single
+    worker that keeps one keep-alive session. Per POST_INTERVAL it keeps
+    the latest payload per camera and sends them all in one request
+    (POST <url>/bulk when there is more than one). Failed sends are
+    retried with exponential backoff while newer payloads keep coalescing;
+    after MAX_RETRIES the batch is appended to a JSONL spool on disk,
+    which is replayed once the server answers again.
+    """
+
+    def __init__(self, url=SERVER_URL, interval=POST_INTERVAL, queue_size=QUEUE_SIZE,
+                 spool_dir=SPOOL_DIR, timeout=TIMEOUT, max_retries=MAX_RETRIES):
+        self.url = url
+        self.bulk_url = url.rstrip("/") + "/bulk"
+        self.interval = interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.spool_dir = spool_dir
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = {}          # camera -> latest payload
+        self._attempts = 0
+        self._next_try = 0.0
+        self._stop = threading.Event()
+        self.counters = {"submitted": 0, "coalesced": 0, "dropped": 0, "sent": 0, "requests": 0,
+                         "failed_attempts": 0, "rejected": 0, "spooled": 0, "replayed": 0,
+                         "spool_dropped": 0, "in_flight": 0}
+        self._thread = threading.Thread(target=self._run, name="metrics-uplink", daemon=True)
+        self._thread.start()
+
+    # ---------- producer side ----------
+    def submit(self, payload):
+        try:
+            self._queue.put_nowait(payload)
+            self.counters["submitted"] += 1
+        except queue.Full:
+            self.counters["dropped"] += 1
+
+    def stats(self):
+        return dict(self.counters, pending=len(self._pending), queue_depth=self._queue.qsize(),
+                    spool_bytes=sum(os.path.getsize(p) for p in self._segments()))
+
+    def close(self, flush=True, timeout=5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # still inside a send; _pending and the session belong to it, so leave them alone
+            print(f"[WARN] Uplink worker still sending after {timeout}s; skipping final flush")
+            return
+        if flush:
+            self._drain(time.monotonic())
+            if self._pending:
+                batch = list(self._pending.values())
+                self._pending = {}
+                if not self._send(batch):
+                    self._spool(batch)
+        self.session.close()
+
+    # ---------- worker ----------
+    def _run(self):
+        while not self._stop.is_set():
+            self._drain(time.monotonic() + self.interval)
+            if self._stop.is_set() or time.monotonic() < self._next_try:
+                continue  # backing off; newer payloads keep replacing older ones
+            self._flush()
+
+    def _drain(self, deadline):
+        while True:
+            timeout = deadline - time.monotonic()
+            try:
+                payload = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return
+            key = payload.get("camera", "default")
+            if key in self._pending:
+                self.counters["coalesced"] += 1
+            self._pending[key] = payload
+
+    def _flush(self):
+        if self._pending:
+            batch = list(self._pending.values())
+            self._pending = {}
+            if not self._send(batch):
+                self._backoff()
+                if self._attempts >= self.max_retries:
+                    self._spool(batch)
+                else:
+                    for p in batch:  # anything newer that arrived meanwhile wins
+                        self._pending.setdefault(p.get("camera", "default"), p)
+                return
+            self._attempts = 0
+        if not self._replay_one():
+            self._backoff()
+
+    def _backoff(self):
+        self._attempts += 1
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self._attempts - 1))
+        self._next_try = time.monotonic() + delay * random.uniform(0.5, 1.0)
+
+    def _send(self, batch):
+        self.counters["in_flight"] = len(batch)
+        try:
+            if len(batch) == 1:
+                r = self.session.post(self.url, json=batch[0], timeout=self.timeout)
+            else:
+                r = self.session.post(self.bulk_url, json=batch, timeout=self.timeout)
+            self.counters["requests"] += 1
+            if r.status_code < 400:
+                self.counters["sent"] += len(batch)
+                return True
+            if r.status_code < 500 and r.status_code != 429:
+                self.counters["rejected"] += len(batch)  # retrying will not help
+                return True
+        except requests.RequestException:
+            pass
+        finally:
+            self.counters["in_flight"] = 0
+        self.counters["failed_attempts"] += 1
+        return False
+
+    # ---------- disk spool ----------
+    def _segments(self):
+        return sorted(glob.glob(os.path.join(self.spool_dir, "spool-*.jsonl")))
+
+    def _spool(self, batch):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        segments = self._segments()
+        path = segments[-1] if segments and os.path.getsize(segments[-1]) < SPOOL_SEGMENT_BYTES else \
+            os.path.join(self.spool_dir, f"spool-{time.time_ns()}.jsonl")
+        with open(path, "a") as f:
+            for p in batch:
+                f.write(json.dumps(p) + "\n")
+        self.counters["spooled"] += len(batch)
+        segments = self._segments()
+        while len(segments) > 1 and sum(os.path.getsize(p) for p in segments) > SPOOL_MAX_BYTES:
+            with open(segments[0]) as f:
+                self.counters["spool_dropped"] += sum(1 for _ in f)
+            os.remove(segments.pop(0))
+
+    def _replay_one(self):
+        """Send the oldest spool segment (in chunks); it is deleted only when fully delivered."""
+        segments = self._segments()
+        if not segments:
+            return True
+        with open(segments[0]) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        for i in range(0, len(rows), REPLAY_CHUNK):
+            if not self._send(rows[i:i + REPLAY_CHUNK]):
+                # keep what is left for the next successful tick
+                with open(segments[0], "w") as f:
+                    for p in rows[i:]:
+                        f.write(json.dumps(p) + "\n")
+                return False
+            self.counters["replayed"] += len(rows[i:i + REPLAY_CHUNK])
+        os.remove(segments[0])
+        return True
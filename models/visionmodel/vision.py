@@ -1,16 +1,23 @@
-
-
+import os
+import sys
+import json
 import time
-import threading
+import argparse
 from collections import deque
 import cv2
-import numpy as np
-import requests
-import torch
-from ultralytics import YOLO
+
+from detector import load_detector
+from congestion import CongestionState, congestion_status, draw_detections
+from pipeline import StagedPipeline, format_stats
+from telemetry import Telemetry, NULL_TELEMETRY, format_snapshot
+from scheduler import AdaptiveScheduler
+from tracker import make_tracker
+from uplink import MetricsUplink
 
 # ---------------- CONFIG ----------------
 MODEL_PATH = "yolov8m.pt"
+DETECTOR_BACKEND = "torch"  # "torch", "onnx", "onnx-int8", "openvino", "openvino-int8" (exported on first use)
+DETECTOR_THREADS = 0        # intra-op threads for the detector; 0 = runtime default
 VIDEO_PATH = "video1.mp4"
 OUTPUT_PATH = "output_proof_video_ui.avi"
 SERVER_URL = "http://127.0.0.1:8000/metrics"
@@ -23,166 +30,247 @@ CONF_THRESH = 0.3
 MIN_BOX_SIZE = 25
 FRAME_RESIZE = 720
 FRAME_SKIP = 1
-
-# ---------------- LOAD YOLO ----------------
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"[INFO] Using device: {device.upper()}")
-model = YOLO(MODEL_PATH)
-model.to(device)
-
-cap = cv2.VideoCapture(VIDEO_PATH)
-if not cap.isOpened():
-    raise RuntimeError(f"Error opening video: {VIDEO_PATH}")
-
-ret, frame = cap.read()
-if not ret:
-    raise RuntimeError("Empty video / cannot read first frame")
-
-H0, W0 = frame.shape[:2]
-scale = FRAME_RESIZE / H0
-W, H = int(W0 * scale), FRAME_RESIZE
-grid_h, grid_w = GRID_SIZE
-cell_h, cell_w = H // grid_h, W // grid_w
-
-history = deque(maxlen=SMOOTH_WINDOW)
-last_post_time = 0.0
-
-# Video writer for proof
-fourcc = cv2.VideoWriter_fourcc(*'XVID')
-fps = cap.get(cv2.CAP_PROP_FPS)
-out = cv2.VideoWriter(OUTPUT_PATH, fourcc, fps, (W, H))
-
-vehicles_per_frame = []
-
-# ---------------- UTILITIES ----------------
-def post_metrics_async(payload):
-    """Send metrics without blocking main loop."""
-    def send():
-        try:
-            requests.post(SERVER_URL, json=payload, timeout=0.5)
-        except:
-            pass
-    threading.Thread(target=send, daemon=True).start()
-
-# ---------------- PROCESS VIDEO ----------------
-frame_idx = 0
-fps_deque = deque(maxlen=10)
-last_valid_frame = None  # store last valid frame
-
-print("[INFO] Starting video analysis. Press ESC to exit.")
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    last_valid_frame = frame.copy()  # keep last frame for final overlay
-    frame_idx += 1
-
-    # Print frame progress every 50 frames
-    if frame_idx % 50 == 0:
-        print(f"[INFO] Processed {frame_idx} frames...")
-
-    if FRAME_SKIP and frame_idx % (FRAME_SKIP + 1) != 0:
-        continue
-
-    t0 = time.time()
-    frame = cv2.resize(frame, (W, H))
-    results = model(frame, conf=CONF_THRESH, verbose=False, device=device)[0]
-
-    vehicle_mask = np.zeros((grid_h, grid_w), dtype=np.float32)
-    vehicle_count = 0
-    approach_counts = {"N": 0, "E": 0, "S": 0, "W": 0}
-
-    for box in results.boxes:
-        try:
-            cls = int(box.cls[0])
-        except:
-            cls = int(box.cls)
-        label = model.names.get(cls, str(cls)).lower()
-        if label not in VEHICLE_CLASSES:
-            continue
-
-        coords = box.xyxy[0] if hasattr(box.xyxy, "__len__") else box.xyxy
-        x1, y1, x2, y2 = map(int, coords)
-        w, h = x2 - x1, y2 - y1
-        if w < MIN_BOX_SIZE or h < MIN_BOX_SIZE:
-            continue
-
-        vehicle_count += 1
-        cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 180, 0), 2)
-        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-        cv2.circle(frame, (cx, cy), 3, (0, 255, 0), -1)
-
-        r1, r2 = max(0, y1 // cell_h), min(grid_h - 1, y2 // cell_h)
-        c1, c2 = max(0, x1 // cell_w), min(grid_w - 1, x2 // cell_w)
-        vehicle_mask[r1:r2+1, c1:c2+1] = 1.0
-
-        if cy < H // 2:
-            approach_counts["N"] += 1
-        else:
-            approach_counts["S"] += 1
-        if cx < W // 2:
-            approach_counts["W"] += 1
+ADAPTIVE_SCHEDULING = True  # motion-gated detector passes; False = fixed FRAME_SKIP
+MAX_STRIDE = 16             # sparsest sampling on static scenes (frames)
+MOTION_THRESH = 0.002       # changed-pixel fraction below which a frame is treated as static
+MOTION_HIGH = 0.02          # above this, fall back to every (FRAME_SKIP + 1)-th frame
+MAX_IDLE_FRAMES = 90        # force a detector pass at least this often
+TRACKER = "iou"             # "iou" (built-in), "deepsort" (deep-sort-realtime) or None
+DETECT_EVERY = 3            # with a tracker, run YOLO on every k-th analyzed frame
+DRAW_DETECTIONS = True  # boxes on the live view / proof video; metrics do not need them
+
+PIPELINED = True        # decode / inference / render in separate threads
+QUEUE_SIZE = 4          # frames buffered between stages
+QUEUE_POLICY = "block"  # "block" = backpressure (files); "drop" = keep freshest frames (live cameras)
+
+TELEMETRY = False           # per-stage timing histograms + counters; off = no-op calls only
+TELEMETRY_PORT = 0          # serve GET http://127.0.0.1:<port>/stats while running; 0 = off
+TELEMETRY_DUMP = None       # append a JSON snapshot per TELEMETRY_INTERVAL to this file
+TELEMETRY_INTERVAL = 5.0
+
+ORIGINAL_SIGNAL_TIME = 28.0
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v")
+
+# ---------------- ANALYSIS ----------------
+class VideoAnalysis:
+    """One video through decode -> detect/track -> render; nothing runs until run().
+
+    display=False never touches cv2.imshow/waitKey, so this works without a
+    screen. The proof video is optional (output_path=None) and can be
+    written at a fraction of the analysis resolution (proof_scale); with
+    neither a display nor a proof video the overlay is skipped entirely.
+    Stage timings go to `telemetry` (see telemetry.Telemetry) when given.
+    """
+
+    def __init__(self, video_path, model, output_path=None, proof_scale=1.0, display=False,
+                 uplink=None, camera=None, pipelined=PIPELINED, telemetry=None):
+        self.video_path = video_path
+        self.model = model
+        self.output_path = output_path
+        self.display = display
+        self.uplink = uplink
+        self.camera = camera
+        self.pipelined = pipelined
+        self.tel = telemetry or NULL_TELEMETRY
+        if uplink is not None:
+            self.tel.gauge("uplink", uplink.stats)  # posts dropped / spooled, read only at snapshot time
+
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Error opening video: {video_path}")
+        ret, frame = self.cap.read()
+        if not ret:
+            raise RuntimeError("Empty video / cannot read first frame")
+
+        H0, W0 = frame.shape[:2]
+        scale = FRAME_RESIZE / H0
+        self.W, self.H = int(W0 * scale), FRAME_RESIZE
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.state = CongestionState(self.W, self.H, model.names, VEHICLE_CLASSES, GRID_SIZE, SMOOTH_WINDOW,
+                                     MIN_BOX_SIZE)
+        self.tracker = make_tracker(TRACKER, self.W, self.H)
+        # FRAME_SKIP is the densest sampling; ADAPTIVE_SCHEDULING backs off on static scenes
+        self.scheduler = AdaptiveScheduler(min_stride=FRAME_SKIP + 1, max_stride=MAX_STRIDE,
+                                           motion_thresh=MOTION_THRESH, motion_high=MOTION_HIGH,
+                                           max_idle=MAX_IDLE_FRAMES, enabled=ADAPTIVE_SCHEDULING)
+
+        self.out = None
+        self.proof_size = (self.W, self.H)
+        if output_path:
+            self.proof_size = (int(self.W * proof_scale) // 2 * 2, int(self.H * proof_scale) // 2 * 2)
+            self.out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'XVID'), self.fps, self.proof_size)
+
+        self.frame_idx = 0
+        self.analyzed_frames = 0
+        self.detector_calls = 0
+        self.fps_deque = deque(maxlen=10)
+        self.last_valid_frame = None  # kept for the final overlay
+        self.stage_stats = None
+
+    # ---------- stages ----------
+    def next_frame_index(self):
+        self.frame_idx += 1
+        # Print frame progress every 50 frames
+        if self.display and self.frame_idx % 50 == 0:
+            print(f"[INFO] Processed {self.frame_idx} frames...")
+
+    def read_frames(self):
+        """Decode stage: yield resized frames the scheduler wants a detector pass on."""
+        cap, scheduler, tel = self.cap, self.scheduler, self.tel
+        while True:
+            # skipped frames are only grabbed, never decoded
+            t = tel.clock()
+            for _ in range(scheduler.frames_to_skip()):
+                if not cap.grab():
+                    return
+                scheduler.skipped()
+                tel.count("frames_skipped")
+                self.next_frame_index()
+                t = tel.lap("grab", t)
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            self.last_valid_frame = frame  # cap.read() returns a fresh buffer
+            self.next_frame_index()
+            t = tel.lap("decode", t)
+
+            frame = cv2.resize(frame, (self.W, self.H))
+            t = tel.lap("resize", t)
+            infer = scheduler.should_infer(frame)
+            tel.lap("motion", t)
+            if infer:
+                yield frame, self.frame_idx / self.fps  # video time drives tracker velocities and flow rates
+            else:
+                tel.count("frames_gated")
+
+    def analyze_frame(self, item):
+        """Inference stage: detect (or track) vehicles and update the congestion metric."""
+        frame, t = item
+        self.analyzed_frames += 1
+        tracker, state, tel = self.tracker, self.state, self.tel
+        t0 = tel.clock()
+        if tracker is None:
+            results = self.model(frame, CONF_THRESH)[0]
+            self.detector_calls += 1
+            t0 = tel.lap("inference", t0)
+            metrics = dict(state.update(results), frame=frame)
         else:
-            approach_counts["E"] += 1
-
-    # ---------------- CONGESTION METRIC ----------------
-    coverage = vehicle_mask.mean() * 100.0
-    metric = 0.6 * coverage + 0.4 * min(vehicle_count * 3, 100)
-    history.append(metric)
-    smooth_metric = float(np.mean(history))
-
-    if smooth_metric < 25:
-        status, color = "Light Traffic", (0, 255, 0)
-    elif smooth_metric < 55:
-        status, color = "Moderate Traffic", (0, 255, 255)
-    else:
-        status, color = "Heavy Traffic", (0, 0, 255)
-
-    vehicles_per_frame.append(vehicle_count)
-    fps = 1 / (time.time() - t0 + 1e-6)
-    fps_deque.append(fps)
-    avg_fps = np.mean(fps_deque)
-
-    # ---------------- OVERLAY LIVE INFO ----------------
-    cv2.putText(frame, f"Vehicles: {vehicle_count}", (10, 40),
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-    cv2.putText(frame, f"Congestion: {status} ({smooth_metric:.1f}%)", (10, 80),
-                cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-    cv2.putText(frame, f"N:{approach_counts['N']} E:{approach_counts['E']}", (10, H - 60),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (240, 240, 240), 2)
-    cv2.putText(frame, f"S:{approach_counts['S']} W:{approach_counts['W']}", (10, H - 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (240, 240, 240), 2)
-    cv2.putText(frame, f"{avg_fps:.1f} FPS", (W - 160, 40),
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-
-    cv2.imshow("Smart Traffic Congestion", frame)
-    out.write(frame)
-
-    # POST METRICS ASYNC
-    now = time.time()
-    if now - last_post_time >= POST_INTERVAL:
-        payload = {
-            "timestamp": now,
-            "counts": approach_counts,
-            "overall_congestion": float(smooth_metric),
-        }
-        post_metrics_async(payload)
-        last_post_time = now
-
-    if cv2.waitKey(1) & 0xFF == 27:
-        break
-
-cap.release()
-out.release()
-cv2.destroyAllWindows()
-
-# ------------------------------- FINAL SIGNAL OPTIMIZATION -------------------------------
-avg_vehicles = sum(vehicles_per_frame) / len(vehicles_per_frame)
-max_vehicles = max(vehicles_per_frame) if max(vehicles_per_frame) > 0 else 1
-avg_congestion = (avg_vehicles / max_vehicles) * 100
-
+            # the detector runs on every DETECT_EVERY-th frame; tracks are propagated in between
+            if (self.analyzed_frames - 1) % DETECT_EVERY == 0:
+                results = self.model(frame, CONF_THRESH)[0]
+                self.detector_calls += 1
+                t0 = tel.lap("inference", t0)
+                tracks, ids = tracker.update(state.vehicle_detections(results), t, frame)
+            else:
+                tracks, ids = tracker.predict(t)
+            metrics = dict(state.update_detections(tracks), frame=frame, track_ids=ids,
+                           unique_vehicles=tracker.counter.unique, flow_per_min=tracker.counter.flow_per_min(t))
+        self.scheduler.observe(metrics["smooth_metric"])
+        tel.lap("post", t0)
+        return metrics
+
+    def render_frame(self, result):
+        """Render stage: overlay, display, write and post metrics. Returns False on ESC."""
+        tel = self.tel
+        keep_going = True
+        if self.display or self.out is not None:
+            t = tel.clock()
+            frame = self.draw_overlay(result)
+            t = tel.lap("draw", t)
+            if self.display:
+                cv2.imshow("Smart Traffic Congestion", frame)
+                keep_going = cv2.waitKey(1) & 0xFF != 27
+                t = tel.lap("display", t)
+            if self.out is not None:
+                if self.proof_size != (self.W, self.H):
+                    frame = cv2.resize(frame, self.proof_size, interpolation=cv2.INTER_AREA)
+                self.out.write(frame)
+                tel.lap("encode", t)
+
+        if self.uplink is not None:
+            # the uplink keeps the latest per POST_INTERVAL
+            payload = {
+                "timestamp": time.time(),
+                "counts": result["approach_counts"],
+                "overall_congestion": float(result["smooth_metric"]),
+            }
+            if self.camera is not None:
+                payload["camera"] = self.camera
+            if "flow_per_min" in result:
+                payload["unique_vehicles"] = result["unique_vehicles"]
+                payload["flow_per_min"] = result["flow_per_min"]
+            self.uplink.submit(payload)
+        return keep_going
+
+    def draw_overlay(self, result):
+        frame = result["frame"]
+        approach_counts = result["approach_counts"]
+        smooth_metric = result["smooth_metric"]
+        status, color = congestion_status(smooth_metric)
+
+        # output FPS of the whole pipeline, not of a single stage
+        self.fps_deque.append(time.time())
+        avg_fps = (len(self.fps_deque) - 1) / (self.fps_deque[-1] - self.fps_deque[0] + 1e-6)
+
+        if DRAW_DETECTIONS:
+            draw_detections(frame, result["boxes"], result.get("track_ids"))
+        H, W = self.H, self.W
+        cv2.putText(frame, f"Vehicles: {result['vehicle_count']}", (10, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        cv2.putText(frame, f"Congestion: {status} ({smooth_metric:.1f}%)", (10, 80),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+        cv2.putText(frame, f"N:{approach_counts['N']} E:{approach_counts['E']}", (10, H - 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (240, 240, 240), 2)
+        cv2.putText(frame, f"S:{approach_counts['S']} W:{approach_counts['W']}", (10, H - 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (240, 240, 240), 2)
+        cv2.putText(frame, f"{avg_fps:.1f} FPS", (W - 160, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        return frame
+
+    # ---------- driver ----------
+    def run(self):
+        """Processes the whole video and returns summary()."""
+        t_start = time.perf_counter()
+        try:
+            if self.pipelined:
+                # decode and inference run in their own threads; display stays on the calling thread
+                pipeline = StagedPipeline(self.read_frames(), self.analyze_frame, self.render_frame,
+                                          queue_size=QUEUE_SIZE, policy=QUEUE_POLICY)
+                self.tel.gauge("queues", lambda: {"decoded_dropped": pipeline.decoded.dropped,
+                                                  "inferred_dropped": pipeline.inferred.dropped,
+                                                  "decoded_depth": pipeline.decoded.q.qsize(),
+                                                  "inferred_depth": pipeline.inferred.q.qsize()})
+                self.stage_stats = pipeline.run()
+            else:
+                for item in self.read_frames():
+                    if not self.render_frame(self.analyze_frame(item)):
+                        break
+        finally:
+            self.cap.release()
+            if self.out is not None:
+                self.out.release()
+        return self.summary(time.perf_counter() - t_start)
+
+    def summary(self, seconds=None):
+        summary = {"video": self.video_path, "frames": self.frame_idx, "fps": self.fps,
+                   "analyzed_frames": self.analyzed_frames, "detector_calls": self.detector_calls,
+                   "scheduling": self.scheduler.summary()}
+        summary.update(final_recommendation(self.state.vehicles_per_frame))
+        if self.tracker is not None:
+            summary["unique_vehicles"] = self.tracker.counter.unique
+            summary["unique_by_approach"] = dict(self.tracker.counter.totals)
+        if seconds is not None:
+            summary["seconds"] = round(seconds, 3)
+            summary["processing_fps"] = round(self.frame_idx / max(seconds, 1e-9), 2)
+        if self.stage_stats is not None:
+            summary["stages"] = self.stage_stats
+        summary["proof_video"] = self.output_path
+        if self.tel.enabled:
+            summary["telemetry"] = self.tel.snapshot()
+        return summary
+
+# ---------------- FINAL SIGNAL OPTIMIZATION ----------------
 def congestion_level(avg_congestion):
     if avg_congestion < 40:
         return "Light"
@@ -194,32 +282,176 @@ def congestion_level(avg_congestion):
 def optimize_signal(original_time, avg_congestion):
     return round(original_time * (1 + (avg_congestion - 50)/100), 2)
 
-original_time = 28.0
-optimized_time = optimize_signal(original_time, avg_congestion)
-level = congestion_level(avg_congestion)
-time_diff = round(optimized_time - original_time, 2)
-
-# ------------------------------- FINAL OVERLAY -------------------------------
-final_frame = last_valid_frame.copy()  # use last valid frame
-text_lines = [
-    f"Average vehicles/frame: {avg_vehicles:.1f}",
-    f"Avg congestion: {avg_congestion:.1f}% -> {level}",
-    f"Original signal: {original_time}s",
-    f"Optimized signal: {optimized_time}s (+{time_diff}s)"
-]
-
-y0, dy = 50, 50
-for i, line in enumerate(text_lines):
-    y = y0 + i*dy
-    cv2.putText(final_frame, line, (50, y), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-
-cv2.imshow("Final Traffic Analysis", final_frame)
-cv2.waitKey(0)
-cv2.destroyAllWindows()
-
-print("\n========== FINAL RECOMMENDATION ==========")
-print(f"Average vehicles/frame: {avg_vehicles:.1f}")
-print(f"Avg congestion: {avg_congestion:.1f}% -> {level}")
-print(f"Original (inferred): {original_time}s | Optimized: {optimized_time}s (+{time_diff}s)")
-print("==========================================")
-print(f"[INFO] Proof video saved at: {OUTPUT_PATH}")
+def final_recommendation(vehicles_per_frame, original_time=ORIGINAL_SIGNAL_TIME):
+    avg_vehicles = sum(vehicles_per_frame) / len(vehicles_per_frame) if vehicles_per_frame else 0.0
+    max_vehicles = max(vehicles_per_frame, default=0) or 1
+    avg_congestion = (avg_vehicles / max_vehicles) * 100
+    optimized_time = optimize_signal(original_time, avg_congestion)
+    return {"avg_vehicles": float(avg_vehicles), "max_vehicles": int(max(vehicles_per_frame, default=0)),
+            "avg_congestion": float(avg_congestion), "level": congestion_level(avg_congestion),
+            "original_time": original_time, "optimized_time": optimized_time,
+            "time_diff": round(optimized_time - original_time, 2)}
+
+def summary_lines(summary):
+    return [
+        f"Average vehicles/frame: {summary['avg_vehicles']:.1f}",
+        f"Avg congestion: {summary['avg_congestion']:.1f}% -> {summary['level']}",
+        f"Original signal: {summary['original_time']}s",
+        f"Optimized signal: {summary['optimized_time']}s (+{summary['time_diff']}s)",
+    ]
+
+def show_final_overlay(frame, summary):
+    final_frame = frame.copy()
+    y0, dy = 50, 50
+    for i, line in enumerate(summary_lines(summary)):
+        y = y0 + i*dy
+        cv2.putText(final_frame, line, (50, y), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+    cv2.imshow("Final Traffic Analysis", final_frame)
+    cv2.waitKey(0)
+    cv2.destroyAllWindows()
+
+# ---------------- API ----------------
+def analyze_video(video_path, model=None, output_path=None, proof_scale=1.0, display=False,
+                  uplink=None, camera=None, backend=DETECTOR_BACKEND, weights=MODEL_PATH, threads=DETECTOR_THREADS):
+    """Analyze one recorded video headlessly (by default) and return its summary dict."""
+    if model is None:
+        model = load_detector(backend, weights, threads=threads)
+    return VideoAnalysis(video_path, model, output_path, proof_scale, display, uplink, camera).run()
+
+def find_videos(paths):
+    videos = []
+    for p in paths:
+        if os.path.isdir(p):
+            videos += [os.path.join(p, f) for f in sorted(os.listdir(p)) if f.lower().endswith(VIDEO_EXTENSIONS)]
+        else:
+            videos.append(p)
+    # longest first, so one big file does not start last and hold up the whole batch
+    return sorted(videos, key=lambda v: -os.path.getsize(v) if os.path.exists(v) else 0)
+
+# ---------------- BATCH (process pool) ----------------
+_worker = {}
+
+def _init_worker(backend, weights, threads):
+    # cap every native thread pool in the worker so N workers x threads <= cores
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    cv2.setNumThreads(threads)
+    _worker["model"] = load_detector(backend, weights, threads=threads)
+
+def _run_one(video, out_dir, proof, proof_scale, post, telemetry):
+    stem = os.path.splitext(os.path.basename(video))[0]
+    output_path = os.path.join(out_dir, f"{stem}_proof.avi") if proof else None
+    uplink = MetricsUplink(SERVER_URL, POST_INTERVAL) if post else None
+    tel = Telemetry(dump_path=os.path.join(out_dir, f"{stem}.telemetry.jsonl")) if telemetry else None
+    try:
+        summary = VideoAnalysis(video, _worker["model"], output_path, proof_scale, uplink=uplink, camera=stem,
+                                telemetry=tel).run()
+    except Exception as e:  # one bad file must not take down the batch
+        summary = {"video": video, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        if uplink is not None:
+            uplink.close()
+        if tel is not None:
+            tel.close()
+    with open(os.path.join(out_dir, f"{stem}.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def analyze_batch(videos, out_dir, workers=None, threads=1, proof=False, proof_scale=0.5, post=False,
+                  backend=DETECTOR_BACKEND, weights=MODEL_PATH, telemetry=False):
+    """Analyze many videos across a process pool; one summary JSON per video in out_dir.
+
+    telemetry=True adds stage timings to each summary and dumps them to <stem>.telemetry.jsonl.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    import multiprocessing
+
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or max(1, (os.cpu_count() or 1) // max(threads, 1))
+    if backend != "torch":
+        load_detector(backend, weights, threads=1)  # export once here, not racing in every worker
+    summaries = []
+    # spawn: workers must not inherit the parent's torch / OpenMP thread state
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(backend, weights, threads)) as pool:
+        futures = [pool.submit(_run_one, v, out_dir, proof, proof_scale, post, telemetry) for v in videos]
+        for fut in as_completed(futures):
+            s = fut.result()
+            summaries.append(s)
+            if "error" in s:
+                print(f"[WARN] {s['video']}: {s['error']}")
+            else:
+                print(f"[INFO] {s['video']}: {s['frames']} frames in {s['seconds']:.1f}s "
+                      f"({s['processing_fps']:.1f} FPS), avg {s['avg_vehicles']:.1f} vehicles, {s['level']}")
+    return summaries
+
+# ---------------- MAIN ----------------
+def main_interactive():
+    """The original live view: window, proof video, metrics uplink and final overlay on VIDEO_PATH."""
+    model = load_detector(DETECTOR_BACKEND, MODEL_PATH, threads=DETECTOR_THREADS)
+    print(f"[INFO] Using {DETECTOR_BACKEND} detector on {model.device.upper()}")
+    # one sender thread + keep-alive session; coalesces to one post per POST_INTERVAL
+    uplink = MetricsUplink(SERVER_URL, POST_INTERVAL)
+    telemetry = Telemetry(TELEMETRY_PORT, TELEMETRY_DUMP, TELEMETRY_INTERVAL) if TELEMETRY else None
+    if TELEMETRY_PORT and telemetry is not None:
+        print(f"[INFO] Live stats at http://127.0.0.1:{TELEMETRY_PORT}/stats")
+    analysis = VideoAnalysis(VIDEO_PATH, model, OUTPUT_PATH, display=True, uplink=uplink, telemetry=telemetry)
+
+    print("[INFO] Starting video analysis. Press ESC to exit.")
+    summary = analysis.run()
+    if analysis.stage_stats is not None:
+        print("[INFO] Pipeline stage throughput:")
+        print(format_stats(analysis.stage_stats))
+    print(f"[INFO] Frame scheduling: {summary['scheduling']}, "
+          f"detector calls: {summary['detector_calls']}/{summary['analyzed_frames']}")
+    uplink.close()
+    print(f"[INFO] Metrics uplink: {uplink.stats()}")
+    if telemetry is not None:
+        telemetry.close()
+        print("[INFO] Stage timings:")
+        print(format_snapshot(telemetry.snapshot()))
+    cv2.destroyAllWindows()
+
+    show_final_overlay(analysis.last_valid_frame, summary)
+
+    print("\n========== FINAL RECOMMENDATION ==========")
+    for line in summary_lines(summary)[:2]:
+        print(line)
+    print(f"Original (inferred): {summary['original_time']}s | Optimized: {summary['optimized_time']}s "
+          f"(+{summary['time_diff']}s)")
+    if "unique_vehicles" in summary:
+        print(f"Unique vehicles: {summary['unique_vehicles']} (by approach: {summary['unique_by_approach']})")
+    print("==========================================")
+    print(f"[INFO] Proof video saved at: {OUTPUT_PATH}")
+
+def main():
+    if len(sys.argv) == 1:
+        main_interactive()
+        return
+    ap = argparse.ArgumentParser(description="Headless batch analysis of recorded videos "
+                                             "(no arguments: interactive view of VIDEO_PATH)")
+    ap.add_argument("paths", nargs="+", help="video files and/or directories of videos")
+    ap.add_argument("--out-dir", default="analysis", help="per-video summary JSON (and proof videos)")
+    ap.add_argument("--workers", type=int, default=0, help="processes; 0 = cores // threads")
+    ap.add_argument("--threads", type=int, default=1, help="detector / OpenCV threads per worker")
+    ap.add_argument("--proof", action="store_true", help="also write an annotated proof video per input")
+    ap.add_argument("--proof-scale", type=float, default=0.5, help="proof video size relative to the analysis frames")
+    ap.add_argument("--post", action="store_true", help=f"send live metrics to {SERVER_URL}")
+    ap.add_argument("--telemetry", action="store_true", help="per-stage timing histograms in each summary")
+    ap.add_argument("--backend", default=DETECTOR_BACKEND)
+    ap.add_argument("--weights", default=MODEL_PATH)
+    args = ap.parse_args()
+
+    videos = find_videos(args.paths)
+    if not videos:
+        ap.error("no videos found")
+    t0 = time.perf_counter()
+    summaries = analyze_batch(videos, args.out_dir, args.workers or None, args.threads, args.proof,
+                              args.proof_scale, args.post, args.backend, args.weights, args.telemetry)
+    frames = sum(s.get("frames", 0) for s in summaries)
+    elapsed = time.perf_counter() - t0
+    print(f"[INFO] {len(summaries)} videos, {frames} frames in {elapsed:.1f}s "
+          f"({frames / max(elapsed, 1e-9):.1f} FPS overall); summaries in {args.out_dir}/")
+
+if __name__ == "__main__":
+    main()